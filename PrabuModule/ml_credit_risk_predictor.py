@@ -1,9 +1,10 @@
 import os
+import threading
 import joblib
 import pandas as pd
 import numpy as np
-from sklearn.exceptions import NotFittedError
-from catboost import CatBoostClassifier # Import CatBoost
+# catboost, sklearn, dan daftar fitur dari incremental_model_trainer diimpor saat prediksi pertama
+# (lihat pastikan_resources_dimuat) agar impor modul ini tidak memperlambat startup API.
 # from sklearn.preprocessing import LabelEncoder # Not directly used here if trainer handles it
 
 # Path ke model dan preprocessor yang sudah dilatih
@@ -15,14 +16,13 @@ LABEL_ENCODER_PATH = os.path.join(BASE_DIR, 'trained_models', 'label_encoder.job
 MODEL = None
 NUMERIC_PREPROCESSOR = None
 LABEL_ENCODER = None
+NotFittedError = None
+_RESOURCES_DIMUAT = False
+_RESOURCES_LOCK = threading.Lock()
 
-# These will be loaded from incremental_model_trainer constants for consistency
-try:
-    from .incremental_model_trainer import ALL_NUMERIC_FEATURES, CATEGORICAL_FEATURES
-except ImportError: # Fallback for standalone execution or testing
-    print("Warning: Could not import feature lists from incremental_model_trainer. Using placeholders.")
-    ALL_NUMERIC_FEATURES = [] # Placeholder
-    CATEGORICAL_FEATURES = ['Sektor'] # Placeholder
+# These will be loaded from incremental_model_trainer constants for consistency (lihat _load_resources)
+ALL_NUMERIC_FEATURES = [] # Placeholder
+CATEGORICAL_FEATURES = ['Sektor'] # Placeholder
 
 # Define the mapping from risk category to score
 RISK_CATEGORY_TO_SCORE_MAP = {
@@ -35,8 +35,14 @@ RISK_CATEGORY_TO_SCORE_MAP = {
 
 
 def _load_resources():
-    global MODEL, NUMERIC_PREPROCESSOR, LABEL_ENCODER
-    
+    global MODEL, NUMERIC_PREPROCESSOR, LABEL_ENCODER, NotFittedError, ALL_NUMERIC_FEATURES, CATEGORICAL_FEATURES
+    from sklearn.exceptions import NotFittedError
+    from catboost import CatBoostClassifier # Import CatBoost
+    try:
+        from .incremental_model_trainer import ALL_NUMERIC_FEATURES, CATEGORICAL_FEATURES
+    except ImportError: # Fallback for standalone execution or testing
+        print("Warning: Could not import feature lists from incremental_model_trainer. Using placeholders.")
+
     if os.path.exists(MODEL_PATH):
         MODEL = CatBoostClassifier()
         MODEL.load_model(MODEL_PATH)
@@ -59,10 +65,19 @@ def _load_resources():
         print(f"PERINGATAN: File LabelEncoder tidak ditemukan di {LABEL_ENCODER_PATH}. Prediksi kategori mungkin gagal.")
         LABEL_ENCODER = None
 
-_load_resources()
+def pastikan_resources_dimuat():
+    """Memuat model, preprocessor, dan LabelEncoder sekali, saat pertama kali dibutuhkan."""
+    global _RESOURCES_DIMUAT
+    if _RESOURCES_DIMUAT:
+        return
+    with _RESOURCES_LOCK:
+        if not _RESOURCES_DIMUAT:
+            _load_resources()
+            _RESOURCES_DIMUAT = True
 
 def predict_credit_risk_ml(financial_data_dict: dict, sector: str) -> dict:
     global MODEL, NUMERIC_PREPROCESSOR, LABEL_ENCODER, ALL_NUMERIC_FEATURES, CATEGORICAL_FEATURES
+    pastikan_resources_dimuat()
 
     default_return = {
         "risk_category": None,
@@ -161,6 +176,7 @@ def predict_credit_risk_ml(financial_data_dict: dict, sector: str) -> dict:
 
 if __name__ == '__main__':
     print("Contoh Prediksi menggunakan ML Credit Risk Predictor (CatBoost):")
+    pastikan_resources_dimuat()
     if MODEL is None or NUMERIC_PREPROCESSOR is None or LABEL_ENCODER is None:
         print("Model, Preprocessor Numerik, atau LabelEncoder tidak dimuat. Pastikan incremental_model_trainer.py telah dijalankan.")
     else:
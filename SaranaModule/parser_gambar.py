@@ -34,6 +34,8 @@ DEFAULT_OPSI_PRAPROSES = {
     'contrast': {'alpha': 1.5, 'beta': 0},
     'binarization': {'method': 'adaptive_gaussian', 'block_size': 31, 'C': 2, 'invert': True},
     'deskew': True,
+    'deskew_max_angle': 15.0,
+    'deskew_min_angle': 0.1,
     'remove_borders': False,
     'crop_final': True,
     'easyocr_gpu': False,
@@ -72,31 +74,65 @@ def binarisasi_adaptif(gambar_cv_skala_abu):
         cv2.THRESH_BINARY, 31, 2
     )
 
-# Fungsi helper untuk mencoba pelurusan kemiringan (deskew)
-def coba_pelurusan_kemiringan(gambar_cv_biner):
-    """Mencoba meluruskan kemiringan gambar. Implementasi dasar."""
-    # Dapatkan koordinat piksel putih (teks)
-    coords = np.column_stack(np.where(gambar_cv_biner > 0))
-    # Dapatkan sudut kemiringan menggunakan minAreaRect
-    # Perlu diperhatikan, minAreaRect mengembalikan (center (x,y), (width, height), angle of rotation)
-    # Sudut berkisar antara [-90, 0); jika objek tegak, sudutnya 0. Jika objek horizontal, sudutnya -90.
-    if coords.shape[0] < 5:  # Perlu setidaknya 5 poin untuk fitEllipse/minAreaRect
+# Sudut kemiringan diestimasi pada salinan kecil (sisi terpanjang <= nilai ini); rotasi hanya sekali, pada resolusi penuh
+SISI_MAKS_ESTIMASI_KEMIRINGAN = 2000
+# Batas jumlah piksel teks yang dipakai menilai profil proyeksi (diambil berselang jika lebih)
+MAKS_TITIK_ESTIMASI_KEMIRINGAN = 150_000
+# Jumlah sudut yang dinilai sekaligus (~8 x 150.000 titik x 8 byte per array sementara)
+UKURAN_KELOMPOK_SUDUT_KEMIRINGAN = 8
+
+
+def skor_profil_proyeksi(baris, kolom, daftar_sudut):
+    """
+    Menilai tiap sudut kandidat (derajat) dari profil proyeksi horizontal piksel teks setelah diputar sebesar
+    sudut itu: jumlah kuadrat selisih bin bertetangga, maksimum saat baris teks lurus. Sudut dihitung per
+    kelompok UKURAN_KELOMPOK_SUDUT_KEMIRINGAN dengan satu np.bincount per kelompok agar memori sementara kecil.
+    """
+    daftar_sudut = np.asarray(daftar_sudut, dtype=np.float64)
+    skor = np.empty(len(daftar_sudut), dtype=np.float64)
+    for awal in range(0, len(daftar_sudut), UKURAN_KELOMPOK_SUDUT_KEMIRINGAN):
+        radian = np.deg2rad(daftar_sudut[awal:awal + UKURAN_KELOMPOK_SUDUT_KEMIRINGAN])[:, None]
+        indeks = np.rint(baris[None, :] * np.cos(radian) - kolom[None, :] * np.sin(radian)).astype(np.int64)
+        indeks -= indeks.min(axis=1, keepdims=True)
+        # Satu bin kosong di ujung agar skor tiap sudut tidak bergantung pada sudut lain sekelompok
+        panjang = int(indeks.max()) + 2
+        indeks += np.arange(len(radian), dtype=np.int64)[:, None] * panjang
+        profil = np.bincount(indeks.ravel(), minlength=len(radian) * panjang).reshape(len(radian), panjang)
+        skor[awal:awal + len(radian)] = (np.diff(profil.astype(np.float64), axis=1) ** 2).sum(axis=1)
+    return skor
+
+
+def estimasi_sudut_kemiringan(gambar_cv_biner, sudut_maks=15.0):
+    """
+    Mengestimasi sudut kemiringan (derajat, siap dipakai cv2.getRotationMatrix2D) dari gambar biner berteks putih.
+    Pencarian kasar per 1 derajat dalam +-sudut_maks, lalu halus per 0.05 derajat di sekitar sudut terbaik,
+    semuanya pada salinan yang diperkecil.
+    """
+    skala = SISI_MAKS_ESTIMASI_KEMIRINGAN / max(gambar_cv_biner.shape[:2])
+    if skala < 1:
+        gambar_cv_biner = cv2.resize(gambar_cv_biner, None, fx=skala, fy=skala, interpolation=cv2.INTER_AREA)
+    # Goresan tipis menjadi abu-abu setelah INTER_AREA, jadi ambangnya rendah
+    baris, kolom = np.nonzero(gambar_cv_biner >= 64)
+    if baris.size < 50:
         print("Peringatan: Tidak cukup poin untuk mendeteksi kemiringan, melewati pelurusan.")
-        return gambar_cv_biner
+        return 0.0
+    langkah_titik = -(-baris.size // MAKS_TITIK_ESTIMASI_KEMIRINGAN)
+    baris, kolom = baris[::langkah_titik].astype(np.float64), kolom[::langkah_titik].astype(np.float64)
 
-    rect = cv2.minAreaRect(coords)
-    sudut = rect[-1]  # Sudut rotasi
+    sudut_kasar = np.arange(-sudut_maks, sudut_maks + 0.5, 1.0)
+    terbaik = sudut_kasar[int(np.argmax(skor_profil_proyeksi(baris, kolom, sudut_kasar)))]
+    sudut_halus = np.arange(terbaik - 1.0, terbaik + 1.025, 0.05)
+    terbaik = sudut_halus[int(np.argmax(skor_profil_proyeksi(baris, kolom, sudut_halus)))]
+    return round(float(terbaik), 2)
 
-    # Logika untuk menyesuaikan sudut dari cv2.minAreaRect
-    # Jika sudut kurang dari -45, itu berarti objek lebih condong ke vertikal.
-    # Jika sudut lebih dari -45 (mendekati 0), objek lebih condong ke horizontal.
-    if sudut < -45:
-        sudut = -(90 + sudut)  # Menyesuaikan untuk rotasi yang benar
-    else:
-        sudut = -sudut  # Membalikkan sudut
 
-    # Jika sudut terlalu kecil, mungkin tidak perlu rotasi
-    if abs(sudut) < 0.1:  # Threshold bisa disesuaikan
+# Fungsi helper untuk mencoba pelurusan kemiringan (deskew)
+def coba_pelurusan_kemiringan(gambar_cv_biner, sudut_maks=15.0, sudut_min=0.1):
+    """Meluruskan kemiringan gambar biner (teks putih) dengan sudut dari estimasi_sudut_kemiringan."""
+    sudut = estimasi_sudut_kemiringan(gambar_cv_biner, sudut_maks)
+
+    # Jika sudut terlalu kecil, tidak perlu rotasi (rotasi resolusi penuh adalah bagian termahal)
+    if abs(sudut) < sudut_min:
         return gambar_cv_biner
 
     (tinggi, lebar) = gambar_cv_biner.shape[:2]
@@ -323,7 +359,9 @@ def ekstrak_teks_dari_gambar(path_gambar: str, mesin_ocr: str = 'tesseract', ops
 
         # 6. Deskew
         if opsi_praproses.get('deskew'):
-            processed_img = coba_pelurusan_kemiringan(processed_img)  # Harapannya ini bekerja dengan teks putih
+            processed_img = coba_pelurusan_kemiringan(  # Harapannya ini bekerja dengan teks putih
+                processed_img, opsi_praproses.get('deskew_max_angle', 15.0), opsi_praproses.get('deskew_min_angle', 0.1)
+            )
 
         # 7. Remove Borders
         if opsi_praproses.get('remove_borders'):
@@ -5,6 +5,7 @@ from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 import re
 import json
+import bisect
 import unicodedata  # Untuk normalisasi lanjutan jika diperlukan
 
 # Global variables for NLTK resources
@@ -409,6 +410,33 @@ def is_potentially_numeric(text: str) -> bool:
     return True
 
 
+def _bersihkan_kata_ocr(teks: str) -> str:
+    # Hilangkan tanda baca (mis. "pendapatan," atau "aset:") untuk perbandingan kata
+    return re.sub(r'[^\w\s]', '', teks.lower())
+
+
+def _bangun_indeks_baris_nilai(structured_ocr_data: list[dict]) -> tuple[list[float], list[tuple]]:
+    """
+    Membangun indeks baris untuk kandidat nilai numerik: hanya kata yang tampak numerik dan bisa dinormalisasi,
+    diurutkan berdasarkan pusat vertikal bbox sehingga kata pada baris visual yang sama bisa diambil dengan bisect.
+
+    Returns:
+        (daftar_pusat_y_terurut, daftar_kandidat) dengan kandidat = (pusat_y, indeks_kata, x_min, nilai_ternormalisasi).
+    """
+    kandidat = []
+    for j, item in enumerate(structured_ocr_data):
+        teks = item['text']
+        if not teks.strip() or not is_potentially_numeric(teks):
+            continue
+        nilai = normalisasi_nilai_keuangan(teks)
+        if nilai is None:
+            continue
+        bounds = item['bounds']
+        kandidat.append(((bounds[1] + bounds[3]) / 2, j, bounds[0], nilai))
+    kandidat.sort(key=lambda k: (k[0], k[1]))
+    return [k[0] for k in kandidat], kandidat
+
+
 def ekstrak_data_keuangan_dari_struktur_vision(
     structured_ocr_data: list[dict], 
     daftar_kata_kunci: list[dict] | None = None
@@ -417,6 +445,9 @@ def ekstrak_data_keuangan_dari_struktur_vision(
     Mengekstrak data keuangan dari output terstruktur Google Vision API.
     Diasumsikan data yang masuk sudah difilter untuk halaman "Entitas Induk".
 
+    Teks kata dibersihkan sekali di awal, dan kandidat nilai diindeks per baris visual (pusat vertikal bbox),
+    sehingga pencarian nilai untuk satu kata kunci hanya menyentuh kata pada baris yang sama.
+
     Args:
         structured_ocr_data: List dict {'text': 'word', 'bounds': [x_min, y_min, x_max, y_max]}.
         daftar_kata_kunci: Daftar kata kunci untuk diekstrak. Menggunakan default jika None.
@@ -436,91 +467,70 @@ def ekstrak_data_keuangan_dari_struktur_vision(
     MAX_HORIZONTAL_DISTANCE_FACTOR = 5  # Faktor pengali lebar kata kunci untuk jarak horizontal maksimal
     VERTICAL_ALIGNMENT_TOLERANCE_FACTOR = 0.7 # Faktor pengali tinggi kata kunci untuk toleransi alignment vertikal
 
+    # Dibangun sekali per pemanggilan (satu halaman): kata bersih, posisi per kata, dan indeks baris nilai
+    kata_bersih = [_bersihkan_kata_ocr(item['text']) for item in structured_ocr_data]
+    posisi_per_kata = {}
+    for i, kata in enumerate(kata_bersih):
+        posisi_per_kata.setdefault(kata, []).append(i)
+    pusat_y_nilai, kandidat_nilai = _bangun_indeks_baris_nilai(structured_ocr_data)
+    jumlah_kata = len(structured_ocr_data)
+
     for info_kata_kunci in daftar_kata_kunci:
         kata_dasar_target = info_kata_kunci["kata_dasar"]
         nilai_ditemukan_final = None
         nilai_ditemukan_final_kedekatan = float('inf') # Untuk mencari nilai terdekat
 
         for variasi in info_kata_kunci["variasi"]:
-            variasi_lower = variasi.lower()
-            kata_variasi = variasi_lower.split()
+            kata_variasi = [_bersihkan_kata_ocr(kata) for kata in variasi.lower().split()]
             jumlah_kata_variasi = len(kata_variasi)
+            if jumlah_kata_variasi == 0:
+                continue
 
-            for i in range(len(structured_ocr_data) - jumlah_kata_variasi + 1):
+            for i in posisi_per_kata.get(kata_variasi[0], ()):
                 # Coba match variasi (bisa multi-kata)
-                match_ditemukan = True
-                teks_tergabung_variasi = []
-                for k in range(jumlah_kata_variasi):
-                    struktur_item_variasi = structured_ocr_data[i+k]
-                    teks_tergabung_variasi.append(struktur_item_variasi['text'].lower())
-                    # Periksa apakah kata dalam variasi cocok, hilangkan tanda baca di akhir kata untuk perbandingan
-                    # Ini penting karena OCR mungkin menangkap "pendapatan," atau "aset:"
-                    kata_ocr_cleaned = re.sub(r'[^\w\s]', '', struktur_item_variasi['text'].lower())
-                    kata_variasi_cleaned = re.sub(r'[^\w\s]', '', kata_variasi[k])
-                    
-                    if kata_ocr_cleaned != kata_variasi_cleaned:
-                        match_ditemukan = False
-                        break
+                if i + jumlah_kata_variasi > jumlah_kata or kata_bersih[i:i + jumlah_kata_variasi] != kata_variasi:
+                    continue
+
+                # Variasi ditemukan, dapatkan BBox dari kata terakhir variasi
+                keyword_bounds_first_word = structured_ocr_data[i]['bounds']
+                keyword_bounds_last_word = structured_ocr_data[i + jumlah_kata_variasi - 1]['bounds']
                 
-                if match_ditemukan:
-                    # Variasi ditemukan, dapatkan BBox dari kata terakhir variasi
-                    keyword_bounds_first_word = structured_ocr_data[i]['bounds']
-                    keyword_bounds_last_word = structured_ocr_data[i + jumlah_kata_variasi - 1]['bounds']
-                    
-                    y_min_keyword = keyword_bounds_last_word[1]
-                    y_max_keyword = keyword_bounds_last_word[3]
-                    x_max_keyword = keyword_bounds_last_word[2]
-                    
-                    keyword_height = y_max_keyword - y_min_keyword
-                    keyword_width = x_max_keyword - keyword_bounds_first_word[0] # Lebar keseluruhan variasi
-
-                    # Cari nilai numerik di sebelah kanan pada baris yang sama (kurang lebih)
-                    for j, struktur_item_value in enumerate(structured_ocr_data):
-                        # Hindari memproses kata kunci itu sendiri sebagai nilai
-                        if i <= j < i + jumlah_kata_variasi:
-                            continue
-
-                        # NEW: Skip if text is empty or only whitespace
-                        if not struktur_item_value['text'].strip():
-                            continue
-
-                        if not is_potentially_numeric(struktur_item_value['text']):
-                            continue
-
-                        value_bounds = struktur_item_value['bounds']
-                        y_min_value = value_bounds[1]
-                        y_max_value = value_bounds[3]
-                        x_min_value = value_bounds[0]
-                        
-                        # 1. Cek Alignment Vertikal (kurang lebih pada baris yang sama)
-                        # Pusat vertikal kata kunci dan nilai harus cukup dekat
-                        center_y_keyword = (y_min_keyword + y_max_keyword) / 2
-                        center_y_value = (y_min_value + y_max_value) / 2
-                        vertical_distance_centers = abs(center_y_keyword - center_y_value)
-                        
-                        # Toleransi berdasarkan tinggi kata kunci
-                        # Jika jarak vertikal antar pusat < toleransi tinggi kata kunci, anggap sejajar
-                        is_vertically_aligned = vertical_distance_centers < (keyword_height * VERTICAL_ALIGNMENT_TOLERANCE_FACTOR)
-
-                        # 2. Cek Posisi Horizontal (nilai di sebelah kanan kata kunci)
-                        is_to_the_right = x_min_value > x_max_keyword
-
-                        # 3. Cek Kedekatan Horizontal
-                        horizontal_distance = x_min_value - x_max_keyword
-                        # Jarak horizontal maksimal yang diizinkan, berdasarkan lebar kata kunci
-                        # Ini membantu menghindari pengambilan angka yang terlalu jauh
-                        max_allowed_horizontal_distance = keyword_width * MAX_HORIZONTAL_DISTANCE_FACTOR
-                        
-                        is_horizontally_close = 0 < horizontal_distance < max_allowed_horizontal_distance
-
-                        if is_vertically_aligned and is_to_the_right and is_horizontally_close:
-                            nilai_ternormalisasi = normalisasi_nilai_keuangan(struktur_item_value['text'])
-                            if nilai_ternormalisasi is not None:
-                                # Jika ini nilai valid pertama, atau lebih dekat dari yang sebelumnya
-                                if horizontal_distance < nilai_ditemukan_final_kedekatan:
-                                    nilai_ditemukan_final = nilai_ternormalisasi
-                                    nilai_ditemukan_final_kedekatan = horizontal_distance
-                                    # print(f"Kandidat untuk '{variasi}': {struktur_item_value['text']} -> {nilai_ternormalisasi} (Jarak: {horizontal_distance:.2f})")
+                y_min_keyword = keyword_bounds_last_word[1]
+                y_max_keyword = keyword_bounds_last_word[3]
+                x_max_keyword = keyword_bounds_last_word[2]
+                
+                keyword_height = y_max_keyword - y_min_keyword
+                keyword_width = x_max_keyword - keyword_bounds_first_word[0] # Lebar keseluruhan variasi
+                center_y_keyword = (y_min_keyword + y_max_keyword) / 2
+                toleransi_vertikal = keyword_height * VERTICAL_ALIGNMENT_TOLERANCE_FACTOR
+                # Jarak horizontal maksimal yang diizinkan, berdasarkan lebar kata kunci
+                max_allowed_horizontal_distance = keyword_width * MAX_HORIZONTAL_DISTANCE_FACTOR
+                if toleransi_vertikal <= 0:
+                    continue
+
+                # Ambil kandidat pada baris yang sama (rentang pusat-y), sedikit dilebarkan lalu dicek persis
+                margin = toleransi_vertikal * 1e-9 + 1e-9
+                awal = bisect.bisect_left(pusat_y_nilai, center_y_keyword - toleransi_vertikal - margin)
+                akhir = bisect.bisect_right(pusat_y_nilai, center_y_keyword + toleransi_vertikal + margin)
+                # Urutkan sesuai urutan kata asli agar pemilihan saat jarak sama tetap seperti sebelumnya
+                for center_y_value, j, x_min_value, nilai_ternormalisasi in sorted(kandidat_nilai[awal:akhir], key=lambda k: k[1]):
+                    # Hindari memproses kata kunci itu sendiri sebagai nilai
+                    if i <= j < i + jumlah_kata_variasi:
+                        continue
+
+                    # 1. Cek Alignment Vertikal (kurang lebih pada baris yang sama)
+                    is_vertically_aligned = abs(center_y_keyword - center_y_value) < toleransi_vertikal
+                    # 2. Cek Posisi Horizontal (nilai di sebelah kanan kata kunci)
+                    is_to_the_right = x_min_value > x_max_keyword
+                    # 3. Cek Kedekatan Horizontal
+                    horizontal_distance = x_min_value - x_max_keyword
+                    is_horizontally_close = 0 < horizontal_distance < max_allowed_horizontal_distance
+
+                    if is_vertically_aligned and is_to_the_right and is_horizontally_close:
+                        # Jika ini nilai valid pertama, atau lebih dekat dari yang sebelumnya
+                        if horizontal_distance < nilai_ditemukan_final_kedekatan:
+                            nilai_ditemukan_final = nilai_ternormalisasi
+                            nilai_ditemukan_final_kedekatan = horizontal_distance
 
 
         if nilai_ditemukan_final is not None:
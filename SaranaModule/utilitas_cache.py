@@ -3,6 +3,7 @@ import os
 import hashlib  # Untuk membuat hash sebagai kunci cache
 import json  # Untuk menyimpan dan membaca data cache dalam format JSON
 import time  # Untuk mendapatkan timestamp
+import tempfile  # Untuk penulisan file cache secara atomik
 
 # Konstanta untuk nama direktori cache default
 NAMA_DIREKTORI_CACHE_DEFAULT = ".cache_parser_dokumen"  # Indonesianized name
@@ -73,9 +74,17 @@ def simpan_ke_cache(kunci_cache: str, data_untuk_cache: dict, direktori_cache_pa
         # Tentukan path lengkap untuk file cache
         path_file_cache: str = os.path.join(direktori_cache, f"{kunci_cache}.json")
 
-        # Simpan data sebagai JSON ke file cache
-        with open(path_file_cache, 'w', encoding='utf-8') as f_cache:
-            json.dump(data_untuk_cache, f_cache, ensure_ascii=False, indent=4)
+        # Simpan data sebagai JSON ringkas ke file temporer, lalu ganti file cache secara atomik
+        # agar proses lain tidak pernah membaca file yang baru setengah ditulis
+        fd_temp, path_temp = tempfile.mkstemp(dir=direktori_cache, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd_temp, 'w', encoding='utf-8') as f_cache:
+                json.dump(data_untuk_cache, f_cache, ensure_ascii=False, separators=(',', ':'))
+            os.replace(path_temp, path_file_cache)
+        except BaseException:
+            if os.path.exists(path_temp):
+                os.remove(path_temp)
+            raise
         return True
     except OSError as e:  # Lebih spesifik untuk error pembuatan direktori atau file I/O
         print(f"Error OS saat menyimpan ke cache ({path_file_cache}): {e}")
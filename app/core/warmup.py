@@ -0,0 +1,166 @@
+import os
+import time
+import asyncio
+import threading
+
+# Pemanasan (warmup) komponen berat saat startup, dijalankan di latar belakang oleh lifespan FastAPI.
+# /health tetap menjawab segera (liveness), sedangkan /ready mengembalikan 503 sampai semua komponen
+# yang dipilih selesai dipanaskan, sehingga load balancer hanya mengirim trafik ke instance yang sudah hangat.
+
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "true").lower() == "true"
+# Komponen yang dipanaskan, dipisah koma: prabu_model, setia_risk_data, sarana_workers
+WARMUP_COMPONENTS = [
+    nama.strip() for nama in os.environ.get("WARMUP_COMPONENTS", "prabu_model,setia_risk_data,sarana_workers").split(",")
+    if nama.strip()
+]
+WARMUP_SARANA_OCR = os.environ.get("WARMUP_SARANA_OCR", "true").lower() == "true"
+# Reader EasyOCR memakan ratusan MB per worker, jadi hanya dibuat saat warmup jika diminta
+WARMUP_SARANA_EASYOCR = os.environ.get("WARMUP_SARANA_EASYOCR", "false").lower() == "true"
+WARMUP_TIMEOUT_SECONDS = float(os.environ.get("WARMUP_TIMEOUT_SECONDS", 180))
+# Lama probe warmup menahan worker, agar probe lain diambil worker yang belum melapor
+JEDA_PROBE_WARMUP_SARANA = 0.2
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_WARM = "warm"
+STATUS_FAILED = "failed"
+
+
+def _panaskan_prabu_model() -> dict:
+    from PrabuModule import ml_credit_risk_predictor
+    ml_credit_risk_predictor.pastikan_resources_dimuat()
+    belum_dimuat = [
+        nama for nama, nilai in (("model", ml_credit_risk_predictor.MODEL),
+                                 ("preprocessor", ml_credit_risk_predictor.NUMERIC_PREPROCESSOR),
+                                 ("label_encoder", ml_credit_risk_predictor.LABEL_ENCODER))
+        if nilai is None
+    ]
+    if belum_dimuat:
+        raise RuntimeError(f"Resource Prabu tidak dimuat: {', '.join(belum_dimuat)}")
+    return {}
+
+
+def _panaskan_setia_risk_data() -> dict:
+    from ..services import setia_service
+    risk_data = setia_service.preload_risk_data()
+    if not risk_data:
+        raise RuntimeError("risk_data.json kosong atau gagal dibaca")
+    return {"jumlah_kunci": len(risk_data)}
+
+
+def _opsi_pemanasan_sarana() -> dict:
+    return {"sertakan_ocr": WARMUP_SARANA_OCR, "sertakan_easyocr": WARMUP_SARANA_EASYOCR}
+
+
+def atur_pemanasan_pool_sarana():
+    """
+    Dipanggil dari lifespan sebelum pool Sarana dipakai (dispatcher job bisa langsung mengirim pekerjaan):
+    pemanasan dijalankan di initializer tiap worker pool, bukan sebagai tugas biasa.
+    """
+    if "sarana_workers" in _status_warmup.komponen:
+        from ..services import sarana_pool
+        sarana_pool.get_pool_sarana().atur_pemanasan_worker(_opsi_pemanasan_sarana())
+
+
+def _panaskan_sarana_workers() -> dict:
+    # Parsing Sarana berjalan di pool proses, jadi pemanasan harus terjadi di worker, bukan di proses API.
+    # N tugas untuk N worker tidak menjamin satu tugas per proses (worker yang cepat bisa mengambil beberapa),
+    # jadi probe dikirim ulang sampai setiap pid worker sudah melapor hasil pemanasannya.
+    from ..services import sarana_pool
+    pool = sarana_pool.get_pool_sarana()
+    opsi_pemanasan = _opsi_pemanasan_sarana()
+    hasil_per_pid = {}
+    batas_waktu = time.monotonic() + WARMUP_TIMEOUT_SECONDS
+    while len(hasil_per_pid) < pool.jumlah_worker:
+        sisa_waktu = batas_waktu - time.monotonic()
+        if sisa_waktu <= 0:
+            raise _WarmupGagalError(f"Hanya {len(hasil_per_pid)} dari {pool.jumlah_worker} worker Sarana melapor",
+                                    {"workers": list(hasil_per_pid.values())})
+        futures = [pool.kirim(sarana_pool.laporan_pemanasan_worker_sarana, opsi_pemanasan, JEDA_PROBE_WARMUP_SARANA)
+                   for _ in range(pool.jumlah_worker - len(hasil_per_pid))]
+        for future in futures:
+            hasil = future.result(timeout=max(sisa_waktu, 0.1))
+            hasil_per_pid[hasil["pid"]] = hasil
+    hasil_worker = list(hasil_per_pid.values())
+    error = {f"{hasil['pid']}:{langkah}": pesan for hasil in hasil_worker for langkah, pesan in hasil["error"].items()}
+    detail = {"workers": hasil_worker}
+    if error:
+        raise _WarmupGagalError("; ".join(f"{k} {v}" for k, v in error.items()), detail)
+    return detail
+
+
+class _WarmupGagalError(RuntimeError):
+    def __init__(self, pesan: str, detail: dict):
+        super().__init__(pesan)
+        self.detail = detail
+
+
+FUNGSI_WARMUP = {
+    "prabu_model": _panaskan_prabu_model,
+    "setia_risk_data": _panaskan_setia_risk_data,
+    "sarana_workers": _panaskan_sarana_workers,
+}
+
+
+class StatusWarmup:
+    """Status pemanasan per komponen (status, durasi, detail, error)."""
+
+    def __init__(self, komponen: list[str]):
+        self._lock = threading.Lock()
+        self.waktu_mulai = None
+        self.komponen = {nama: {"status": STATUS_PENDING, "duration_ms": None, "detail": None, "error": None}
+                         for nama in komponen}
+
+    def perbarui(self, nama: str, **nilai):
+        with self._lock:
+            self.komponen[nama].update(nilai)
+
+    def ringkasan(self) -> dict:
+        with self._lock:
+            komponen = {nama: dict(info) for nama, info in self.komponen.items()}
+        selesai = all(info["status"] in (STATUS_WARM, STATUS_FAILED) for info in komponen.values())
+        return {
+            "ready": selesai,
+            # Komponen yang gagal tidak menahan readiness (agar instance tidak pernah siap), tetapi dilaporkan
+            "degraded": any(info["status"] == STATUS_FAILED for info in komponen.values()),
+            "warmup_enabled": WARMUP_ENABLED,
+            "components": komponen,
+        }
+
+
+_status_warmup = StatusWarmup([nama for nama in WARMUP_COMPONENTS if nama in FUNGSI_WARMUP] if WARMUP_ENABLED else [])
+
+
+async def _panaskan_komponen(nama: str):
+    _status_warmup.perbarui(nama, status=STATUS_RUNNING)
+    waktu_mulai = time.perf_counter()
+    try:
+        detail = await asyncio.wait_for(asyncio.to_thread(FUNGSI_WARMUP[nama]), timeout=WARMUP_TIMEOUT_SECONDS)
+        durasi_ms = round((time.perf_counter() - waktu_mulai) * 1000, 1)
+        _status_warmup.perbarui(nama, status=STATUS_WARM, duration_ms=durasi_ms, detail=detail or None)
+        print(f"INFO (Warmup): Komponen '{nama}' hangat dalam {durasi_ms} ms.")
+    except Exception as e:
+        durasi_ms = round((time.perf_counter() - waktu_mulai) * 1000, 1)
+        if isinstance(e, asyncio.TimeoutError): pesan = "Timeout"
+        elif isinstance(e, _WarmupGagalError): pesan = str(e)
+        else: pesan = f"{type(e).__name__}: {e}"
+        _status_warmup.perbarui(nama, status=STATUS_FAILED, duration_ms=durasi_ms, error=pesan,
+                                detail=getattr(e, "detail", None))
+        print(f"WARNING (Warmup): Komponen '{nama}' gagal dipanaskan: {pesan}")
+
+
+async def jalankan_warmup():
+    """Memanaskan semua komponen terpilih secara bersamaan."""
+    _status_warmup.waktu_mulai = time.time()
+    await asyncio.gather(*(_panaskan_komponen(nama) for nama in _status_warmup.komponen))
+
+
+def mulai_warmup() -> asyncio.Task | None:
+    """Menjadwalkan warmup di latar belakang (dipanggil dari lifespan); server tetap menjawab /health."""
+    if not _status_warmup.komponen:
+        return None
+    return asyncio.create_task(jalankan_warmup())
+
+
+def status_warmup() -> dict:
+    return _status_warmup.ringkasan()
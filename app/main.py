@@ -1,17 +1,36 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
 # Import router
 from .routers import prabu_router, sarana_router, setia_router
+from .services import sarana_pool, sarana_jobs
+from .core import warmup
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Worker pool Sarana memanaskan diri di initializer; harus diatur sebelum dispatcher membuat pool
+    warmup.atur_pemanasan_pool_sarana()
+    # Jalankan dispatcher job Sarana saat startup agar job yang tertunda (misal setelah restart) diproses lagi
+    sarana_jobs.get_pengelola_job_sarana()
+    # Panaskan model/engine di latar belakang; /ready mengembalikan 503 sampai selesai
+    tugas_warmup = warmup.mulai_warmup()
+    yield
+    if tugas_warmup is not None and not tugas_warmup.done():
+        tugas_warmup.cancel()
+    # Matikan dispatcher job dan pool proses Sarana saat server berhenti agar worker tidak tertinggal
+    sarana_jobs.hentikan_pengelola_job_sarana()
+    sarana_pool.matikan_pool_sarana()
 
 app = FastAPI(
     title="Astranauts - Layanan Analisis Risiko Terintegrasi",
     description="API untuk analisis risiko keuangan (Prabu), pemrosesan dokumen (Sarana), dan intelijen risiko (Setia).",
     version="1.0.0",
     docs_url="/docs", 
-    redoc_url="/redoc" 
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Add CORS middleware for frontend integration
@@ -48,6 +67,12 @@ async def api_v1_health_check():
 async def cloud_run_health_check():
     return {"status": "healthy", "message": "Service is ready"}
 
+# Readiness: 503 sampai warmup selesai, beserta status dan durasi tiap komponen
+@app.get("/ready", tags=["Health Check"])
+async def readiness_check():
+    status = warmup.status_warmup()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 # For Cloud Run deployment
 if __name__ == "__main__":
     import uvicorn
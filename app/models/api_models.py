@@ -172,6 +172,30 @@ class SaranaParseDocumentResponse(BaseModel):
         None, description="Hasil ekstraksi terstruktur dalam format JSON (jika output_format='structured_json')")
 
 
+class SaranaJobStatusResponse(BaseModel):
+    """Status job parsing dokumen Sarana yang berjalan di latar belakang."""
+    job_id: str
+    status: str = Field(description="Status job: 'queued', 'running', 'done', atau 'failed'")
+    nama_file: str
+    progres: Dict[str, Any] = Field(
+        default_factory=dict, description="Progres terakhir (tahap, halaman OCR selesai, total halaman, ...)")
+    error: Optional[str] = Field(
+        None, description="Pesan error jika job gagal")
+    waktu_dibuat: float = Field(description="Waktu job dibuat (epoch detik)")
+    waktu_mulai: Optional[float] = Field(
+        None, description="Waktu job mulai diproses (epoch detik)")
+    waktu_selesai: Optional[float] = Field(
+        None, description="Waktu job selesai (epoch detik)")
+
+
+class SaranaJobSubmitResponse(SaranaJobStatusResponse):
+    """Respons saat job Sarana didaftarkan."""
+    job_baru: bool = Field(
+        description="False jika dokumen & opsi yang sama sudah punya job, sehingga job lama yang dikembalikan")
+    status_url: str
+    result_url: str
+
+
 # Untuk Setia
 class SetiaRiskIntelligenceRequest(BaseModel):
     """Request untuk analisis intelijen risiko Setia."""
@@ -219,5 +243,6 @@ __all__ = [
     # Menambahkan PrabuMLCreditRiskPrediction
     "PrabuCreditRiskPrediction", "PrabuMLCreditRiskPrediction",
     "SaranaKeywordExtraction", "SaranaParseDocumentResponse",
+    "SaranaJobStatusResponse", "SaranaJobSubmitResponse",
     "SetiaRiskIntelligenceRequest", "SetiaSupportingSource", "SetiaRiskIntelligenceResponse"
 ]
@@ -1,18 +1,69 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional
 import os
-import shutil
+import json
+import time
+import asyncio
+import hashlib
 import uuid
 
 # Impor layanan Sarana dan model Pydantic
-from ..services import sarana_service
-from ..models.api_models import SaranaParseDocumentResponse
+from ..services import sarana_service, sarana_pool, sarana_jobs, sarana_ollama
+from ..models.api_models import SaranaParseDocumentResponse, SaranaJobStatusResponse, SaranaJobSubmitResponse
 
 router = APIRouter()
 
 # Direktori temporer untuk menyimpan file upload
 TEMP_UPLOAD_DIR_SARANA = "temp_sarana_uploads" 
 os.makedirs(TEMP_UPLOAD_DIR_SARANA, exist_ok=True)
+UKURAN_CHUNK_UPLOAD_SARANA = 1024 * 1024
+# Selang pengecekan apakah klien masih terhubung selama request Ollama async berjalan
+INTERVAL_CEK_KLIEN_SARANA = 0.5
+# Streaming progres job: selang polling tabel event dan selang heartbeat agar proxy tidak menutup koneksi diam
+INTERVAL_POLL_EVENT_SARANA = 0.5
+INTERVAL_HEARTBEAT_STREAM_SARANA = 15.0
+MEDIA_TYPE_STREAM_SARANA = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+
+
+async def _simpan_upload_dengan_hash(file: UploadFile, path_tujuan: str) -> str:
+    """Menyimpan file upload ke disk secara bertahap sambil menghitung SHA-256 isinya.
+
+    Hash dipakai layanan Sarana sebagai kunci cache, sehingga berkas tidak perlu dibaca ulang.
+    """
+    hasher = hashlib.sha256()
+    with open(path_tujuan, "wb") as buffer:
+        while True:
+            chunk = await file.read(UKURAN_CHUNK_UPLOAD_SARANA)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            buffer.write(chunk)
+    return hasher.hexdigest()
+
+
+def _http_exception_pool_penuh(exc: sarana_pool.SaranaPoolPenuhError) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": str(exc.retry_after)})
+
+
+async def _jalankan_selama_klien_terhubung(request: Request, coro):
+    """Menjalankan coroutine sebagai task dan membatalkannya jika klien memutus koneksi sebelum selesai.
+
+    Pembatalan menutup stream ke Ollama, sehingga request yang ditinggalkan tidak terus memakai kapasitas model.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            selesai, _ = await asyncio.wait({task}, timeout=INTERVAL_CEK_KLIEN_SARANA)
+            if selesai:
+                return task.result()
+            if await request.is_disconnected():
+                print("INFO (SaranaRouter): Klien memutus koneksi, ekstraksi Ollama dibatalkan.")
+                # 499 (Client Closed Request); respons ini tidak akan sampai ke klien
+                raise HTTPException(status_code=499, detail="Klien memutus koneksi sebelum parsing selesai")
+    finally:
+        if not task.done():
+            task.cancel()
 
 # Health check endpoint
 @router.get("/health", summary="Sarana Health Check")
@@ -20,19 +71,28 @@ async def sarana_health_check():
     """Health check untuk module Sarana"""
     return {"status": "ok", "module": "Sarana", "message": "OCR & NLP module is running"}
 
+@router.get("/pool/status", summary="Sarana Worker Pool Status")
+async def sarana_pool_status():
+    """Utilisasi pool proses yang menjalankan parsing dokumen Sarana."""
+    return sarana_pool.status_pool_sarana()
+
 @router.post("/document/parse", summary="Parse Financial Documents", response_model=SaranaParseDocumentResponse)
 async def parse_document_endpoint(
+    request: Request,
     file: UploadFile = File(..., description="File dokumen yang akan di-parse"),
     file_type: Optional[str] = Form(None, description="Tipe file eksplisit"),
     ocr_engine: str = Form('tesseract', description="Mesin OCR: 'tesseract', 'easyocr', 'ollama'"),
-    pdf_parsing_method: str = Form('pymupdf', description="Metode parsing PDF: 'pymupdf', 'pdfplumber'"),
+    pdf_parsing_method: str = Form('pymupdf', description="Metode parsing PDF: 'pymupdf', 'pdfplumber', 'pymupdf_layout' (kolom angka dari posisi kata)"),
+    filter_entitas_induk: bool = Form(True, description="PDF: hanya halaman laporan Entitas Induk (False = semua halaman)"),
     output_format: str = Form('text', description="Format output: 'text' atau 'structured_json'"),
     jenis_pengaju: str = Form('korporat', description="Jenis pengaju: 'korporat' atau 'individu'"),
     # Parameter tambahan untuk Ollama
     ollama_json_prompt_template: Optional[str] = Form(None, description="Template prompt JSON kustom untuk Ollama"),
     ollama_vision_model_name: str = Form("llama3.2-vision", description="Model vision Ollama"),
     ollama_llm_model_json_name: str = Form("llama3", description="Model LLM Ollama untuk ekstraksi JSON"),
-    ollama_api_base_url_param: Optional[str] = Form(None, description="Base URL Ollama API kustom")
+    ollama_api_base_url_param: Optional[str] = Form(None, description="Base URL Ollama API kustom"),
+    early_stop: bool = Form(False, description="PDF: hentikan OCR halaman sisa begitu semua kata kunci punya nilai t dan t-1"),
+    max_ocr_pages: Optional[int] = Form(None, description="PDF: batas jumlah halaman yang di-OCR")
 ):
     """
     Endpoint untuk mem-parsing dokumen keuangan menggunakan modul Sarana.
@@ -45,23 +105,40 @@ async def parse_document_endpoint(
     temp_file_path = os.path.join(TEMP_UPLOAD_DIR_SARANA, unique_filename)
     
     try:
-        # Simpan file yang di-upload ke direktori temporer
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Simpan file yang di-upload ke direktori temporer (sekaligus hash isinya untuk cache)
+        file_content_hash = await _simpan_upload_dengan_hash(file, temp_file_path)
 
-        # Panggil layanan Sarana
-        parsing_result_dict = sarana_service.parse_document_sarana(
-            file_path=temp_file_path,
-            file_type=file_type,
-            ocr_engine=ocr_engine,
-            pdf_parsing_method=pdf_parsing_method,
-            output_format=output_format,
-            jenis_pengaju=jenis_pengaju,
-            ollama_json_prompt_template=ollama_json_prompt_template,
-            ollama_vision_model_name=ollama_vision_model_name,
-            ollama_llm_model_json_name=ollama_llm_model_json_name,
-            ollama_api_base_url_param=ollama_api_base_url_param
-        )
+        if sarana_ollama.SARANA_OLLAMA_ASYNC_ENABLED and sarana_service.adalah_gambar_ke_json_sarana(temp_file_path, file_type, output_format):
+            # Gambar -> JSON hanya menunggu Ollama: di-stream langsung di event loop tanpa menahan worker pool
+            parsing_result_dict = await _jalankan_selama_klien_terhubung(request, sarana_service.parse_document_gambar_json_async_sarana(
+                file_path=temp_file_path,
+                file_type=file_type,
+                jenis_pengaju=jenis_pengaju,
+                ollama_json_prompt_template=ollama_json_prompt_template,
+                ollama_vision_model_name=ollama_vision_model_name,
+                ollama_llm_model_json_name=ollama_llm_model_json_name,
+                ollama_api_base_url_param=ollama_api_base_url_param,
+                file_content_hash=file_content_hash
+            ))
+        else:
+            # Panggil layanan Sarana di pool proses agar event loop tetap melayani request lain
+            parsing_result_dict = await sarana_pool.jalankan_di_pool_sarana(
+                sarana_service.parse_document_sarana,
+                file_path=temp_file_path,
+                file_type=file_type,
+                ocr_engine=ocr_engine,
+                pdf_parsing_method=pdf_parsing_method,
+                filter_entitas_induk=filter_entitas_induk,
+                output_format=output_format,
+                jenis_pengaju=jenis_pengaju,
+                ollama_json_prompt_template=ollama_json_prompt_template,
+                ollama_vision_model_name=ollama_vision_model_name,
+                ollama_llm_model_json_name=ollama_llm_model_json_name,
+                ollama_api_base_url_param=ollama_api_base_url_param,
+                file_content_hash=file_content_hash,
+                early_stop=early_stop,
+                max_ocr_pages=max_ocr_pages
+            )
 
         if parsing_result_dict.get("error"):
             raise HTTPException(status_code=422, detail=f"Error dalam parsing dokumen: {parsing_result_dict['error']}")
@@ -70,6 +147,8 @@ async def parse_document_endpoint(
 
     except HTTPException as http_exc:
         raise http_exc
+    except sarana_pool.SaranaPoolPenuhError as e:
+        raise _http_exception_pool_penuh(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
     finally:
@@ -91,27 +170,35 @@ async def ocr_upload_endpoint(
     temp_file_path = os.path.join(TEMP_UPLOAD_DIR_SARANA, unique_filename)
     
     try:
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        file_content_hash = await _simpan_upload_dengan_hash(file, temp_file_path)
+        waktu_mulai = time.perf_counter()
 
         # Simplified OCR processing
-        parsing_result = sarana_service.parse_document_sarana(
+        parsing_result = await sarana_pool.jalankan_di_pool_sarana(
+            sarana_service.parse_document_sarana,
             file_path=temp_file_path,
             ocr_engine=ocr_engine,
-            output_format='text'
+            output_format='text',
+            file_content_hash=file_content_hash
         )
 
-        if parsing_result.get("error"):
-            raise HTTPException(status_code=422, detail=f"OCR Error: {parsing_result['error']}")
+        # parse_document_sarana melaporkan kegagalan parsing di 'error_parsing'; 'error' hanya dari wrapper-nya
+        pesan_error = parsing_result.get("error") or parsing_result.get("error_parsing")
+        if pesan_error:
+            raise HTTPException(status_code=422, detail=f"OCR Error: {pesan_error}")
 
         return {
             "status": "success",
             "filename": original_filename,
             "ocr_engine": ocr_engine,
-            "extracted_text": parsing_result.get("extracted_text", ""),
-            "processing_time": parsing_result.get("processing_time_seconds", 0)
+            "extracted_text": parsing_result.get("teks_ekstrak_mentah") or "",
+            "processing_time": round(time.perf_counter() - waktu_mulai, 3)
         }
 
+    except HTTPException:
+        raise
+    except sarana_pool.SaranaPoolPenuhError as e:
+        raise _http_exception_pool_penuh(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OCR processing error: {str(e)}")
     finally:
@@ -133,29 +220,243 @@ async def extract_data_endpoint(
     temp_file_path = os.path.join(TEMP_UPLOAD_DIR_SARANA, unique_filename)
     
     try:
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        file_content_hash = await _simpan_upload_dengan_hash(file, temp_file_path)
+        waktu_mulai = time.perf_counter()
 
         # Data extraction processing
-        extraction_result = sarana_service.parse_document_sarana(
+        extraction_result = await sarana_pool.jalankan_di_pool_sarana(
+            sarana_service.parse_document_sarana,
             file_path=temp_file_path,
             output_format=output_format,
-            jenis_pengaju='korporat' if extraction_type == 'financial' else 'individu'
+            jenis_pengaju='korporat' if extraction_type == 'financial' else 'individu',
+            file_content_hash=file_content_hash
         )
 
-        if extraction_result.get("error"):
-            raise HTTPException(status_code=422, detail=f"Extraction Error: {extraction_result['error']}")
+        pesan_error = extraction_result.get("error") or extraction_result.get("error_parsing")
+        if pesan_error:
+            raise HTTPException(status_code=422, detail=f"Extraction Error: {pesan_error}")
 
+        # structured_json -> data per akun; text -> teks mentah hasil ekstraksi
+        kunci_hasil = "hasil_ekstraksi_terstruktur" if output_format == 'structured_json' else "teks_ekstrak_mentah"
         return {
             "status": "success",
             "filename": original_filename,
             "extraction_type": extraction_type,
-            "extracted_data": extraction_result.get("extracted_text", ""),
-            "processing_time": extraction_result.get("processing_time_seconds", 0)
+            "extracted_data": extraction_result.get(kunci_hasil) or "",
+            "processing_time": round(time.perf_counter() - waktu_mulai, 3)
         }
 
+    except HTTPException:
+        raise
+    except sarana_pool.SaranaPoolPenuhError as e:
+        raise _http_exception_pool_penuh(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Data extraction error: {str(e)}")
     finally:
         if os.path.exists(temp_file_path):
             os.remove(temp_file_path)
+
+def _opsi_parsing_job(file_type: Optional[str], ocr_engine: str, pdf_parsing_method: str, filter_entitas_induk: bool,
+                      output_format: str, jenis_pengaju: str, ollama_json_prompt_template: Optional[str],
+                      ollama_vision_model_name: str, ollama_llm_model_json_name: str,
+                      ollama_api_base_url_param: Optional[str]) -> dict:
+    """Argumen parse_document_sarana untuk job, dari field form yang sama di /jobs dan /document/parse/stream."""
+    return {
+        "file_type": file_type,
+        "ocr_engine": ocr_engine,
+        "pdf_parsing_method": pdf_parsing_method,
+        "filter_entitas_induk": filter_entitas_induk,
+        "output_format": output_format,
+        "jenis_pengaju": jenis_pengaju,
+        "ollama_json_prompt_template": ollama_json_prompt_template,
+        "ollama_vision_model_name": ollama_vision_model_name,
+        "ollama_llm_model_json_name": ollama_llm_model_json_name,
+        "ollama_api_base_url_param": ollama_api_base_url_param,
+    }
+
+async def _daftarkan_job_upload(file: UploadFile, opsi_parsing: dict, early_stop: bool = False,
+                                max_ocr_pages: Optional[int] = None) -> tuple[dict, bool]:
+    """Menyimpan upload ke direktori job lalu mendaftarkan job parsing (atau mengembalikan job yang sama)."""
+    pengelola = sarana_jobs.get_pengelola_job_sarana()
+    original_filename = file.filename if file.filename else "unknown_file"
+    safe_filename_base = "".join(c if c.isalnum() or c in ['.', '_'] else '_' for c in original_filename)
+    job_file_path = os.path.join(pengelola.direktori_upload, f"{uuid.uuid4().hex}_{safe_filename_base}")
+
+    try:
+        opsi_parsing = dict(opsi_parsing, file_content_hash=await _simpan_upload_dengan_hash(file, job_file_path))
+        if early_stop or max_ocr_pages:
+            # Hanya disertakan jika dipakai, agar kunci dedup job lama tetap sama
+            opsi_parsing.update(early_stop=early_stop, max_ocr_pages=max_ocr_pages)
+        # Akses SQLite bersifat blocking: jalankan di thread agar event loop tidak tertahan
+        return await asyncio.to_thread(pengelola.buat_job, job_file_path, original_filename,
+                                       opsi_parsing["file_content_hash"], opsi_parsing)
+    except Exception as e:
+        if os.path.exists(job_file_path):
+            os.remove(job_file_path)
+        raise HTTPException(status_code=500, detail=f"Gagal mendaftarkan job: {str(e)}")
+
+
+def _format_event_stream(format_stream: str, event: dict, urutan: Optional[int] = None) -> str:
+    data = json.dumps(event, ensure_ascii=False, default=str)
+    if format_stream == "ndjson":
+        return data + "\n"
+    # SSE: id = urutan event di tabel, sehingga klien bisa melanjutkan dengan header Last-Event-ID
+    baris_id = f"id: {urutan}\n" if urutan is not None else ""
+    return f"{baris_id}event: {event.get('tahap', 'progres')}\ndata: {data}\n\n"
+
+
+async def _stream_event_job(job_id: str, format_stream: str, setelah_urutan: int = 0, event_awal: Optional[dict] = None):
+    """
+    Meneruskan event progres job (render/OCR halaman, cache, kata kunci, ...) dari tabel event SQLite,
+    perubahan status job, lalu satu event akhir 'hasil' (format sama dengan /document/parse) atau 'error'.
+    Job tetap berjalan jika klien memutus stream; lanjutkan lewat GET /jobs/{job_id}/events.
+    """
+    pengelola = sarana_jobs.get_pengelola_job_sarana()
+    if event_awal:
+        yield _format_event_stream(format_stream, event_awal)
+    status_terakhir = None
+    waktu_kirim_terakhir = time.monotonic()
+    while True:
+        # Status dibaca sebelum event: jika job sudah selesai, semua event-nya pasti sudah tertulis
+        job = await asyncio.to_thread(pengelola.ambil_job, job_id)
+        if job is None:
+            yield _format_event_stream(format_stream, {"tahap": "error", "error": f"Job {job_id} tidak ditemukan"})
+            return
+        daftar_event = await asyncio.to_thread(pengelola.ambil_event_job, job_id, setelah_urutan)
+        status_akhir = job["status"] in (sarana_jobs.STATUS_JOB_DONE, sarana_jobs.STATUS_JOB_FAILED)
+        # Status akhir dikirim setelah semua event progres job tersebut
+        if job["status"] != status_terakhir and not (status_akhir and daftar_event):
+            status_terakhir = job["status"]
+            yield _format_event_stream(format_stream, {"tahap": "status", "status": status_terakhir})
+        for urutan, event in daftar_event:
+            setelah_urutan = urutan
+            yield _format_event_stream(format_stream, event, urutan)
+        if daftar_event:
+            waktu_kirim_terakhir = time.monotonic()
+            continue # Mungkin masih ada event berikutnya di luar batas satu kali baca
+        if status_terakhir == sarana_jobs.STATUS_JOB_FAILED:
+            yield _format_event_stream(format_stream, {"tahap": "error", "status": status_terakhir, "error": job["error"]})
+            return
+        if status_terakhir == sarana_jobs.STATUS_JOB_DONE:
+            job = await asyncio.to_thread(pengelola.ambil_job, job_id, True)
+            hasil = SaranaParseDocumentResponse(**job["hasil"]).model_dump()
+            yield _format_event_stream(format_stream, {"tahap": "hasil", "status": status_terakhir, "hasil": hasil})
+            return
+        if time.monotonic() - waktu_kirim_terakhir >= INTERVAL_HEARTBEAT_STREAM_SARANA:
+            yield ": heartbeat\n\n" if format_stream == "sse" else _format_event_stream(format_stream, {"tahap": "heartbeat"})
+            waktu_kirim_terakhir = time.monotonic()
+        await asyncio.sleep(INTERVAL_POLL_EVENT_SARANA)
+
+
+def _streaming_response_job(job_id: str, format_stream: str, setelah_urutan: int = 0,
+                            event_awal: Optional[dict] = None) -> StreamingResponse:
+    if format_stream not in MEDIA_TYPE_STREAM_SARANA:
+        raise HTTPException(status_code=422, detail=f"Format stream tidak dikenal: {format_stream} (pilih 'sse' atau 'ndjson')")
+    return StreamingResponse(
+        _stream_event_job(job_id, format_stream, setelah_urutan, event_awal),
+        media_type=MEDIA_TYPE_STREAM_SARANA[format_stream],
+        # X-Accel-Buffering: nginx tidak menahan event di buffer
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Job-Id": job_id}
+    )
+
+@router.post("/jobs", summary="Submit Document Parsing Job", response_model=SaranaJobSubmitResponse, status_code=202)
+async def submit_parse_job_endpoint(
+    request: Request,
+    file: UploadFile = File(..., description="File dokumen yang akan di-parse"),
+    file_type: Optional[str] = Form(None, description="Tipe file eksplisit"),
+    ocr_engine: str = Form('tesseract', description="Mesin OCR: 'tesseract', 'easyocr', 'ollama'"),
+    pdf_parsing_method: str = Form('pymupdf', description="Metode parsing PDF: 'pymupdf', 'pdfplumber', 'pymupdf_layout' (kolom angka dari posisi kata)"),
+    filter_entitas_induk: bool = Form(True, description="PDF: hanya halaman laporan Entitas Induk (False = semua halaman)"),
+    output_format: str = Form('text', description="Format output: 'text' atau 'structured_json'"),
+    jenis_pengaju: str = Form('korporat', description="Jenis pengaju: 'korporat' atau 'individu'"),
+    ollama_json_prompt_template: Optional[str] = Form(None, description="Template prompt JSON kustom untuk Ollama"),
+    ollama_vision_model_name: str = Form("llama3.2-vision", description="Model vision Ollama"),
+    ollama_llm_model_json_name: str = Form("llama3", description="Model LLM Ollama untuk ekstraksi JSON"),
+    ollama_api_base_url_param: Optional[str] = Form(None, description="Base URL Ollama API kustom"),
+    early_stop: bool = Form(False, description="PDF: hentikan OCR halaman sisa begitu semua kata kunci punya nilai t dan t-1"),
+    max_ocr_pages: Optional[int] = Form(None, description="PDF: batas jumlah halaman yang di-OCR")
+):
+    """
+    Mendaftarkan job parsing dokumen dan langsung mengembalikan job id (tanpa menunggu OCR).
+    Pantau dengan `GET /jobs/{job_id}` dan ambil hasil dengan `GET /jobs/{job_id}/result`.
+    Upload ulang dokumen yang sama dengan opsi yang sama mengembalikan job yang sudah ada.
+    """
+    opsi_parsing = _opsi_parsing_job(file_type, ocr_engine, pdf_parsing_method, filter_entitas_induk, output_format,
+                                     jenis_pengaju, ollama_json_prompt_template, ollama_vision_model_name,
+                                     ollama_llm_model_json_name, ollama_api_base_url_param)
+    job, job_baru = await _daftarkan_job_upload(file, opsi_parsing, early_stop, max_ocr_pages)
+
+    return SaranaJobSubmitResponse(
+        **job,
+        job_baru=job_baru,
+        status_url=str(request.url_for("get_parse_job_status_endpoint", job_id=job["job_id"])),
+        result_url=str(request.url_for("get_parse_job_result_endpoint", job_id=job["job_id"]))
+    )
+
+@router.get("/jobs/{job_id}", summary="Document Parsing Job Status", response_model=SaranaJobStatusResponse)
+async def get_parse_job_status_endpoint(job_id: str):
+    """Status dan progres per halaman dari job parsing dokumen."""
+    job = await asyncio.to_thread(sarana_jobs.get_pengelola_job_sarana().ambil_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} tidak ditemukan")
+    return SaranaJobStatusResponse(**job)
+
+@router.get("/jobs/{job_id}/result", summary="Document Parsing Job Result", response_model=SaranaParseDocumentResponse,
+            responses={202: {"model": SaranaJobStatusResponse, "description": "Job belum selesai"}})
+async def get_parse_job_result_endpoint(job_id: str):
+    """
+    Hasil parsing job yang sudah selesai (format sama dengan `/document/parse`).
+    Mengembalikan 202 beserta status job jika job masih berjalan.
+    """
+    job = await asyncio.to_thread(sarana_jobs.get_pengelola_job_sarana().ambil_job, job_id, True)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} tidak ditemukan")
+    if job["status"] == sarana_jobs.STATUS_JOB_FAILED:
+        raise HTTPException(status_code=422, detail=f"Error dalam parsing dokumen: {job['error']}")
+    if job["status"] != sarana_jobs.STATUS_JOB_DONE:
+        job.pop("hasil", None)
+        return JSONResponse(status_code=202, content=SaranaJobStatusResponse(**job).model_dump())
+    return SaranaParseDocumentResponse(**job["hasil"])
+
+@router.get("/jobs/{job_id}/events", summary="Stream Document Parsing Job Progress")
+async def stream_parse_job_events_endpoint(request: Request, job_id: str, format: str = 'sse'):
+    """
+    Stream event progres job (SSE atau NDJSON) sampai job selesai, diakhiri event `hasil` atau `error`.
+    Untuk SSE, header `Last-Event-ID` melanjutkan stream setelah event terakhir yang sudah diterima.
+    """
+    if await asyncio.to_thread(sarana_jobs.get_pengelola_job_sarana().ambil_job, job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} tidak ditemukan")
+    last_event_id = request.headers.get("last-event-id", "")
+    return _streaming_response_job(job_id, format, setelah_urutan=int(last_event_id) if last_event_id.isdigit() else 0)
+
+@router.post("/document/parse/stream", summary="Parse Financial Documents (Streaming Progress)")
+async def parse_document_stream_endpoint(
+    file: UploadFile = File(..., description="File dokumen yang akan di-parse"),
+    file_type: Optional[str] = Form(None, description="Tipe file eksplisit"),
+    ocr_engine: str = Form('tesseract', description="Mesin OCR: 'tesseract', 'easyocr', 'ollama'"),
+    pdf_parsing_method: str = Form('pymupdf', description="Metode parsing PDF: 'pymupdf', 'pdfplumber', 'pymupdf_layout' (kolom angka dari posisi kata)"),
+    filter_entitas_induk: bool = Form(True, description="PDF: hanya halaman laporan Entitas Induk (False = semua halaman)"),
+    output_format: str = Form('text', description="Format output: 'text' atau 'structured_json'"),
+    jenis_pengaju: str = Form('korporat', description="Jenis pengaju: 'korporat' atau 'individu'"),
+    ollama_json_prompt_template: Optional[str] = Form(None, description="Template prompt JSON kustom untuk Ollama"),
+    ollama_vision_model_name: str = Form("llama3.2-vision", description="Model vision Ollama"),
+    ollama_llm_model_json_name: str = Form("llama3", description="Model LLM Ollama untuk ekstraksi JSON"),
+    ollama_api_base_url_param: Optional[str] = Form(None, description="Base URL Ollama API kustom"),
+    early_stop: bool = Form(False, description="PDF: hentikan OCR halaman sisa begitu semua kata kunci punya nilai t dan t-1"),
+    max_ocr_pages: Optional[int] = Form(None, description="PDF: batas jumlah halaman yang di-OCR"),
+    stream_format: str = Form('sse', description="Format stream: 'sse' (text/event-stream) atau 'ndjson'")
+):
+    """
+    Varian `/document/parse` yang mengirim progres selagi dokumen diproses: event `job` (job id), `status`,
+    `render_pdf`/`ocr_pdf` per halaman (termasuk hit cache), `kata_kunci_halaman` (kata kunci yang ditemukan
+    sejauh ini), lalu event akhir `hasil` berisi respons yang sama dengan `/document/parse`, atau `error`.
+    Parsing berjalan sebagai job; jika koneksi putus, lanjutkan dengan `GET /jobs/{job_id}/events`.
+    """
+    if stream_format not in MEDIA_TYPE_STREAM_SARANA:
+        raise HTTPException(status_code=422, detail=f"Format stream tidak dikenal: {stream_format} (pilih 'sse' atau 'ndjson')")
+    opsi_parsing = _opsi_parsing_job(file_type, ocr_engine, pdf_parsing_method, filter_entitas_induk, output_format,
+                                     jenis_pengaju, ollama_json_prompt_template, ollama_vision_model_name,
+                                     ollama_llm_model_json_name, ollama_api_base_url_param)
+    job, job_baru = await _daftarkan_job_upload(file, opsi_parsing, early_stop, max_ocr_pages)
+    return _streaming_response_job(job["job_id"], stream_format,
+                                   event_awal={"tahap": "job", "job_id": job["job_id"], "job_baru": job_baru})
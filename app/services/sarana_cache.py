@@ -0,0 +1,325 @@
+import os
+import json
+import time
+import zlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Cache bertingkat untuk hasil parsing Sarana (teks dokumen, hasil OCR per halaman, hasil parsing penuh).
+# Tingkat 1: LRU di memori proses dengan batas byte. Tingkat 2: disk, dipecah per prefiks kunci
+# (<direktori>/<2 karakter awal kunci>/<kunci>.json.z), isi JSON ringkas terkompresi zlib, ditulis ke file
+# temporer lalu os.replace agar worker lain tidak pernah membaca file setengah jadi.
+# Total ukuran disk dibatasi; jika terlampaui, entri yang paling lama tidak diakses (mtime) dihapus lebih dulu.
+
+SARANA_CACHE_MEMORY_MAX_BYTES = int(os.environ.get("SARANA_CACHE_MEMORY_MAX_BYTES", 64 * 1024 * 1024))
+SARANA_CACHE_DISK_MAX_BYTES = int(os.environ.get("SARANA_CACHE_DISK_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+SARANA_CACHE_COMPRESSION_LEVEL = int(os.environ.get("SARANA_CACHE_COMPRESSION_LEVEL", 6))
+# Setelah eviksi, ukuran disk diturunkan sampai porsi ini dari batas agar eviksi tidak terjadi di setiap simpan.
+RASIO_TARGET_EVIKSI_DISK = 0.9
+EKSTENSI_CACHE_DISK = ".json.z"
+
+
+def serialisasi_cache_sarana(data: dict) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def deserialisasi_cache_sarana(payload: bytes) -> dict:
+    return json.loads(payload.decode('utf-8'))
+
+
+class _PenghitungCacheSarana:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.nilai = {"hit_memori": 0, "hit_disk": 0, "miss": 0, "simpan": 0,
+                      "eviksi_memori": 0, "eviksi_disk": 0, "error": 0}
+
+    def tambah(self, nama: str, jumlah: int = 1):
+        with self._lock:
+            self.nilai[nama] += jumlah
+
+    def salinan(self) -> dict:
+        with self._lock:
+            return dict(self.nilai)
+
+
+class CacheMemoriLRUSarana:
+    """Tingkat memori: OrderedDict kunci -> payload bytes, dibatasi total byte payload."""
+
+    def __init__(self, maks_byte: int, penghitung: _PenghitungCacheSarana):
+        self.maks_byte = maks_byte
+        self.penghitung = penghitung
+        self._lock = threading.Lock()
+        self._entri: OrderedDict[str, bytes] = OrderedDict()
+        self._total_byte = 0
+
+    def ambil(self, kunci: str) -> bytes | None:
+        with self._lock:
+            payload = self._entri.get(kunci)
+            if payload is not None:
+                self._entri.move_to_end(kunci)
+            return payload
+
+    def simpan(self, kunci: str, payload: bytes):
+        if len(payload) > self.maks_byte:
+            return # Entri lebih besar dari seluruh anggaran; cukup disimpan di disk
+        with self._lock:
+            lama = self._entri.pop(kunci, None)
+            if lama is not None:
+                self._total_byte -= len(lama)
+            self._entri[kunci] = payload
+            self._total_byte += len(payload)
+            while self._total_byte > self.maks_byte and self._entri:
+                _, dibuang = self._entri.popitem(last=False)
+                self._total_byte -= len(dibuang)
+                self.penghitung.tambah("eviksi_memori")
+
+    def hapus(self, kunci: str):
+        with self._lock:
+            lama = self._entri.pop(kunci, None)
+            if lama is not None:
+                self._total_byte -= len(lama)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"entri": len(self._entri), "byte": self._total_byte, "maks_byte": self.maks_byte}
+
+
+class CacheDiskSarana:
+    """Tingkat disk: file terkompresi per kunci, dipecah per prefiks, ditulis atomik, dibatasi total ukuran."""
+
+    def __init__(self, direktori: str, maks_byte: int, penghitung: _PenghitungCacheSarana,
+                 level_kompresi: int = SARANA_CACHE_COMPRESSION_LEVEL):
+        self.direktori = direktori
+        self.maks_byte = maks_byte
+        self.level_kompresi = level_kompresi
+        self.penghitung = penghitung
+        self._lock = threading.Lock()
+        # Perkiraan total ukuran; dihitung ulang dari disk saat pertama kali dibutuhkan dan saat eviksi,
+        # karena worker lain bisa menulis ke direktori yang sama.
+        self._perkiraan_total_byte = None
+
+    def _path(self, kunci: str) -> str:
+        return os.path.join(self.direktori, kunci[:2], f"{kunci}{EKSTENSI_CACHE_DISK}")
+
+    def _path_lama(self, kunci: str) -> str:
+        # Format lama: satu file JSON ber-indentasi per kunci di direktori datar
+        return os.path.join(self.direktori, f"{kunci}.json")
+
+    def ambil(self, kunci: str) -> bytes | None:
+        path_file = self._path(kunci)
+        try:
+            with open(path_file, 'rb') as berkas:
+                payload = zlib.decompress(berkas.read())
+        except FileNotFoundError:
+            return self._ambil_format_lama(kunci)
+        except (OSError, zlib.error) as e:
+            print(f"Error (SaranaCache) saat membaca cache disk ({kunci}): {e}. Entri dihapus.")
+            self.penghitung.tambah("error")
+            self._hapus_file(path_file)
+            return None
+        try:
+            os.utime(path_file) # Tandai sebagai baru diakses untuk urutan LRU
+        except OSError:
+            pass
+        return payload
+
+    def _ambil_format_lama(self, kunci: str) -> bytes | None:
+        path_lama = self._path_lama(kunci)
+        if not os.path.exists(path_lama):
+            return None
+        try:
+            with open(path_lama, 'r', encoding='utf-8') as berkas:
+                payload = serialisasi_cache_sarana(json.load(berkas))
+        except Exception as e:
+            print(f"Error (SaranaCache) saat membaca cache format lama ({kunci}): {e}")
+            self.penghitung.tambah("error")
+            return None
+        # Pindahkan ke format baru sekali saja
+        if self.simpan(kunci, payload):
+            self._hapus_file(path_lama)
+        return payload
+
+    def simpan(self, kunci: str, payload: bytes) -> bool:
+        path_file = self._path(kunci)
+        direktori_shard = os.path.dirname(path_file)
+        path_temp = None
+        try:
+            os.makedirs(direktori_shard, exist_ok=True)
+            data_terkompresi = zlib.compress(payload, self.level_kompresi)
+            fd, path_temp = tempfile.mkstemp(dir=direktori_shard, prefix=".tmp-", suffix=EKSTENSI_CACHE_DISK)
+            with os.fdopen(fd, 'wb') as berkas:
+                berkas.write(data_terkompresi)
+            os.replace(path_temp, path_file)
+            path_temp = None
+        except Exception as e:
+            print(f"Error (SaranaCache) saat menyimpan ke cache disk ({kunci}): {e}")
+            self.penghitung.tambah("error")
+            return False
+        finally:
+            if path_temp is not None:
+                self._hapus_file(path_temp)
+        self._catat_penambahan(len(data_terkompresi))
+        return True
+
+    def hapus(self, kunci: str):
+        self._hapus_file(self._path(kunci))
+        self._hapus_file(self._path_lama(kunci))
+
+    @staticmethod
+    def _hapus_file(path_file: str):
+        try:
+            os.remove(path_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Warning: Gagal menghapus file cache {path_file}: {e}")
+
+    def _daftar_entri(self) -> list[tuple[float, int, str]]:
+        """(mtime, ukuran, path) untuk semua entri cache di disk, termasuk file format lama."""
+        entri = []
+        if not os.path.isdir(self.direktori):
+            return entri
+        for akar, _, daftar_file in os.walk(self.direktori):
+            for nama_file in daftar_file:
+                if not (nama_file.endswith(EKSTENSI_CACHE_DISK) or nama_file.endswith(".json")) or nama_file.startswith(".tmp-"):
+                    continue
+                path_file = os.path.join(akar, nama_file)
+                try:
+                    info = os.stat(path_file)
+                except OSError:
+                    continue
+                entri.append((info.st_mtime, info.st_size, path_file))
+        return entri
+
+    def _catat_penambahan(self, ukuran: int):
+        with self._lock:
+            if self._perkiraan_total_byte is None:
+                self._perkiraan_total_byte = sum(e[1] for e in self._daftar_entri())
+            else:
+                self._perkiraan_total_byte += ukuran
+            perlu_eviksi = self._perkiraan_total_byte > self.maks_byte
+        if perlu_eviksi:
+            self.eviksi()
+
+    def eviksi(self):
+        """Menghapus entri yang paling lama tidak diakses sampai total ukuran di bawah target."""
+        with self._lock:
+            entri = sorted(self._daftar_entri())
+            total_byte = sum(e[1] for e in entri)
+            target_byte = int(self.maks_byte * RASIO_TARGET_EVIKSI_DISK)
+            jumlah_dihapus = 0
+            for _, ukuran, path_file in entri:
+                if total_byte <= target_byte:
+                    break
+                self._hapus_file(path_file)
+                total_byte -= ukuran
+                jumlah_dihapus += 1
+            self._perkiraan_total_byte = total_byte
+        if jumlah_dihapus:
+            self.penghitung.tambah("eviksi_disk", jumlah_dihapus)
+            print(f"INFO (SaranaCache): {jumlah_dihapus} entri cache disk dihapus (LRU), ukuran sekarang {total_byte} byte.")
+
+    def bersihkan_kadaluarsa(self, batas_usia_detik: int) -> int:
+        waktu_sekarang = time.time()
+        jumlah_dihapus = 0
+        with self._lock:
+            for mtime, _, path_file in self._daftar_entri():
+                if waktu_sekarang - mtime > batas_usia_detik:
+                    self._hapus_file(path_file)
+                    jumlah_dihapus += 1
+            self._perkiraan_total_byte = None
+        return jumlah_dihapus
+
+    def status(self) -> dict:
+        entri = self._daftar_entri()
+        return {"direktori": self.direktori, "entri": len(entri), "byte": sum(e[1] for e in entri), "maks_byte": self.maks_byte}
+
+
+class CacheBertingkatSarana:
+    """
+    Gabungan beberapa tingkat cache (urut dari tercepat). Setiap tingkat cukup menyediakan
+    ambil(kunci) -> bytes | None, simpan(kunci, bytes) dan hapus(kunci); hit di tingkat bawah
+    diangkat ke tingkat di atasnya.
+    """
+
+    def __init__(self, tingkat: list, penghitung: _PenghitungCacheSarana | None = None):
+        self.tingkat = tingkat
+        self.penghitung = penghitung or _PenghitungCacheSarana()
+
+    def ambil(self, kunci: str) -> dict | None:
+        if not kunci:
+            return None
+        for indeks, tingkat_cache in enumerate(self.tingkat):
+            payload = tingkat_cache.ambil(kunci)
+            if payload is None:
+                continue
+            try:
+                data = deserialisasi_cache_sarana(payload)
+            except ValueError as e:
+                print(f"Error (SaranaCache) saat membaca entri cache ({kunci}): {e}. Entri dihapus.")
+                self.penghitung.tambah("error")
+                self.hapus(kunci)
+                return None
+            for tingkat_atas in self.tingkat[:indeks]:
+                tingkat_atas.simpan(kunci, payload)
+            self.penghitung.tambah("hit_memori" if indeks == 0 else "hit_disk")
+            return data
+        self.penghitung.tambah("miss")
+        return None
+
+    def simpan(self, kunci: str, data: dict) -> bool:
+        if not kunci:
+            return False
+        try:
+            payload = serialisasi_cache_sarana(data)
+        except (TypeError, ValueError) as e:
+            print(f"Error (SaranaCache) saat serialisasi data cache ({kunci}): {e}")
+            self.penghitung.tambah("error")
+            return False
+        berhasil = True
+        for tingkat_cache in reversed(self.tingkat):
+            if tingkat_cache.simpan(kunci, payload) is False:
+                berhasil = False
+        self.penghitung.tambah("simpan")
+        return berhasil
+
+    def hapus(self, kunci: str):
+        for tingkat_cache in self.tingkat:
+            tingkat_cache.hapus(kunci)
+
+    def status(self) -> dict:
+        return {
+            "counters": self.penghitung.salinan(),
+            "tiers": [dict(t.status(), tier=type(t).__name__) if hasattr(t, "status") else {"tier": type(t).__name__}
+                      for t in self.tingkat],
+        }
+
+
+_cache_per_direktori: dict[str, CacheBertingkatSarana] = {}
+_cache_lock = threading.Lock()
+
+
+def buat_cache_default_sarana(direktori: str) -> CacheBertingkatSarana:
+    penghitung = _PenghitungCacheSarana()
+    tingkat_memori = CacheMemoriLRUSarana(SARANA_CACHE_MEMORY_MAX_BYTES, penghitung)
+    tingkat_disk = CacheDiskSarana(direktori, SARANA_CACHE_DISK_MAX_BYTES, penghitung)
+    return CacheBertingkatSarana([tingkat_memori, tingkat_disk], penghitung)
+
+
+def get_cache_sarana(direktori: str) -> CacheBertingkatSarana:
+    """Satu cache bertingkat per direktori per proses."""
+    kunci_direktori = os.path.abspath(direktori)
+    cache = _cache_per_direktori.get(kunci_direktori)
+    if cache is None:
+        with _cache_lock:
+            cache = _cache_per_direktori.get(kunci_direktori)
+            if cache is None:
+                cache = buat_cache_default_sarana(direktori)
+                _cache_per_direktori[kunci_direktori] = cache
+    return cache
+
+
+def status_cache_sarana() -> dict:
+    """Counter dan ukuran tiap cache di proses ini (counter bersifat per proses, disk dipakai bersama)."""
+    return {direktori: cache.status() for direktori, cache in list(_cache_per_direktori.items())}
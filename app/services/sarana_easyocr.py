@@ -0,0 +1,190 @@
+import os
+import gc
+import time
+import threading
+import importlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Pool reader EasyOCR per proses. Membuat easyocr.Reader memuat model deteksi (CRAFT) dan rekognisi dari disk,
+# butuh beberapa detik dan ratusan MB, jadi reader dibuat sekali per kombinasi (bahasa, GPU) lalu dipakai ulang
+# oleh semua thread OCR halaman PDF di proses ini. Total memori reader dibatasi; reader yang tidak sedang dipakai
+# dan paling lama tidak diakses dilepas lebih dulu saat anggaran terlampaui.
+
+SARANA_EASYOCR_MAX_MEMORY_BYTES = int(os.environ.get("SARANA_EASYOCR_MAX_MEMORY_BYTES", 1536 * 1024 * 1024))
+# Perkiraan memori satu reader sebelum dibuat (untuk memutuskan apakah perlu eviksi); setelah dibuat
+# diganti ukuran parameter model sebenarnya jika torch tersedia.
+SARANA_EASYOCR_READER_BYTES = int(os.environ.get("SARANA_EASYOCR_READER_BYTES", 512 * 1024 * 1024))
+# Lama maksimum menunggu reader lain dilepas jika anggaran memori penuh oleh reader yang sedang dipakai.
+SARANA_EASYOCR_WAIT_SECONDS = float(os.environ.get("SARANA_EASYOCR_WAIT_SECONDS", 300))
+SARANA_EASYOCR_MODEL_DIR = os.environ.get("SARANA_EASYOCR_MODEL_DIR") or None
+DEFAULT_BAHASA_EASYOCR = ("id", "en")
+
+
+class EasyOCRTidakTersediaError(RuntimeError):
+    """Dilempar saat paket easyocr tidak terinstal."""
+
+
+def _ukuran_model_reader(reader) -> int | None:
+    # Jumlah byte parameter model deteksi + rekognisi; None jika tidak bisa dihitung (misal bukan modul torch).
+    total = 0
+    for nama_model in ("detector", "recognizer"):
+        model = getattr(reader, nama_model, None)
+        if model is None or not hasattr(model, "parameters"):
+            return None
+        total += sum(p.numel() * p.element_size() for p in model.parameters())
+    return total or None
+
+
+class _EntriReaderEasyOCR:
+    def __init__(self, ukuran_byte: int):
+        self.reader = None
+        self.ukuran_byte = ukuran_byte
+        self.dipakai = 0
+        self.terakhir_dipakai = time.time()
+        self.siap = threading.Event()
+        self.error: Exception | None = None
+        # Satu reader dipakai satu thread sekaligus; inferensi torch sendiri sudah paralel di dalam.
+        self.lock_inferensi = threading.Lock()
+
+
+class PoolReaderEasyOCR:
+    """Reader EasyOCR yang dipakai bersama, dikunci per (bahasa, gpu), dengan anggaran memori LRU."""
+
+    def __init__(self, maks_byte: int, estimasi_byte_reader: int, batas_tunggu_detik: float):
+        self.maks_byte = maks_byte
+        self.estimasi_byte_reader = estimasi_byte_reader
+        self.batas_tunggu_detik = batas_tunggu_detik
+        self._kondisi = threading.Condition()
+        self._entri: OrderedDict[tuple, _EntriReaderEasyOCR] = OrderedDict()
+        self._total_byte = 0
+        self._statistik = {"dibuat": 0, "dipakai_ulang": 0, "eviksi": 0, "gagal": 0}
+
+    @staticmethod
+    def buat_kunci(bahasa, gpu: bool) -> tuple:
+        return tuple(sorted(bahasa or DEFAULT_BAHASA_EASYOCR)), bool(gpu)
+
+    def _lepas_satu_yang_menganggur(self) -> bool:
+        # Dipanggil dengan self._kondisi terkunci; urutan OrderedDict = urutan akses (paling lama di depan).
+        for kunci, entri in self._entri.items():
+            if entri.dipakai == 0 and entri.siap.is_set():
+                del self._entri[kunci]
+                self._total_byte -= entri.ukuran_byte
+                entri.reader = None
+                self._statistik["eviksi"] += 1
+                print(f"INFO (SaranaEasyOCR): Reader {kunci} dilepas untuk memenuhi anggaran memori.")
+                gc.collect()
+                return True
+        return False
+
+    def _ambil_atau_pesan_entri(self, kunci: tuple) -> tuple[_EntriReaderEasyOCR, bool]:
+        batas_waktu = time.monotonic() + self.batas_tunggu_detik
+        with self._kondisi:
+            while True:
+                entri = self._entri.get(kunci)
+                if entri is not None:
+                    self._entri.move_to_end(kunci)
+                    entri.dipakai += 1
+                    self._statistik["dipakai_ulang"] += 1
+                    return entri, False
+                if not self._entri or self._total_byte + self.estimasi_byte_reader <= self.maks_byte:
+                    entri = _EntriReaderEasyOCR(self.estimasi_byte_reader)
+                    entri.dipakai = 1
+                    self._entri[kunci] = entri
+                    self._total_byte += entri.ukuran_byte
+                    return entri, True
+                if self._lepas_satu_yang_menganggur():
+                    continue
+                sisa_waktu = batas_waktu - time.monotonic()
+                if sisa_waktu <= 0:
+                    raise TimeoutError(
+                        f"Anggaran memori EasyOCR ({self.maks_byte} byte) penuh oleh reader yang sedang dipakai."
+                    )
+                self._kondisi.wait(sisa_waktu)
+
+    def _bangun_reader(self, kunci: tuple, entri: _EntriReaderEasyOCR):
+        bahasa, gpu = kunci
+        waktu_mulai = time.perf_counter()
+        try:
+            try:
+                easyocr = importlib.import_module("easyocr")
+            except ImportError as e:
+                raise EasyOCRTidakTersediaError("easyocr tidak terinstal. Install dengan 'pip install easyocr'.") from e
+            entri.reader = easyocr.Reader(list(bahasa), gpu=gpu, model_storage_directory=SARANA_EASYOCR_MODEL_DIR,
+                                          verbose=False)
+        except Exception as e:
+            with self._kondisi:
+                if self._entri.get(kunci) is entri:
+                    del self._entri[kunci]
+                    self._total_byte -= entri.ukuran_byte
+                self._statistik["gagal"] += 1
+                entri.error = e
+                entri.siap.set()
+                self._kondisi.notify_all()
+            raise
+        ukuran_model = _ukuran_model_reader(entri.reader)
+        with self._kondisi:
+            if ukuran_model:
+                self._total_byte += ukuran_model - entri.ukuran_byte
+                entri.ukuran_byte = ukuran_model
+            self._statistik["dibuat"] += 1
+            entri.siap.set()
+            self._kondisi.notify_all()
+        print(f"INFO (SaranaEasyOCR): Reader {kunci} dibuat dalam {time.perf_counter() - waktu_mulai:.1f} detik "
+              f"(~{entri.ukuran_byte // (1024 * 1024)} MB).")
+
+    @contextmanager
+    def pinjam(self, bahasa=None, gpu: bool = False):
+        """Meminjam reader untuk (bahasa, gpu); dibuat saat pertama kali dibutuhkan, dikembalikan saat keluar blok."""
+        kunci = self.buat_kunci(bahasa, gpu)
+        entri, harus_dibuat = self._ambil_atau_pesan_entri(kunci)
+        try:
+            if harus_dibuat:
+                self._bangun_reader(kunci, entri)
+            else:
+                entri.siap.wait()
+                if entri.error is not None:
+                    raise entri.error
+            with entri.lock_inferensi:
+                yield entri.reader
+        finally:
+            with self._kondisi:
+                entri.dipakai -= 1
+                entri.terakhir_dipakai = time.time()
+                self._kondisi.notify_all()
+
+    def status(self) -> dict:
+        with self._kondisi:
+            return {
+                "pid": os.getpid(),
+                "memory_bytes": self._total_byte,
+                "memory_budget_bytes": self.maks_byte,
+                "readers": [
+                    {"bahasa": list(kunci[0]), "gpu": kunci[1], "ukuran_byte": entri.ukuran_byte,
+                     "dipakai": entri.dipakai, "siap": entri.siap.is_set()}
+                    for kunci, entri in self._entri.items()
+                ],
+                **self._statistik,
+            }
+
+
+_pool_reader_easyocr: PoolReaderEasyOCR | None = None
+_pool_reader_easyocr_lock = threading.Lock()
+
+
+def get_pool_reader_easyocr() -> PoolReaderEasyOCR:
+    global _pool_reader_easyocr
+    with _pool_reader_easyocr_lock:
+        if _pool_reader_easyocr is None:
+            _pool_reader_easyocr = PoolReaderEasyOCR(
+                SARANA_EASYOCR_MAX_MEMORY_BYTES, SARANA_EASYOCR_READER_BYTES, SARANA_EASYOCR_WAIT_SECONDS
+            )
+        return _pool_reader_easyocr
+
+
+def pinjam_reader_easyocr(bahasa=None, gpu: bool = False):
+    return get_pool_reader_easyocr().pinjam(bahasa, gpu)
+
+
+def status_pool_reader_easyocr() -> dict:
+    return get_pool_reader_easyocr().status()
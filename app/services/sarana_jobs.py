@@ -0,0 +1,410 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import hashlib
+import threading
+import functools
+
+from . import sarana_service, sarana_pool
+
+# Job parsing dokumen Sarana yang berjalan di latar belakang.
+# Upload disimpan di disk, status & hasil di SQLite, dan pekerjaan dijalankan lewat pool proses Sarana.
+# Karena antrian ada di SQLite, job yang belum selesai saat server berhenti akan dijalankan lagi saat start.
+# Job 'running' dicatat pemiliknya (instans PengelolaJobSarana) dan diperbarui detaknya oleh dispatcher, sehingga
+# beberapa proses server yang berbagi DB hanya memulihkan job yang detaknya sudah basi, bukan job milik proses lain.
+# Setiap event progres juga dicatat berurutan di tabel sarana_job_events untuk endpoint streaming (SSE/NDJSON).
+
+SARANA_JOBS_DIR = os.environ.get(
+    "SARANA_JOBS_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "temp_sarana_uploads", "jobs")
+)
+SARANA_JOBS_DB_PATH = os.environ.get("SARANA_JOBS_DB_PATH", os.path.join(SARANA_JOBS_DIR, "sarana_jobs.sqlite3"))
+SARANA_JOBS_RETENTION_SECONDS = int(os.environ.get("SARANA_JOBS_RETENTION_SECONDS", 7 * 24 * 60 * 60))
+SARANA_JOBS_DISPATCH_INTERVAL_SECONDS = float(os.environ.get("SARANA_JOBS_DISPATCH_INTERVAL_SECONDS", 2.0))
+# Job 'running' yang detak pemiliknya lebih lama dari ini dianggap yatim (proses pemilik mati) dan diantrikan lagi
+SARANA_JOBS_STALE_SECONDS = float(os.environ.get("SARANA_JOBS_STALE_SECONDS", 60.0))
+# Event progres per halaman (render_pdf/ocr_pdf) ditampung dan ditulis ke SQLite paling sering sekali per interval ini
+SARANA_JOBS_PROGRESS_FLUSH_SECONDS = float(os.environ.get("SARANA_JOBS_PROGRESS_FLUSH_SECONDS", 0.5))
+TAHAP_PROGRES_PER_HALAMAN = ("render_pdf", "ocr_pdf")
+
+STATUS_JOB_QUEUED = "queued"
+STATUS_JOB_RUNNING = "running"
+STATUS_JOB_DONE = "done"
+STATUS_JOB_FAILED = "failed"
+
+
+def _buka_koneksi_db(path_db: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    koneksi = sqlite3.connect(path_db, timeout=30, isolation_level=None, check_same_thread=check_same_thread)
+    koneksi.row_factory = sqlite3.Row
+    koneksi.execute("PRAGMA journal_mode=WAL")
+    koneksi.execute("PRAGMA synchronous=NORMAL")
+    return koneksi
+
+
+def _inisialisasi_db(path_db: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path_db)), exist_ok=True)
+    koneksi = _buka_koneksi_db(path_db)
+    try:
+        koneksi.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sarana_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                nama_file TEXT NOT NULL,
+                path_file TEXT NOT NULL,
+                hash_konten TEXT,
+                kunci_dedup TEXT,
+                opsi TEXT NOT NULL,
+                progres TEXT,
+                hasil TEXT,
+                error TEXT,
+                waktu_dibuat REAL NOT NULL,
+                waktu_mulai REAL,
+                waktu_selesai REAL,
+                pemilik TEXT,
+                detak_terakhir REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sarana_jobs_status ON sarana_jobs (status, waktu_dibuat);
+            CREATE INDEX IF NOT EXISTS idx_sarana_jobs_dedup ON sarana_jobs (kunci_dedup);
+            CREATE TABLE IF NOT EXISTS sarana_job_events (
+                job_id TEXT NOT NULL,
+                urutan INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                waktu REAL NOT NULL,
+                PRIMARY KEY (job_id, urutan)
+            );
+            """
+        )
+        # DB dari versi sebelum kolom pemilik/detak_terakhir ada
+        kolom_ada = {baris["name"] for baris in koneksi.execute("PRAGMA table_info(sarana_jobs)")}
+        for nama_kolom, tipe in (("pemilik", "TEXT"), ("detak_terakhir", "REAL")):
+            if nama_kolom not in kolom_ada:
+                koneksi.execute(f"ALTER TABLE sarana_jobs ADD COLUMN {nama_kolom} {tipe}")
+    finally:
+        koneksi.close()
+
+
+def _baris_ke_job(baris: sqlite3.Row, sertakan_hasil: bool = False) -> dict:
+    job = {
+        "job_id": baris["id"],
+        "status": baris["status"],
+        "nama_file": baris["nama_file"],
+        "progres": json.loads(baris["progres"]) if baris["progres"] else {},
+        "error": baris["error"],
+        "waktu_dibuat": baris["waktu_dibuat"],
+        "waktu_mulai": baris["waktu_mulai"],
+        "waktu_selesai": baris["waktu_selesai"],
+    }
+    if sertakan_hasil:
+        job["hasil"] = json.loads(baris["hasil"]) if baris["hasil"] else None
+    return job
+
+
+def _hapus_file_upload_job(path_file: str):
+    if path_file and os.path.exists(path_file):
+        try:
+            os.remove(path_file)
+        except Exception as e:
+            print(f"Warning (SaranaJobs): Gagal menghapus file upload job {path_file}: {e}")
+
+
+def jalankan_job_sarana(id_job: str, path_db: str, opsi_parsing: dict) -> dict:
+    """
+    Dijalankan di proses worker pool. Memanggil parse_document_sarana dan menulis progres
+    (per tahap / per halaman) ke SQLite supaya bisa dipantau lewat GET /jobs/{id}; setiap event juga
+    ditambahkan ke sarana_job_events untuk GET /jobs/{id}/events.
+    Satu koneksi dipakai selama job. Event per halaman ditampung dan ditulis bersama dalam satu transaksi
+    paling sering sekali per SARANA_JOBS_PROGRESS_FLUSH_SECONDS; event tahap lain langsung ditulis.
+    """
+    progres = {}
+    event_tertunda = [] # [(urutan, event, waktu)] yang belum ditulis
+    waktu_tulis_terakhir = [0.0]
+    lock_progres = threading.Lock() # Event OCR halaman datang dari beberapa thread sekaligus
+    # Dipakai dari thread OCR mana pun, selalu di bawah lock_progres
+    koneksi = _buka_koneksi_db(path_db, check_same_thread=False)
+    # Job yang dipulihkan setelah restart melanjutkan urutan event lamanya
+    urutan = [koneksi.execute("SELECT COALESCE(MAX(urutan), 0) FROM sarana_job_events WHERE job_id = ?",
+                              (id_job,)).fetchone()[0]]
+
+    def _tulis_event_tertunda():
+        if not event_tertunda:
+            return
+        koneksi.execute("BEGIN")
+        try:
+            koneksi.execute("UPDATE sarana_jobs SET progres = ? WHERE id = ?", (json.dumps(progres, default=str), id_job))
+            koneksi.executemany(
+                "INSERT INTO sarana_job_events (job_id, urutan, event, waktu) VALUES (?, ?, ?, ?)",
+                [(id_job, nomor, json.dumps(event, ensure_ascii=False, default=str), waktu)
+                 for nomor, event, waktu in event_tertunda],
+            )
+            koneksi.execute("COMMIT")
+        except Exception:
+            koneksi.execute("ROLLBACK")
+            raise
+        event_tertunda.clear()
+        waktu_tulis_terakhir[0] = time.time()
+
+    def _simpan_progres(event: dict):
+        with lock_progres:
+            waktu = time.time()
+            progres.update(event)
+            progres["diperbarui"] = waktu
+            urutan[0] += 1
+            event_tertunda.append((urutan[0], event, waktu))
+            if (event.get("tahap") not in TAHAP_PROGRES_PER_HALAMAN
+                    or waktu - waktu_tulis_terakhir[0] >= SARANA_JOBS_PROGRESS_FLUSH_SECONDS):
+                _tulis_event_tertunda()
+
+    try:
+        return sarana_service.parse_document_sarana(callback_progres=_simpan_progres, **opsi_parsing)
+    finally:
+        with lock_progres:
+            try:
+                _tulis_event_tertunda()
+            except Exception as e:
+                print(f"Warning (SaranaJobs): Gagal menulis progres terakhir job {id_job}: {e}")
+            koneksi.close()
+
+
+class PengelolaJobSarana:
+    """Menyimpan job di SQLite dan mengirimkannya ke pool proses Sarana saat ada worker kosong."""
+
+    def __init__(self, path_db: str, direktori_upload: str):
+        self.path_db = path_db
+        self.direktori_upload = direktori_upload
+        self._bangunkan = threading.Event()
+        self._berhenti = threading.Event()
+        self._lock_dispatch = threading.Lock()
+        self._thread: threading.Thread | None = None
+        # Identitas unik per instans (bukan per host): beberapa worker uvicorn bisa berbagi host dan DB yang sama
+        self.id_instans = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def mulai(self):
+        if self._thread is not None:
+            return
+        os.makedirs(self.direktori_upload, exist_ok=True)
+        _inisialisasi_db(self.path_db)
+        jumlah_dipulihkan = self._pulihkan_job_yatim()
+        koneksi = _buka_koneksi_db(self.path_db)
+        try:
+            batas_waktu = time.time() - SARANA_JOBS_RETENTION_SECONDS
+            jumlah_dihapus = koneksi.execute(
+                "DELETE FROM sarana_jobs WHERE status IN (?, ?) AND waktu_selesai < ?",
+                (STATUS_JOB_DONE, STATUS_JOB_FAILED, batas_waktu),
+            ).rowcount
+            koneksi.execute("DELETE FROM sarana_job_events WHERE job_id NOT IN (SELECT id FROM sarana_jobs)")
+        finally:
+            koneksi.close()
+        if jumlah_dipulihkan or jumlah_dihapus:
+            print(f"INFO (SaranaJobs): {jumlah_dipulihkan} job dipulihkan ke antrian, {jumlah_dihapus} job lama dihapus.")
+        self._berhenti.clear()
+        self._thread = threading.Thread(target=self._loop_dispatcher, name="sarana-job-dispatcher", daemon=True)
+        self._thread.start()
+        self._bangunkan.set()
+
+    def hentikan(self):
+        self._berhenti.set()
+        self._bangunkan.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _pulihkan_job_yatim(self) -> int:
+        """
+        Job 'running' yang pemiliknya tidak lagi memperbarui detak (proses mati saat job berjalan) dikembalikan ke
+        antrian. Job milik instans lain yang masih hidup tidak disentuh.
+        """
+        koneksi = _buka_koneksi_db(self.path_db)
+        try:
+            return koneksi.execute(
+                "UPDATE sarana_jobs SET status = ?, waktu_mulai = NULL, pemilik = NULL, detak_terakhir = NULL "
+                "WHERE status = ? AND (pemilik IS NULL OR detak_terakhir IS NULL OR detak_terakhir < ?)",
+                (STATUS_JOB_QUEUED, STATUS_JOB_RUNNING, time.time() - SARANA_JOBS_STALE_SECONDS),
+            ).rowcount
+        finally:
+            koneksi.close()
+
+    def _perbarui_detak(self):
+        koneksi = _buka_koneksi_db(self.path_db)
+        try:
+            koneksi.execute(
+                "UPDATE sarana_jobs SET detak_terakhir = ? WHERE pemilik = ? AND status = ?",
+                (time.time(), self.id_instans, STATUS_JOB_RUNNING),
+            )
+        finally:
+            koneksi.close()
+
+    def buat_job(self, path_file: str, nama_file: str, hash_konten: str | None, opsi_parsing: dict) -> tuple[dict, bool]:
+        """
+        Mendaftarkan job baru untuk file yang sudah disimpan di `path_file`.
+        Jika isi berkas dan opsinya sama dengan job yang masih aktif atau sudah selesai, job lama dikembalikan
+        (tanpa OCR ulang) dan file upload baru dihapus. Mengembalikan (job, dibuat_baru).
+        """
+        kunci_dedup = None
+        if hash_konten:
+            kunci_dedup = hashlib.sha256(f"{hash_konten}|{sarana_service.sidik_opsi_sarana(opsi_parsing)}".encode("utf-8")).hexdigest()
+        koneksi = _buka_koneksi_db(self.path_db)
+        try:
+            if kunci_dedup:
+                baris = koneksi.execute(
+                    "SELECT * FROM sarana_jobs WHERE kunci_dedup = ? AND status != ? ORDER BY waktu_dibuat DESC LIMIT 1",
+                    (kunci_dedup, STATUS_JOB_FAILED),
+                ).fetchone()
+                if baris is not None:
+                    _hapus_file_upload_job(path_file)
+                    return _baris_ke_job(baris), False
+            id_job = uuid.uuid4().hex
+            koneksi.execute(
+                "INSERT INTO sarana_jobs (id, status, nama_file, path_file, hash_konten, kunci_dedup, opsi, waktu_dibuat) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (id_job, STATUS_JOB_QUEUED, nama_file, path_file, hash_konten, kunci_dedup,
+                 json.dumps(opsi_parsing), time.time()),
+            )
+            baris = koneksi.execute("SELECT * FROM sarana_jobs WHERE id = ?", (id_job,)).fetchone()
+        finally:
+            koneksi.close()
+        self._bangunkan.set()
+        return _baris_ke_job(baris), True
+
+    def ambil_job(self, id_job: str, sertakan_hasil: bool = False) -> dict | None:
+        koneksi = _buka_koneksi_db(self.path_db)
+        try:
+            baris = koneksi.execute("SELECT * FROM sarana_jobs WHERE id = ?", (id_job,)).fetchone()
+        finally:
+            koneksi.close()
+        return _baris_ke_job(baris, sertakan_hasil) if baris is not None else None
+
+    def ambil_event_job(self, id_job: str, setelah_urutan: int = 0, batas: int = 500) -> list[tuple[int, dict]]:
+        """Event progres job dengan urutan > setelah_urutan, sebagai [(urutan, event)] terurut."""
+        koneksi = _buka_koneksi_db(self.path_db)
+        try:
+            daftar_baris = koneksi.execute(
+                "SELECT urutan, event FROM sarana_job_events WHERE job_id = ? AND urutan > ? ORDER BY urutan LIMIT ?",
+                (id_job, setelah_urutan, batas),
+            ).fetchall()
+        finally:
+            koneksi.close()
+        return [(baris["urutan"], json.loads(baris["event"])) for baris in daftar_baris]
+
+    def _loop_dispatcher(self):
+        # Dibangunkan saat ada job baru / job selesai; polling berkala menangkap slot yang
+        # dibebaskan oleh endpoint sinkron yang memakai pool yang sama.
+        while not self._berhenti.is_set():
+            self._bangunkan.wait(SARANA_JOBS_DISPATCH_INTERVAL_SECONDS)
+            self._bangunkan.clear()
+            if self._berhenti.is_set():
+                break
+            try:
+                self._perbarui_detak()
+                jumlah_dipulihkan = self._pulihkan_job_yatim()
+                if jumlah_dipulihkan:
+                    print(f"INFO (SaranaJobs): {jumlah_dipulihkan} job yatim dari instans lain dipulihkan ke antrian.")
+                self._dispatch()
+            except Exception as e:
+                print(f"ERROR (SaranaJobs): Dispatcher gagal: {e}")
+
+    def _dispatch(self):
+        pool = sarana_pool.get_pool_sarana()
+        with self._lock_dispatch:
+            # Hanya isi worker yang kosong; job yang menunggu tetap di SQLite, bukan di antrian pool,
+            # agar antrian pool tetap tersedia untuk request sinkron.
+            while pool.status()["in_flight"] < pool.jumlah_worker:
+                job = self._klaim_job_berikutnya()
+                if job is None:
+                    return
+                id_job, path_file, opsi_parsing = job
+                opsi_parsing["file_path"] = path_file
+                try:
+                    future = pool.kirim(jalankan_job_sarana, id_job, self.path_db, opsi_parsing)
+                except sarana_pool.SaranaPoolPenuhError:
+                    self._ubah_status(id_job, STATUS_JOB_QUEUED, waktu_mulai=None, pemilik=None, detak_terakhir=None)
+                    return
+                except Exception as e:
+                    self._selesaikan_job(id_job, path_file, error=f"Gagal mengirim job ke pool: {e}")
+                    continue
+                future.add_done_callback(functools.partial(self._job_selesai, id_job, path_file))
+
+    def _klaim_job_berikutnya(self) -> tuple[str, str, dict] | None:
+        koneksi = _buka_koneksi_db(self.path_db)
+        try:
+            while True:
+                baris = koneksi.execute(
+                    "SELECT id, path_file, opsi FROM sarana_jobs WHERE status = ? ORDER BY waktu_dibuat LIMIT 1",
+                    (STATUS_JOB_QUEUED,),
+                ).fetchone()
+                if baris is None:
+                    return None
+                waktu = time.time()
+                diklaim = koneksi.execute(
+                    "UPDATE sarana_jobs SET status = ?, waktu_mulai = ?, pemilik = ?, detak_terakhir = ? "
+                    "WHERE id = ? AND status = ?",
+                    (STATUS_JOB_RUNNING, waktu, self.id_instans, waktu, baris["id"], STATUS_JOB_QUEUED),
+                ).rowcount
+                # 0 berarti instans lain mengklaim job ini lebih dulu di antara SELECT dan UPDATE: coba job berikutnya
+                if diklaim == 1:
+                    return baris["id"], baris["path_file"], json.loads(baris["opsi"])
+        finally:
+            koneksi.close()
+
+    def _ubah_status(self, id_job: str, status: str, **kolom) -> bool:
+        # Hanya pemilik klaim yang boleh mengubah job; jika job sudah dipulihkan dan diklaim instans lain, abaikan
+        set_kolom = ", ".join(["status = ?"] + [f"{nama} = ?" for nama in kolom])
+        koneksi = _buka_koneksi_db(self.path_db)
+        try:
+            return koneksi.execute(
+                f"UPDATE sarana_jobs SET {set_kolom} WHERE id = ? AND pemilik = ?",
+                (status, *kolom.values(), id_job, self.id_instans),
+            ).rowcount == 1
+        finally:
+            koneksi.close()
+
+    def _selesaikan_job(self, id_job: str, path_file: str, hasil: dict | None = None, error: str | None = None):
+        if error:
+            tersimpan = self._ubah_status(id_job, STATUS_JOB_FAILED, error=error, waktu_selesai=time.time())
+        else:
+            tersimpan = self._ubah_status(id_job, STATUS_JOB_DONE, hasil=json.dumps(hasil, ensure_ascii=False, default=str),
+                                          waktu_selesai=time.time())
+        if not tersimpan:
+            # Job sudah dipulihkan sebagai yatim dan kini milik instans lain; file upload masih dipakai di sana
+            print(f"Warning (SaranaJobs): Job {id_job} bukan lagi milik instans ini; hasil diabaikan.")
+            return
+        _hapus_file_upload_job(path_file)
+
+    def _job_selesai(self, id_job: str, path_file: str, future):
+        try:
+            if future.cancelled():
+                self._selesaikan_job(id_job, path_file, error="Job dibatalkan")
+            elif future.exception() is not None:
+                self._selesaikan_job(id_job, path_file, error=f"Job gagal: {future.exception()}")
+            else:
+                hasil = future.result()
+                if isinstance(hasil, dict) and hasil.get("error"):
+                    self._selesaikan_job(id_job, path_file, error=hasil["error"])
+                else:
+                    self._selesaikan_job(id_job, path_file, hasil=hasil)
+        except Exception as e:
+            print(f"ERROR (SaranaJobs): Gagal menyimpan hasil job {id_job}: {e}")
+        finally:
+            self._bangunkan.set()
+
+
+_pengelola_job_sarana: PengelolaJobSarana | None = None
+_pengelola_job_sarana_lock = threading.Lock()
+
+
+def get_pengelola_job_sarana() -> PengelolaJobSarana:
+    global _pengelola_job_sarana
+    if _pengelola_job_sarana is None:
+        with _pengelola_job_sarana_lock:
+            if _pengelola_job_sarana is None:
+                pengelola = PengelolaJobSarana(SARANA_JOBS_DB_PATH, SARANA_JOBS_DIR)
+                pengelola.mulai()
+                _pengelola_job_sarana = pengelola
+    return _pengelola_job_sarana
+
+
+def hentikan_pengelola_job_sarana():
+    if _pengelola_job_sarana is not None:
+        _pengelola_job_sarana.hentikan()
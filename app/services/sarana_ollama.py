@@ -0,0 +1,457 @@
+import os
+import re
+import json
+import base64
+import asyncio
+import hashlib
+import weakref
+import threading
+import importlib
+from contextlib import contextmanager, asynccontextmanager
+
+from . import sarana_cache
+
+# Akses Ollama bersama untuk Sarana. Satu ollama.Client per (host, timeout) per proses, sehingga koneksi HTTP
+# (httpx) tetap hidup antar panggilan. Jumlah request bersamaan ke server dibatasi semaphore per model: thread OCR
+# halaman PDF tidak bisa lagi mengirim delapan request vision sekaligus. Respons di-cache per
+# (model, prompt, hash gambar, opsi) di cache bertingkat Sarana karena panggilan vision dan strukturisasi JSON
+# adalah panggilan termahal di Sarana.
+# Sebelum dikirim, gambar diperkecil ke resolusi efektif model vision dan di-encode ulang sebagai JPEG/WebP
+# abu-abu: foto ponsel atau render 600 DPI berukuran megabyte tidak lagi di-base64 utuh ke setiap request.
+# Jalur asyncio (chat_ollama_async_sarana) memakai ollama.AsyncClient dengan stream=True langsung di event loop
+# API: token diteruskan ke pemanggil begitu tiba, dan membatalkan task menutup koneksi HTTP sehingga server
+# Ollama berhenti membangkitkan token untuk request yang sudah ditinggalkan klien.
+# OCR halaman PDF hasil scan bisa dikirim berkelompok: beberapa halaman per request vision (dibatasi jumlah
+# gambar dan perkiraan token gambar), dengan penanda halaman di balasan untuk memecah teks kembali per halaman.
+
+# Host default; jika kosong dipakai default pustaka ollama (env OLLAMA_HOST atau localhost:11434)
+OLLAMA_API_BASE_URL = os.environ.get("OLLAMA_API_BASE_URL") or None
+SARANA_OLLAMA_TIMEOUT_SECONDS = float(os.environ.get("SARANA_OLLAMA_TIMEOUT_SECONDS", 120))
+# Batas request bersamaan per model per proses; bisa ditimpa per model: "llama3.2-vision=1,llama3=4"
+SARANA_OLLAMA_MAX_CONCURRENCY = max(1, int(os.environ.get("SARANA_OLLAMA_MAX_CONCURRENCY", 2)))
+SARANA_OLLAMA_MODEL_CONCURRENCY = {
+    nama.strip(): max(1, int(nilai))
+    for nama, _, nilai in (
+        bagian.partition("=") for bagian in os.environ.get("SARANA_OLLAMA_MODEL_CONCURRENCY", "").split(",")
+    )
+    if nama.strip() and nilai.strip().isdigit()
+}
+SARANA_OLLAMA_CACHE_ENABLED = os.environ.get("SARANA_OLLAMA_CACHE_ENABLED", "true").lower() == "true"
+# Gambar -> JSON terstruktur di /document/parse lewat jalur asyncio streaming (bukan worker pool)
+SARANA_OLLAMA_ASYNC_ENABLED = os.environ.get("SARANA_OLLAMA_ASYNC_ENABLED", "true").lower() == "true"
+# Sisi terpanjang gambar yang dikirim; llama3.2-vision memproses paling banyak 2x2 ubin 560 px. 0 = tanpa resize
+SARANA_OLLAMA_IMAGE_MAX_SIDE = int(os.environ.get("SARANA_OLLAMA_IMAGE_MAX_SIDE", 1120))
+SARANA_OLLAMA_IMAGE_FORMAT = os.environ.get("SARANA_OLLAMA_IMAGE_FORMAT", "jpeg").lower() # 'jpeg', 'webp', 'asli'
+SARANA_OLLAMA_IMAGE_QUALITY = int(os.environ.get("SARANA_OLLAMA_IMAGE_QUALITY", 85))
+SARANA_OLLAMA_IMAGE_GRAYSCALE = os.environ.get("SARANA_OLLAMA_IMAGE_GRAYSCALE", "true").lower() == "true"
+# Model vision untuk OCR halaman/gambar (mesin_ocr='ollama')
+SARANA_OLLAMA_VISION_MODEL = os.environ.get("SARANA_OLLAMA_VISION_MODEL", "llama3.2-vision")
+# Lama model tetap dimuat di server setelah request terakhir ('30m', '-1' = selamanya, kosong = default server)
+SARANA_OLLAMA_KEEP_ALIVE = os.environ.get("SARANA_OLLAMA_KEEP_ALIVE", "30m") or None
+# Halaman per request vision saat OCR PDF. 1 = tanpa batch; llama3.2-vision hanya menerima satu gambar per
+# pesan, jadi batch butuh model multi-gambar (misal qwen2.5vl, gemma3)
+SARANA_OLLAMA_BATCH_MAX_IMAGES = max(1, int(os.environ.get("SARANA_OLLAMA_BATCH_MAX_IMAGES", 1)))
+# Anggaran perkiraan token gambar per request batch; satu token ~ SARANA_OLLAMA_PIXELS_PER_TOKEN piksel
+SARANA_OLLAMA_BATCH_MAX_IMAGE_TOKENS = int(os.environ.get("SARANA_OLLAMA_BATCH_MAX_IMAGE_TOKENS", 8192))
+SARANA_OLLAMA_PIXELS_PER_TOKEN = max(1, int(os.environ.get("SARANA_OLLAMA_PIXELS_PER_TOKEN", 28 * 28)))
+if SARANA_OLLAMA_KEEP_ALIVE and SARANA_OLLAMA_KEEP_ALIVE.lstrip("-").isdigit():
+    SARANA_OLLAMA_KEEP_ALIVE = int(SARANA_OLLAMA_KEEP_ALIVE) # Detik (atau -1); string berakhiran unit dikirim apa adanya
+
+_lock_ollama = threading.Lock()
+_klien_ollama: dict[tuple, object] = {}
+_semafor_model: dict[str, threading.BoundedSemaphore] = {}
+_statistik_ollama = {"panggilan": 0, "hit_cache": 0, "miss_cache": 0, "error": 0,
+                     "byte_gambar_asli": 0, "byte_gambar_terkirim": 0, "dibatalkan": 0, "dihentikan_awal": 0,
+                     "batch": 0, "halaman_batch": 0}
+# AsyncClient (httpx.AsyncClient) dan asyncio.Semaphore terikat ke event loop, jadi disimpan per loop
+_state_async_per_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def _tambah_statistik(nama: str, jumlah: int = 1):
+    with _lock_ollama:
+        _statistik_ollama[nama] += jumlah
+
+
+def get_klien_ollama(host: str | None = None, timeout: float | None = None):
+    """ollama.Client bersama per (host, timeout); dibuat saat pertama kali dipakai."""
+    kunci = (host or OLLAMA_API_BASE_URL, timeout or SARANA_OLLAMA_TIMEOUT_SECONDS)
+    with _lock_ollama:
+        klien = _klien_ollama.get(kunci)
+        if klien is None:
+            ollama = importlib.import_module("ollama")
+            klien = ollama.Client(host=kunci[0], timeout=kunci[1])
+            _klien_ollama[kunci] = klien
+        return klien
+
+
+def _get_semafor_model(model: str) -> threading.BoundedSemaphore:
+    with _lock_ollama:
+        semafor = _semafor_model.get(model)
+        if semafor is None:
+            semafor = threading.BoundedSemaphore(SARANA_OLLAMA_MODEL_CONCURRENCY.get(model, SARANA_OLLAMA_MAX_CONCURRENCY))
+            _semafor_model[model] = semafor
+        return semafor
+
+
+@contextmanager
+def slot_model_ollama(model: str):
+    """Menunggu slot request untuk model ini; slot dilepas saat keluar blok."""
+    semafor = _get_semafor_model(model)
+    with semafor:
+        yield
+
+
+def _state_async_loop() -> dict:
+    loop = asyncio.get_running_loop()
+    state = _state_async_per_loop.get(loop)
+    if state is None:
+        state = {"klien": {}, "semafor": {}}
+        _state_async_per_loop[loop] = state
+    return state
+
+
+def get_klien_async_ollama(host: str | None = None, timeout: float | None = None):
+    """ollama.AsyncClient bersama per (host, timeout) untuk event loop yang sedang berjalan."""
+    kunci = (host or OLLAMA_API_BASE_URL, timeout or SARANA_OLLAMA_TIMEOUT_SECONDS)
+    daftar_klien = _state_async_loop()["klien"]
+    klien = daftar_klien.get(kunci)
+    if klien is None:
+        ollama = importlib.import_module("ollama")
+        klien = ollama.AsyncClient(host=kunci[0], timeout=kunci[1])
+        daftar_klien[kunci] = klien
+    return klien
+
+
+@asynccontextmanager
+async def slot_model_ollama_async(model: str):
+    """Padanan asyncio slot_model_ollama: menunggu tanpa memblokir event loop."""
+    daftar_semafor = _state_async_loop()["semafor"]
+    semafor = daftar_semafor.get(model)
+    if semafor is None:
+        semafor = asyncio.Semaphore(SARANA_OLLAMA_MODEL_CONCURRENCY.get(model, SARANA_OLLAMA_MAX_CONCURRENCY))
+        daftar_semafor[model] = semafor
+    async with semafor:
+        yield
+
+
+def _baca_gambar(gambar: str | bytes) -> bytes:
+    # Gambar dibaca sekali: bytes yang sama dipakai untuk hash kunci cache dan dikirim ke Ollama
+    if isinstance(gambar, (bytes, bytearray, memoryview)):
+        return bytes(gambar)
+    with open(gambar, "rb") as berkas:
+        return berkas.read()
+
+
+def sidik_persiapan_gambar_ollama() -> str:
+    """Pengaturan persiapan gambar; ikut masuk kunci cache karena mengubah input yang dilihat model."""
+    if SARANA_OLLAMA_IMAGE_FORMAT == "asli":
+        return "asli"
+    return (f"{SARANA_OLLAMA_IMAGE_FORMAT}:q{SARANA_OLLAMA_IMAGE_QUALITY}:s{SARANA_OLLAMA_IMAGE_MAX_SIDE}"
+            f":g{int(SARANA_OLLAMA_IMAGE_GRAYSCALE)}")
+
+
+def _encode_ulang_gambar(gambar: bytes) -> bytes:
+    cv2 = importlib.import_module("cv2")
+    np = importlib.import_module("numpy")
+    # imdecode menerapkan orientasi EXIF, jadi foto ponsel tetap tegak
+    mode_baca = cv2.IMREAD_GRAYSCALE if SARANA_OLLAMA_IMAGE_GRAYSCALE else cv2.IMREAD_COLOR
+    gambar_cv = cv2.imdecode(np.frombuffer(gambar, dtype=np.uint8), mode_baca)
+    if gambar_cv is None:
+        return gambar # Format tidak dikenali OpenCV; kirim apa adanya
+    tinggi, lebar = gambar_cv.shape[:2]
+    if SARANA_OLLAMA_IMAGE_MAX_SIDE and max(tinggi, lebar) > SARANA_OLLAMA_IMAGE_MAX_SIDE:
+        skala = SARANA_OLLAMA_IMAGE_MAX_SIDE / max(tinggi, lebar)
+        gambar_cv = cv2.resize(gambar_cv, (max(1, round(lebar * skala)), max(1, round(tinggi * skala))),
+                               interpolation=cv2.INTER_AREA)
+    if SARANA_OLLAMA_IMAGE_FORMAT == "webp":
+        berhasil, buffer = cv2.imencode(".webp", gambar_cv, [cv2.IMWRITE_WEBP_QUALITY, SARANA_OLLAMA_IMAGE_QUALITY])
+    else:
+        berhasil, buffer = cv2.imencode(".jpg", gambar_cv, [cv2.IMWRITE_JPEG_QUALITY, SARANA_OLLAMA_IMAGE_QUALITY])
+    if not berhasil or buffer.nbytes >= len(gambar):
+        return gambar # Gambar asli sudah lebih kecil (misal PNG kecil hitam-putih)
+    return buffer.tobytes()
+
+
+def dpi_render_untuk_ollama(lebar_pt: float, tinggi_pt: float, dpi_default: int = 72) -> int:
+    """DPI render halaman PDF agar sisi terpanjangnya pas SARANA_OLLAMA_IMAGE_MAX_SIDE (tidak dirender lebih besar)."""
+    if not SARANA_OLLAMA_IMAGE_MAX_SIDE or max(lebar_pt, tinggi_pt) <= 0:
+        return dpi_default
+    return max(1, int(SARANA_OLLAMA_IMAGE_MAX_SIDE * 72 / max(lebar_pt, tinggi_pt)))
+
+
+def siapkan_gambar_ollama_sarana(gambar: bytes, direktori_cache: str | None = None) -> str:
+    """
+    Payload base64 gambar untuk Ollama: diperkecil ke SARANA_OLLAMA_IMAGE_MAX_SIDE lalu di-encode ulang
+    (abu-abu, JPEG/WebP). Hasilnya di-cache per hash isi gambar dan pengaturan persiapan.
+    """
+    if SARANA_OLLAMA_IMAGE_FORMAT == "asli":
+        return base64.b64encode(gambar).decode("ascii")
+    kunci_cache = None
+    if direktori_cache:
+        kunci_cache = hashlib.sha256(
+            f"ollama_gambar|{sidik_persiapan_gambar_ollama()}|".encode("utf-8") + hashlib.sha256(gambar).digest()
+        ).hexdigest()
+        data_cache = sarana_cache.get_cache_sarana(direktori_cache).ambil(kunci_cache)
+        if data_cache and isinstance(data_cache.get("payload_b64"), str):
+            return data_cache["payload_b64"]
+    try:
+        payload = _encode_ulang_gambar(gambar)
+    except Exception as e:
+        print(f"Warning: Gagal menyiapkan gambar untuk Ollama, dikirim apa adanya: {e}")
+        payload = gambar
+    # Base64 sekali di sini; klien ollama meneruskan string base64 tanpa meng-encode ulang
+    payload_b64 = base64.b64encode(payload).decode("ascii")
+    if kunci_cache:
+        sarana_cache.get_cache_sarana(direktori_cache).simpan(kunci_cache, {"payload_b64": payload_b64})
+    return payload_b64
+
+
+def buat_kunci_respons_ollama(model: str, prompt: str, daftar_gambar: list[bytes], opsi: dict | None = None) -> str:
+    hash_objek = hashlib.sha256(f"ollama|{model}|{sorted((opsi or {}).items())}|".encode("utf-8"))
+    if daftar_gambar:
+        hash_objek.update(f"gambar:{sidik_persiapan_gambar_ollama()}|".encode("utf-8"))
+    for gambar in daftar_gambar:
+        hash_objek.update(hashlib.sha256(gambar).digest())
+    hash_objek.update(prompt.encode("utf-8"))
+    return hash_objek.hexdigest()
+
+
+def chat_ollama_sarana(model: str, prompt: str, daftar_gambar: list | None = None, host: str | None = None,
+                       timeout: float | None = None, opsi: dict | None = None,
+                       direktori_cache: str | None = None) -> str:
+    """
+    Satu pesan pengguna (prompt + gambar opsional berupa path atau bytes) ke model Ollama; mengembalikan isi
+    balasan. Gambar disiapkan dengan siapkan_gambar_ollama_sarana hanya jika respons tidak ada di cache.
+    Respons tidak kosong di-cache di direktori_cache (jika diberikan). Error Ollama diteruskan ke pemanggil.
+    """
+    gambar_bytes = [_baca_gambar(gambar) for gambar in daftar_gambar or []]
+    kunci_cache = None
+    if SARANA_OLLAMA_CACHE_ENABLED and direktori_cache:
+        kunci_cache = buat_kunci_respons_ollama(model, prompt, gambar_bytes, opsi)
+        data_cache = sarana_cache.get_cache_sarana(direktori_cache).ambil(kunci_cache)
+        if data_cache and isinstance(data_cache.get("konten"), str):
+            _tambah_statistik("hit_cache")
+            return data_cache["konten"]
+        _tambah_statistik("miss_cache")
+
+    pesan = {"role": "user", "content": prompt}
+    if gambar_bytes:
+        pesan["images"] = [siapkan_gambar_ollama_sarana(gambar, direktori_cache) for gambar in gambar_bytes]
+        _tambah_statistik("byte_gambar_asli", sum(len(gambar) for gambar in gambar_bytes))
+        _tambah_statistik("byte_gambar_terkirim", sum(len(payload) * 3 // 4 for payload in pesan["images"]))
+    klien = get_klien_ollama(host, timeout)
+    with slot_model_ollama(model):
+        _tambah_statistik("panggilan")
+        try:
+            respons = klien.chat(model=model, messages=[pesan], options=opsi, keep_alive=SARANA_OLLAMA_KEEP_ALIVE)
+        except Exception:
+            _tambah_statistik("error")
+            raise
+    konten = ((respons.get("message") or {}).get("content") or "") if respons else ""
+    if kunci_cache and konten.strip():
+        sarana_cache.get_cache_sarana(direktori_cache).simpan(kunci_cache, {"konten": konten})
+    return konten
+
+
+async def chat_ollama_async_sarana(model: str, prompt: str, daftar_gambar: list | None = None,
+                                   host: str | None = None, timeout: float | None = None, opsi: dict | None = None,
+                                   direktori_cache: str | None = None, pada_potongan=None) -> str:
+    """
+    Padanan asyncio chat_ollama_sarana dengan streaming token (kunci cache dan persiapan gambar sama).
+    pada_potongan(teks) dipanggil untuk setiap potongan balasan (sekali dengan seluruh isi jika dari cache);
+    jika mengembalikan True, streaming dihentikan dan teks sejauh itu dianggap balasan lengkap. Membatalkan
+    task menutup stream HTTP sehingga Ollama berhenti membangkitkan token; balasan yang batal tidak di-cache.
+    """
+    gambar_bytes = [await asyncio.to_thread(_baca_gambar, gambar) for gambar in daftar_gambar or []]
+    cache = sarana_cache.get_cache_sarana(direktori_cache) if SARANA_OLLAMA_CACHE_ENABLED and direktori_cache else None
+    kunci_cache = None
+    if cache is not None:
+        kunci_cache = buat_kunci_respons_ollama(model, prompt, gambar_bytes, opsi)
+        data_cache = await asyncio.to_thread(cache.ambil, kunci_cache)
+        if data_cache and isinstance(data_cache.get("konten"), str):
+            _tambah_statistik("hit_cache")
+            if pada_potongan is not None:
+                pada_potongan(data_cache["konten"])
+            return data_cache["konten"]
+        _tambah_statistik("miss_cache")
+
+    pesan = {"role": "user", "content": prompt}
+    if gambar_bytes:
+        # Decode/resize/encode gambar memakai CPU; dijalankan di thread agar event loop tidak tertahan
+        pesan["images"] = [await asyncio.to_thread(siapkan_gambar_ollama_sarana, gambar, direktori_cache)
+                           for gambar in gambar_bytes]
+        _tambah_statistik("byte_gambar_asli", sum(len(gambar) for gambar in gambar_bytes))
+        _tambah_statistik("byte_gambar_terkirim", sum(len(payload) * 3 // 4 for payload in pesan["images"]))
+    klien = get_klien_async_ollama(host, timeout)
+    potongan_teks = []
+    async with slot_model_ollama_async(model):
+        _tambah_statistik("panggilan")
+        stream = None
+        try:
+            stream = await klien.chat(model=model, messages=[pesan], options=opsi, stream=True,
+                                      keep_alive=SARANA_OLLAMA_KEEP_ALIVE)
+            async for potongan in stream:
+                teks = (potongan.get("message") or {}).get("content") or ""
+                if not teks:
+                    continue
+                potongan_teks.append(teks)
+                if pada_potongan is not None and pada_potongan(teks):
+                    _tambah_statistik("dihentikan_awal")
+                    break
+        except asyncio.CancelledError:
+            _tambah_statistik("dibatalkan")
+            raise
+        except Exception:
+            _tambah_statistik("error")
+            raise
+        finally:
+            if stream is not None:
+                # Menutup generator keluar dari blok httpx stream -> koneksi ditutup, server berhenti membangkitkan
+                await stream.aclose()
+    konten = "".join(potongan_teks)
+    if kunci_cache and konten.strip():
+        await asyncio.to_thread(cache.simpan, kunci_cache, {"konten": konten})
+    return konten
+
+
+POLA_PENANDA_HALAMAN_OLLAMA = re.compile(r"^\W*HALAMAN\s+(\d+)\W*$", re.IGNORECASE | re.MULTILINE)
+
+
+def perkiraan_token_gambar_ollama(lebar: int, tinggi: int) -> int:
+    """Perkiraan token gambar setelah diperkecil ke SARANA_OLLAMA_IMAGE_MAX_SIDE (untuk anggaran batch)."""
+    sisi_maks = max(lebar, tinggi)
+    if SARANA_OLLAMA_IMAGE_MAX_SIDE and sisi_maks > SARANA_OLLAMA_IMAGE_MAX_SIDE:
+        skala = SARANA_OLLAMA_IMAGE_MAX_SIDE / sisi_maks
+        lebar, tinggi = lebar * skala, tinggi * skala
+    return max(1, int(lebar * tinggi) // SARANA_OLLAMA_PIXELS_PER_TOKEN)
+
+
+def batch_ollama_penuh(jumlah_gambar: int, token_batch: int, token_gambar_baru: int) -> bool:
+    """True jika gambar berikutnya tidak muat lagi di batch (batas jumlah gambar atau anggaran token)."""
+    if jumlah_gambar == 0:
+        return False # Satu gambar selalu dikirim, sebesar apa pun
+    return (jumlah_gambar >= SARANA_OLLAMA_BATCH_MAX_IMAGES
+            or token_batch + token_gambar_baru > SARANA_OLLAMA_BATCH_MAX_IMAGE_TOKENS)
+
+
+def _prompt_batch_halaman(prompt: str, jumlah: int) -> str:
+    return (f"{prompt}\n\nAda {jumlah} gambar; setiap gambar adalah satu halaman dokumen yang berbeda, berurutan. "
+            f"Kerjakan setiap gambar secara terpisah. Awali teks setiap halaman dengan satu baris penanda "
+            f"'=== HALAMAN k ===' (k = urutan gambar, mulai dari 1) tanpa teks lain di baris itu.")
+
+
+def pisah_teks_per_halaman_ollama(teks: str, jumlah: int) -> list[str | None]:
+    """Memecah balasan batch menurut baris penanda halaman; None untuk halaman yang penandanya tidak ada."""
+    hasil: list[str | None] = [None] * jumlah
+    penanda = list(POLA_PENANDA_HALAMAN_OLLAMA.finditer(teks))
+    for indeks, cocok in enumerate(penanda):
+        nomor = int(cocok.group(1))
+        if not 1 <= nomor <= jumlah:
+            continue
+        akhir = penanda[indeks + 1].start() if indeks + 1 < len(penanda) else len(teks)
+        isi = teks[cocok.end():akhir].strip()
+        hasil[nomor - 1] = isi if hasil[nomor - 1] is None else f"{hasil[nomor - 1]}\n{isi}"
+    return hasil
+
+
+def ocr_batch_halaman_ollama_sarana(daftar_gambar: list, prompt: str, model: str | None = None,
+                                    direktori_cache: str | None = None) -> list[str | None]:
+    """
+    OCR beberapa halaman dalam satu request vision. Mengembalikan teks per gambar sesuai urutan; None untuk
+    halaman yang tidak bisa dipisahkan dari balasan (pemanggil meng-OCR halaman itu sendiri-sendiri).
+    """
+    model = model or SARANA_OLLAMA_VISION_MODEL
+    if len(daftar_gambar) == 1:
+        return [chat_ollama_sarana(model, prompt, daftar_gambar, direktori_cache=direktori_cache).strip()]
+    konten = chat_ollama_sarana(model, _prompt_batch_halaman(prompt, len(daftar_gambar)), daftar_gambar,
+                                direktori_cache=direktori_cache)
+    _tambah_statistik("batch")
+    _tambah_statistik("halaman_batch", len(daftar_gambar))
+    return pisah_teks_per_halaman_ollama(konten, len(daftar_gambar))
+
+
+class PemindaiJsonInkremental:
+    """
+    Memindai teks JSON yang tiba sepotong-sepotong dan mengembalikan anggota objek tingkat atas
+    ({"kunci": nilai, ...}) begitu nilainya lengkap, tanpa menunggu seluruh balasan. Teks sebelum '{' pertama
+    (misal pembuka ```json) diabaikan; kurung di dalam string dan karakter escape tidak dihitung.
+    selesai menjadi True saat objek tingkat atas ditutup, sehingga sisa balasan boleh tidak dibaca.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._anggota = []
+        self.kedalaman = 0
+        self._dalam_string = False
+        self._escape = False
+        self.selesai = False
+        self.hasil: dict = {}
+        self.gagal: list[str] = []
+
+    @property
+    def teks_objek(self) -> str:
+        return "".join(self._buffer)
+
+    def _tutup_anggota(self) -> tuple | None:
+        teks_anggota = "".join(self._anggota).strip()
+        self._anggota = []
+        if not teks_anggota:
+            return None # Koma berlebih sebelum '}' atau objek kosong
+        try:
+            anggota = json.loads("{" + re.sub(r",\s*([\}\]])", r"\1", teks_anggota) + "}")
+        except json.JSONDecodeError:
+            self.gagal.append(teks_anggota)
+            return None
+        kunci, nilai = next(iter(anggota.items()))
+        self.hasil[kunci] = nilai
+        return kunci, nilai
+
+    def tambah(self, potongan: str) -> list[tuple]:
+        """Memasukkan potongan teks; mengembalikan anggota (kunci, nilai) yang baru lengkap."""
+        anggota_baru = []
+        for karakter in potongan:
+            if self.selesai:
+                break
+            if self.kedalaman == 0:
+                if karakter == "{":
+                    self.kedalaman = 1
+                    self._buffer.append(karakter)
+                continue
+            self._buffer.append(karakter)
+            if self._dalam_string:
+                if self._escape:
+                    self._escape = False
+                elif karakter == "\\":
+                    self._escape = True
+                elif karakter == '"':
+                    self._dalam_string = False
+            elif karakter == '"':
+                self._dalam_string = True
+            elif karakter in "{[":
+                self.kedalaman += 1
+            elif karakter in "}]":
+                self.kedalaman -= 1
+                if self.kedalaman == 0:
+                    self.selesai = True
+                    anggota = self._tutup_anggota()
+                    if anggota:
+                        anggota_baru.append(anggota)
+                    continue
+            elif karakter == "," and self.kedalaman == 1:
+                anggota = self._tutup_anggota()
+                if anggota:
+                    anggota_baru.append(anggota)
+                continue
+            self._anggota.append(karakter)
+        return anggota_baru
+
+
+def status_ollama_sarana() -> dict:
+    with _lock_ollama:
+        return {
+            "pid": os.getpid(),
+            "klien": len(_klien_ollama),
+            "batas_per_model": {model: SARANA_OLLAMA_MODEL_CONCURRENCY.get(model, SARANA_OLLAMA_MAX_CONCURRENCY)
+                                for model in _semafor_model},
+            **_statistik_ollama,
+        }
@@ -0,0 +1,199 @@
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+# Pool proses untuk pekerjaan Sarana yang berat (OCR, OpenCV, parsing PDF).
+# Endpoint Sarana bersifat async; tanpa pool ini satu PDF hasil scan akan memblokir event loop
+# uvicorn sehingga endpoint Prabu/Setia dan probe /health ikut tertahan.
+# Pekerjaan OCR dominan CPU-bound, jadi dipakai proses (bukan thread) agar tidak terkunci GIL.
+
+SARANA_POOL_WORKERS = max(1, int(os.environ.get("SARANA_POOL_WORKERS", max(1, (os.cpu_count() or 2) - 1))))
+# Jumlah pekerjaan yang boleh menunggu di luar yang sedang berjalan. Di atas batas ini request ditolak.
+SARANA_POOL_MAX_QUEUE = max(0, int(os.environ.get("SARANA_POOL_MAX_QUEUE", SARANA_POOL_WORKERS * 2)))
+SARANA_POOL_RETRY_AFTER_SECONDS = int(os.environ.get("SARANA_POOL_RETRY_AFTER_SECONDS", 30))
+# 'spawn' lebih aman daripada 'fork' untuk proses uvicorn yang sudah punya thread aktif.
+SARANA_POOL_START_METHOD = os.environ.get("SARANA_POOL_START_METHOD", "spawn")
+
+
+class SaranaPoolPenuhError(RuntimeError):
+    """Dilempar saat pool Sarana sudah penuh (semua worker sibuk dan antrian mencapai batas)."""
+
+    def __init__(self, retry_after: int, status_pool: dict):
+        self.retry_after = retry_after
+        self.status_pool = status_pool
+        super().__init__(
+            f"Sarana sedang penuh ({status_pool.get('in_flight')} pekerjaan aktif, "
+            f"kapasitas {status_pool.get('capacity')}). Coba lagi dalam {retry_after} detik."
+        )
+
+
+# Hasil pemanasan proses worker ini (diisi initializer atau laporan_pemanasan_worker_sarana); None di proses API
+_hasil_pemanasan_worker: dict | None = None
+
+
+def _inisialisasi_worker_sarana(opsi_pemanasan: dict | None = None):
+    # Impor layanan dan pustaka beratnya sekali per proses worker agar pekerjaan pertama tidak menanggung biaya impor.
+    # Dengan opsi_pemanasan (warmup startup aktif), seluruh pemanasan dijalankan di sini, sehingga setiap worker,
+    # termasuk pengganti worker yang mati, sudah hangat sebelum mengambil pekerjaan pertamanya.
+    global _hasil_pemanasan_worker
+    try:
+        from . import sarana_service
+        if opsi_pemanasan is None:
+            sarana_service.muat_dependensi_berat_sarana()
+        else:
+            _hasil_pemanasan_worker = sarana_service.pemanasan_sarana(**opsi_pemanasan)
+    except Exception as e:
+        print(f"ERROR (SaranaPool): Gagal mengimpor sarana_service di worker: {e}")
+
+
+def laporan_pemanasan_worker_sarana(opsi_pemanasan: dict, jeda_detik: float = 0.0) -> dict:
+    """
+    Dijalankan di worker: hasil pemanasan proses ini (pemanasan dijalankan sekarang jika initializer belum
+    melakukannya). jeda_detik menahan worker sebentar agar probe berikutnya diambil worker lain.
+    """
+    global _hasil_pemanasan_worker
+    if _hasil_pemanasan_worker is None:
+        from . import sarana_service
+        _hasil_pemanasan_worker = sarana_service.pemanasan_sarana(**opsi_pemanasan)
+    if jeda_detik:
+        time.sleep(jeda_detik)
+    return _hasil_pemanasan_worker
+
+
+class PoolProsesSarana:
+    """ProcessPoolExecutor dengan antrian terbatas dan penghitung utilisasi."""
+
+    def __init__(self, jumlah_worker: int, maks_antrian: int, metode_start: str = "spawn"):
+        self.jumlah_worker = jumlah_worker
+        self.maks_antrian = maks_antrian
+        self.metode_start = metode_start
+        self._lock = threading.Lock()
+        self._executor: concurrent.futures.ProcessPoolExecutor | None = None
+        self._opsi_pemanasan: dict | None = None
+        self._in_flight = 0
+        self._total_dikirim = 0
+        self._total_ditolak = 0
+        self._total_selesai = 0
+        self._total_gagal = 0
+
+    @property
+    def kapasitas(self) -> int:
+        return self.jumlah_worker + self.maks_antrian
+
+    def atur_pemanasan_worker(self, opsi_pemanasan: dict | None):
+        """Opsi sarana_service.pemanasan_sarana untuk initializer worker yang dibuat setelah ini (None = hanya impor)."""
+        with self._lock:
+            self._opsi_pemanasan = opsi_pemanasan
+
+    def _dapatkan_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        # Dipanggil dengan self._lock terkunci.
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.jumlah_worker,
+                mp_context=multiprocessing.get_context(self.metode_start),
+                initializer=_inisialisasi_worker_sarana,
+                initargs=(self._opsi_pemanasan,),
+            )
+            print(f"INFO (SaranaPool): Process pool dibuat dengan {self.jumlah_worker} worker, antrian maks {self.maks_antrian}.")
+        return self._executor
+
+    def kirim(self, fungsi, *args, **kwargs) -> concurrent.futures.Future:
+        """Mengirim pekerjaan ke pool. Melempar SaranaPoolPenuhError jika kapasitas habis."""
+        with self._lock:
+            if self._in_flight >= self.kapasitas:
+                self._total_ditolak += 1
+                raise SaranaPoolPenuhError(SARANA_POOL_RETRY_AFTER_SECONDS, self._status_tanpa_lock())
+            executor = self._dapatkan_executor()
+            self._in_flight += 1
+            self._total_dikirim += 1
+            try:
+                future = executor.submit(fungsi, *args, **kwargs)
+            except BrokenProcessPool:
+                # Worker mati (mis. OOM); buat ulang pool sekali lalu coba lagi.
+                print("WARNING (SaranaPool): Process pool rusak, membuat ulang pool.")
+                self._executor = None
+                try:
+                    future = self._dapatkan_executor().submit(fungsi, *args, **kwargs)
+                except Exception:
+                    self._in_flight -= 1
+                    raise
+            except Exception:
+                self._in_flight -= 1
+                raise
+        future.add_done_callback(self._pekerjaan_selesai)
+        return future
+
+    def _pekerjaan_selesai(self, future: concurrent.futures.Future):
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._total_gagal += 1
+                if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                    print("WARNING (SaranaPool): Worker berhenti tidak normal, pool akan dibuat ulang.")
+                    self._executor = None
+            else:
+                self._total_selesai += 1
+
+    def _status_tanpa_lock(self) -> dict:
+        berjalan = min(self._in_flight, self.jumlah_worker)
+        return {
+            "workers": self.jumlah_worker,
+            "max_queue": self.maks_antrian,
+            "capacity": self.kapasitas,
+            "in_flight": self._in_flight,
+            "running": berjalan,
+            "queued": self._in_flight - berjalan,
+            "utilization": round(berjalan / self.jumlah_worker, 3) if self.jumlah_worker else 0.0,
+            "saturated": self._in_flight >= self.kapasitas,
+            "started": self._executor is not None,
+            "total_submitted": self._total_dikirim,
+            "total_rejected": self._total_ditolak,
+            "total_completed": self._total_selesai,
+            "total_failed": self._total_gagal,
+        }
+
+    def status(self) -> dict:
+        with self._lock:
+            return self._status_tanpa_lock()
+
+    def matikan(self, tunggu: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=tunggu, cancel_futures=True)
+            print("INFO (SaranaPool): Process pool dimatikan.")
+
+
+_pool_sarana: PoolProsesSarana | None = None
+_pool_sarana_lock = threading.Lock()
+
+
+def get_pool_sarana() -> PoolProsesSarana:
+    global _pool_sarana
+    if _pool_sarana is None:
+        with _pool_sarana_lock:
+            if _pool_sarana is None:
+                _pool_sarana = PoolProsesSarana(SARANA_POOL_WORKERS, SARANA_POOL_MAX_QUEUE, SARANA_POOL_START_METHOD)
+    return _pool_sarana
+
+
+async def jalankan_di_pool_sarana(fungsi, *args, **kwargs):
+    """
+    Menjalankan `fungsi` di pool proses Sarana tanpa memblokir event loop.
+    `fungsi` dan argumennya harus bisa di-pickle (fungsi level modul).
+    """
+    future = get_pool_sarana().kirim(fungsi, *args, **kwargs)
+    return await asyncio.wrap_future(future)
+
+
+def status_pool_sarana() -> dict:
+    return get_pool_sarana().status()
+
+
+def matikan_pool_sarana():
+    if _pool_sarana is not None:
+        _pool_sarana.matikan()
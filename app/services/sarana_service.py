@@ -1,156 +1,233 @@
+from __future__ import annotations
+
 import os
+import asyncio
 import hashlib
 import json
 import time
 import re
 import uuid
+import bisect
+import functools
+import importlib
 import concurrent.futures
+import queue
+import threading
 from collections import defaultdict
 import io
 
-# Dependency imports (ensure these are in requirements.txt)
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-
-import docx
-import pytesseract
-from pytesseract import Output
-from PIL import Image, ImageDraw, ImageFont
-import cv2
-import numpy as np
-import pandas as pd
-import pymupdf # fitz
-import pdfplumber
-
-# Conditional imports
-try:
-    import easyocr
-except ImportError:
-    easyocr = None
-
-try:
-    import pyocr
-    import pyocr.builders
-except ImportError:
-    pyocr = None
-
-try:
-    import ollama
-    from langchain_ollama import ChatOllama
-    from langchain_core.prompts import ChatPromptTemplate
-    from langchain_core.output_parsers import StrOutputParser
-except ImportError:
-    ollama = None
-    ChatOllama = None
-    ChatPromptTemplate = None
-    StrOutputParser = None
+from . import sarana_cache
+from . import sarana_easyocr
+from . import sarana_ollama
+from . import sarana_tesseract
+
+
+class _ModulLambatSarana:
+    """
+    Proxy modul yang baru mengimpor modul aslinya saat atribut pertama kali diakses.
+    Pustaka berat (OpenCV, PyMuPDF, pandas, NLTK, ...) tidak lagi dimuat saat app.main diimpor,
+    sehingga endpoint lain (dan probe health) siap lebih cepat saat cold start.
+    """
+
+    def __init__(self, nama_modul: str):
+        object.__setattr__(self, "_nama_modul", nama_modul)
+
+    def _muat(self):
+        modul = importlib.import_module(self._nama_modul)
+        # Ganti proxy di globals modul ini dengan modul asli agar akses berikutnya tanpa overhead
+        for nama_global, nilai in list(globals().items()):
+            if nilai is self: globals()[nama_global] = modul
+        return modul
+
+    def __getattr__(self, nama_atribut):
+        return getattr(self._muat(), nama_atribut)
+
+    def __setattr__(self, nama_atribut, nilai):
+        setattr(self._muat(), nama_atribut, nilai)
+
+
+# Dependency imports (ensure these are in requirements.txt); dimuat saat pertama kali dipakai
+nltk = _ModulLambatSarana("nltk")
+docx = _ModulLambatSarana("docx")
+pytesseract = _ModulLambatSarana("pytesseract")
+Image = _ModulLambatSarana("PIL.Image")
+ImageDraw = _ModulLambatSarana("PIL.ImageDraw")
+ImageFont = _ModulLambatSarana("PIL.ImageFont")
+cv2 = _ModulLambatSarana("cv2")
+np = _ModulLambatSarana("numpy")
+pd = _ModulLambatSarana("pandas")
+pymupdf = _ModulLambatSarana("pymupdf") # fitz
+pdfplumber = _ModulLambatSarana("pdfplumber")
+
+def muat_dependensi_berat_sarana():
+    """Memaksa impor pustaka berat sekarang (misal di proses worker) agar pekerjaan pertama tidak menanggungnya."""
+    for nilai in list(globals().values()):
+        if isinstance(nilai, _ModulLambatSarana):
+            getattr(nilai, "__name__")
+
+# Conditional import: Ollama hanya dimuat saat fitur Ollama dipakai (lihat _muat_ollama_sarana).
+# Panggilan ke server lewat sarana_ollama (klien bersama, batas per model, cache respons).
+ollama = None
+_status_impor_ollama_sarana = None
+_lock_impor_ollama_sarana = threading.Lock()
+
+def _muat_ollama_sarana() -> bool:
+    """Mengimpor ollama sekali; False jika tidak terinstal."""
+    global ollama, _status_impor_ollama_sarana
+    if _status_impor_ollama_sarana is None:
+        with _lock_impor_ollama_sarana:
+            if _status_impor_ollama_sarana is None:
+                try:
+                    import ollama as modul_ollama
+                    ollama = modul_ollama
+                    _status_impor_ollama_sarana = True
+                except ImportError:
+                    _status_impor_ollama_sarana = False
+    return _status_impor_ollama_sarana
 
 
 # --- Konten dari SaranaModule/utilitas_cache.py ---
 NAMA_DIREKTORI_CACHE_DEFAULT_SARANA = ".cache_parsing_dokumen_sarana" # Added suffix to avoid conflict if root also uses this name
 
-def buat_kunci_cache_file_sarana(path_file: str, extra_key_info: str | None = None) -> str | None:
+UKURAN_BLOK_HASH_SARANA = 1024 * 1024
+# Naikkan jika logika ekstraksi berubah sehingga hasil lama di cache tidak lagi valid.
+VERSI_EKSTRAKTOR_SARANA = "2"
+
+def hitung_hash_konten_file_sarana(path_file: str) -> str | None:
+    """Menghitung SHA-256 dari isi berkas (bukan path/mtime) secara bertahap."""
     try:
-        path_absolut = os.path.abspath(path_file)
-        timestamp_modifikasi = os.path.getmtime(path_file)
-        string_untuk_hash = f"{path_absolut}|{timestamp_modifikasi}"
-        if extra_key_info:
-            string_untuk_hash += f"|{extra_key_info}"
-        hash_objek = hashlib.sha256(string_untuk_hash.encode('utf-8'))
+        hash_objek = hashlib.sha256()
+        with open(path_file, 'rb') as berkas:
+            for blok in iter(lambda: berkas.read(UKURAN_BLOK_HASH_SARANA), b''):
+                hash_objek.update(blok)
         return hash_objek.hexdigest()
     except FileNotFoundError:
-        print(f"Peringatan (SaranaCache): Berkas tidak ditemukan di {path_file} saat membuat kunci cache.")
+        print(f"Peringatan (SaranaCache): Berkas tidak ditemukan di {path_file} saat menghitung hash konten.")
         return None
     except Exception as e:
-        print(f"Error (SaranaCache) saat membuat kunci cache untuk {path_file}: {e}")
+        print(f"Error (SaranaCache) saat menghitung hash konten {path_file}: {e}")
         return None
 
+def buat_kunci_cache_file_sarana(path_file: str, extra_key_info: str | None = None, hash_konten: str | None = None) -> str | None:
+    """
+    Membuat kunci cache berbasis isi berkas, sehingga berkas yang sama yang di-upload ulang
+    (dengan path temporer berbeda) tetap mengenai cache yang sama.
+    `hash_konten` dapat diberikan jika hash sudah dihitung saat upload di-stream ke disk.
+    """
+    if hash_konten is None:
+        hash_konten = hitung_hash_konten_file_sarana(path_file)
+        if hash_konten is None:
+            return None
+    string_untuk_hash = hash_konten
+    if extra_key_info:
+        string_untuk_hash += f"|{extra_key_info}"
+    return hashlib.sha256(string_untuk_hash.encode('utf-8')).hexdigest()
+
+def sidik_opsi_sarana(opsi) -> str:
+    """Representasi stabil (urutan kunci tetap) dari opsi parsing untuk dimasukkan ke kunci cache."""
+    return json.dumps(opsi, sort_keys=True, ensure_ascii=False, default=str)
+
+def buat_kunci_cache_halaman_sarana(data_halaman, extra_key_info: str) -> str:
+    """
+    Kunci cache OCR satu halaman: hash piksel hasil render (bukan nomor halaman atau berkas asal), sehingga
+    halaman yang identik di dokumen lain atau di versi revisi dokumen yang sama tetap mengenai cache.
+    data_halaman berupa salinan array piksel NumPy (tinggi, lebar[, kanal]) atau PNG bytes halaman, bukan pixmap,
+    agar bisa dihitung di thread mana pun tanpa menyentuh PyMuPDF.
+    """
+    if isinstance(data_halaman, (bytes, bytearray)):
+        hash_objek = hashlib.sha256(b"png|")
+        hash_objek.update(data_halaman)
+    else:
+        tinggi, lebar = data_halaman.shape[:2]
+        kanal = data_halaman.shape[2] if data_halaman.ndim == 3 else 1
+        hash_objek = hashlib.sha256(f"{lebar}x{tinggi}x{kanal}|".encode('utf-8'))
+        hash_objek.update(np.ascontiguousarray(data_halaman).data)
+    return hashlib.sha256(f"halaman:{hash_objek.hexdigest()}|{extra_key_info}".encode('utf-8')).hexdigest()
+
+def sidik_daftar_kata_kunci_sarana(daftar_kata_kunci: list[dict]) -> str:
+    """Versi set kata kunci: hash dari isi daftar, jadi perubahan variasi otomatis membatalkan cache."""
+    return hashlib.sha256(sidik_opsi_sarana(daftar_kata_kunci).encode('utf-8')).hexdigest()[:16]
+
+def _direktori_cache_sarana(direktori_cache_param: str | None) -> str:
+    return direktori_cache_param if direktori_cache_param is not None else NAMA_DIREKTORI_CACHE_DEFAULT_SARANA
+
 def simpan_ke_cache_sarana(kunci_cache: str, data_untuk_cache: dict, direktori_cache_param: str | None = None) -> bool:
     if not kunci_cache:
         return False
-    direktori_cache = direktori_cache_param if direktori_cache_param is not None else NAMA_DIREKTORI_CACHE_DEFAULT_SARANA
-    try:
-        os.makedirs(direktori_cache, exist_ok=True)
-        path_file_cache: str = os.path.join(direktori_cache, f"{kunci_cache}.json")
-        with open(path_file_cache, 'w', encoding='utf-8') as f_cache:
-            json.dump(data_untuk_cache, f_cache, ensure_ascii=False, indent=4)
-        return True
-    except Exception as e:
-        print(f"Error (SaranaCache) saat menyimpan ke cache ({kunci_cache}): {e}")
-        return False
+    return sarana_cache.get_cache_sarana(_direktori_cache_sarana(direktori_cache_param)).simpan(kunci_cache, data_untuk_cache)
 
 def ambil_dari_cache_sarana(kunci_cache: str, direktori_cache_param: str | None = None) -> dict | None:
     if not kunci_cache:
         return None
-    direktori_cache = direktori_cache_param if direktori_cache_param is not None else NAMA_DIREKTORI_CACHE_DEFAULT_SARANA
-    path_file_cache = os.path.join(direktori_cache, f"{kunci_cache}.json")
-    if not os.path.exists(path_file_cache):
-        return None
-    try:
-        with open(path_file_cache, 'r', encoding='utf-8') as f_cache:
-            data_dari_cache = json.load(f_cache)
-        return data_dari_cache
-    except Exception as e:
-        print(f"Error (SaranaCache) saat mengambil dari cache ({kunci_cache}): {e}")
-        return None
+    return sarana_cache.get_cache_sarana(_direktori_cache_sarana(direktori_cache_param)).ambil(kunci_cache)
 
 def bersihkan_cache_lama_sarana(direktori_cache_param: str | None = None, batas_usia_detik: int = 30 * 24 * 60 * 60):
-    direktori_cache = direktori_cache_param if direktori_cache_param is not None else NAMA_DIREKTORI_CACHE_DEFAULT_SARANA
+    direktori_cache = _direktori_cache_sarana(direktori_cache_param)
     if not os.path.isdir(direktori_cache):
         return
-    jumlah_dihapus = 0
-    waktu_sekarang = time.time()
     try:
-        for nama_file in os.listdir(direktori_cache):
-            if nama_file.endswith(".json"):
-                path_file_penuh = os.path.join(direktori_cache, nama_file)
-                try:
-                    timestamp_modifikasi_file = os.path.getmtime(path_file_penuh)
-                    if (waktu_sekarang - timestamp_modifikasi_file) > batas_usia_detik:
-                        os.remove(path_file_penuh)
-                        jumlah_dihapus += 1
-                except Exception:
-                    pass # Ignore errors for single file removal
+        jumlah_dihapus = sarana_cache.get_cache_sarana(direktori_cache).tingkat[-1].bersihkan_kadaluarsa(batas_usia_detik)
         print(f"Pembersihan cache Sarana selesai. {jumlah_dihapus} file cache lama dihapus.")
     except Exception as e:
         print(f"Error (SaranaCache) selama proses pembersihan cache: {e}")
 
 
 # --- Konten dari SaranaModule/pengekstrak_kata_kunci.py ---
+# Data NLTK dibaca dari direktori lokal (di image Docker diunduh saat build), bukan diunduh saat runtime.
+SARANA_NLTK_DATA_DIR = os.environ.get(
+    "SARANA_NLTK_DATA_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "nltk_data")
+)
+SARANA_NLTK_ALLOW_DOWNLOAD = os.environ.get("SARANA_NLTK_ALLOW_DOWNLOAD", "false").lower() == "true"
+
 pelumat_sarana = None
 kata_henti_sarana = None
+_lock_nltk_sarana = threading.Lock()
+
+def _unduh_nltk_jika_diizinkan_sarana(*nama_paket) -> bool:
+    if not SARANA_NLTK_ALLOW_DOWNLOAD:
+        print(f"Warning: Data NLTK {nama_paket} tidak ditemukan di {SARANA_NLTK_DATA_DIR} dan unduhan runtime dimatikan.")
+        return False
+    for nama in nama_paket:
+        nltk.download(nama, quiet=True, download_dir=SARANA_NLTK_DATA_DIR)
+    return True
 
 def inisialisasi_nltk_resources_sarana():
+    """Menyiapkan stopwords dan lemmatizer NLTK sekali, saat pertama kali dibutuhkan."""
     global pelumat_sarana, kata_henti_sarana
-    try:
-        kata_henti_sarana = set(stopwords.words('indonesian'))
-    except LookupError:
-        nltk.download('stopwords', quiet=True)
-        kata_henti_sarana = set(stopwords.words('indonesian'))
-    except Exception:
-        kata_henti_sarana = set(stopwords.words('english')) # Fallback
-    
-    try:
-        pelumat_sarana = WordNetLemmatizer()
-        pelumat_sarana.lemmatize("test")
-    except LookupError:
-        nltk.download('wordnet', quiet=True)
-        nltk.download('omw-1.4', quiet=True)
-        pelumat_sarana = WordNetLemmatizer()
-    except Exception:
+    if pelumat_sarana is not None and kata_henti_sarana is not None:
+        return
+    with _lock_nltk_sarana:
+        if pelumat_sarana is not None and kata_henti_sarana is not None:
+            return
+        direktori_data = os.path.abspath(SARANA_NLTK_DATA_DIR)
+        if direktori_data not in nltk.data.path:
+            nltk.data.path.insert(0, direktori_data)
+        from nltk.corpus import stopwords
+        from nltk.stem import WordNetLemmatizer
+
+        try:
+            kata_henti = set(stopwords.words('indonesian'))
+        except LookupError:
+            kata_henti = set(stopwords.words('indonesian')) if _unduh_nltk_jika_diizinkan_sarana('stopwords') else set()
+        except Exception:
+            kata_henti = set(stopwords.words('english')) # Fallback
+
         class DummyLemmatizerSarana:
             def lemmatize(self, word, pos=None): return word
-        pelumat_sarana = DummyLemmatizerSarana()
-
-    try:
-        word_tokenize("test sentence")
-    except LookupError:
-        nltk.download('punkt', quiet=True)
-    # No need to print messages here, keep service layer clean
+        try:
+            pelumat = WordNetLemmatizer()
+            pelumat.lemmatize("test")
+        except LookupError:
+            pelumat = WordNetLemmatizer() if _unduh_nltk_jika_diizinkan_sarana('wordnet', 'omw-1.4') else DummyLemmatizerSarana()
+        except Exception:
+            pelumat = DummyLemmatizerSarana()
 
-inisialisasi_nltk_resources_sarana()
+        try:
+            nltk.word_tokenize("test sentence")
+        except LookupError:
+            _unduh_nltk_jika_diizinkan_sarana('punkt', 'punkt_tab')
+        # No need to print messages here, keep service layer clean
+        kata_henti_sarana, pelumat_sarana = kata_henti, pelumat
 
 DAFTAR_KATA_KUNCI_KEUANGAN_SARANA_DEFAULT = [
     # ASET 
@@ -205,6 +282,7 @@ DAFTAR_KATA_KUNCI_KEUANGAN_SARANA_INDIVIDU = [
     {"kata_dasar": "Total Utang Pribadi", "variasi": ["Total utang pribadi", "Jumlah kewajiban individu", "Total pinjaman individu"]},
 ]
 INDIVIDUAL_FINANCIAL_KEYWORDS_SARANA_FLAT = [item['kata_dasar'] for item in DAFTAR_KATA_KUNCI_KEUANGAN_SARANA_INDIVIDU]
+TIPE_FILE_GAMBAR_SARANA = ('png', 'jpg', 'jpeg', 'tiff', 'bmp', 'gif')
 
 
 def format_ke_json_sarana(kamus_data: dict, indentasi: int = 4) -> str:
@@ -214,10 +292,11 @@ def format_ke_json_sarana(kamus_data: dict, indentasi: int = 4) -> str:
         return "{ \"error\": \"Gagal format ke JSON\" }"
 
 def praproses_teks_sarana(teks_mentah: str) -> list[str]:
-    if not teks_mentah or pelumat_sarana is None or kata_henti_sarana is None:
+    if not teks_mentah:
         return []
+    inisialisasi_nltk_resources_sarana()
     try:
-        token_kata = word_tokenize(teks_mentah.lower())
+        token_kata = nltk.word_tokenize(teks_mentah.lower())
     except Exception:
         return []
     token_terproses = []
@@ -229,16 +308,20 @@ def praproses_teks_sarana(teks_mentah: str) -> list[str]:
                 token_terproses.append(token) 
     return token_terproses
 
-def normalisasi_nilai_keuangan_sarana(string_nilai: str) -> float | None:
-    if not string_nilai or not isinstance(string_nilai, str): return None
-    s = str(string_nilai).lower().replace("rp", "").strip()
-    for unit in ["ribu", "juta", "miliar", "milyar", "triliun", "trilyun"]:
-        s = re.sub(r'\b' + re.escape(unit) + r'\b', '', s).strip()
+POLA_UNIT_NILAI_SARANA = re.compile(r"\b(?:ribu|juta|miliar|milyar|triliun|trilyun)\b")
+POLA_BUKAN_ANGKA_TITIK_SARANA = re.compile(r"[^\d.]")
+POLA_BUKAN_DIGIT_SARANA = re.compile(r"[^\d]")
+UKURAN_MEMO_NORMALISASI_SARANA = int(os.environ.get("SARANA_NORMALISASI_MEMO_SIZE", 65536))
+
+@functools.lru_cache(maxsize=UKURAN_MEMO_NORMALISASI_SARANA)
+def _normalisasi_nilai_keuangan_memo_sarana(string_nilai: str) -> float | None:
+    # Token yang sama ("2023", "-", "(1.234)") muncul berulang di satu dokumen dan antar dokumen
+    s = POLA_UNIT_NILAI_SARANA.sub('', string_nilai.lower().replace("rp", "")).strip()
     neg = False
     if s.startswith("(") and s.endswith(")"):
         neg = True
         s = s[1:-1].strip()
-    
+
     num_dots = s.count('.')
     num_commas = s.count(',')
 
@@ -246,36 +329,28 @@ def normalisasi_nilai_keuangan_sarana(string_nilai: str) -> float | None:
         if s.rfind(',') > s.rfind('.'): s = s.replace(".", "").replace(",", ".")
         else: s = s.replace(",", "")
     elif num_commas > 0: # Only commas
-        parts = s.split(',')
-        if num_commas > 1 or (len(parts[-1]) != 3 and len(parts[-1]) !=2 and len(parts[-1])!=1) : # e.g. 1,234,567 or 1,2 (decimal)
-             # if last part not 3 digits, or multiple commas, then comma is thousand sep for >1 commas, or decimal for 1 comma
-            if num_commas > 1: s = s.replace(",", "") # 1,234,567 -> 1234567
-            elif len(parts[-1]) != 3 : s = s.replace(",",".") # 1,2 -> 1.2 or 1,23 -> 1.23
-            else: # num_commas == 1 and len(parts[-1])==3, e.g. "12,345"
-                 s = s.replace(",","") # Should be "12345"
-
-        else: # num_commas == 1 and len(parts[-1])==3 , e.g. "12,345" -> "12345"
-            s = s.replace(",", "")
-            
+        # Beberapa koma, atau satu koma dengan 1-3 digit di belakangnya: pemisah ribuan (1,234,567 -> 1234567)
+        panjang_belakang = len(s) - s.rfind(',') - 1
+        if num_commas > 1 or 1 <= panjang_belakang <= 3: s = s.replace(",", "")
+        else: s = s.replace(",", ".")
     elif num_dots > 0: # Only dots
-        parts = s.split('.')
-        if num_dots > 1 : # e.g. 1.234.567 -> 1234567
-            s = s.replace(".", "")
-        elif len(parts[-1]) == 3 and len(parts[0]) > 0 and parts[0].isdigit() and parts[1].isdigit(): # e.g. 1.234 -> 1234
+        if num_dots > 1: # e.g. 1.234.567 -> 1234567
             s = s.replace(".", "")
+        else:
+            bagian_depan, _, bagian_belakang = s.partition('.')
+            if len(bagian_belakang) == 3 and bagian_depan.isdigit() and bagian_belakang.isdigit(): # e.g. 1.234 -> 1234
+                s = bagian_depan + bagian_belakang
         # else: e.g. 123.45 (decimal) or file.234 (non-numeric) -> leave as is, float() will handle
-    
-    original_s_for_debug = s # save before final non-numeric strip
-    
+
     s_sign = ""
     if s.startswith('-'):
         s_sign = "-"
         s = s[1:]
-    s = re.sub(r"[^\d.]", "", s) # Remove non-numeric except dot
-    
+    s = POLA_BUKAN_ANGKA_TITIK_SARANA.sub("", s) # Remove non-numeric except dot
+
     # Handle multiple dots after stripping, e.g. "1.2.3" becomes ""
     if s.count('.') > 1:
-        s = re.sub(r"[^\d]", "", s) # Remove all dots if more than one
+        s = POLA_BUKAN_DIGIT_SARANA.sub("", s) # Remove all dots if more than one
 
     s = s_sign + s
 
@@ -284,9 +359,37 @@ def normalisasi_nilai_keuangan_sarana(string_nilai: str) -> float | None:
         val_float = float(s)
         return -val_float if neg and val_float >= 0 else val_float
     except ValueError:
-        # print(f"DEBUG Sarana: Gagal konversi '{string_nilai}' -> '{original_s_for_debug}' -> '{s}'")
         return None
 
+def normalisasi_nilai_keuangan_sarana(string_nilai: str) -> float | None:
+    if not string_nilai or not isinstance(string_nilai, str): return None
+    return _normalisasi_nilai_keuangan_memo_sarana(string_nilai)
+
+def normalisasi_nilai_keuangan_batch_sarana(daftar_nilai):
+    """
+    Menormalisasi banyak token sekaligus. List/tuple menghasilkan list (None untuk token tak valid);
+    array NumPy atau Series pandas menghasilkan array float64 berbentuk sama dengan NaN untuk token tak valid.
+    Tiap token unik hanya dinormalisasi sekali.
+    """
+    # Cek list/tuple lebih dulu agar proksi np/pd tidak memuat NumPy/pandas untuk input biasa
+    if not isinstance(daftar_nilai, (list, tuple)) and isinstance(daftar_nilai, (np.ndarray, pd.Series)):
+        nilai_array = np.asarray(daftar_nilai, dtype=object)
+        unik, indeks_balik = np.unique(nilai_array.ravel().astype(str), return_inverse=True)
+        # astype(str) mengubah None/NaN menjadi "None"/"nan"; keduanya tidak mengandung digit sehingga hasilnya NaN
+        hasil_unik = np.array([normalisasi_nilai_keuangan_sarana(token) for token in unik], dtype=float)
+        hasil = hasil_unik[indeks_balik].reshape(nilai_array.shape)
+        return pd.Series(hasil, index=daftar_nilai.index) if isinstance(daftar_nilai, pd.Series) else hasil
+    hasil_per_token = {}
+    hasil = []
+    for token in daftar_nilai:
+        if not isinstance(token, str):
+            hasil.append(None)
+            continue
+        if token not in hasil_per_token:
+            hasil_per_token[token] = normalisasi_nilai_keuangan_sarana(token)
+        hasil.append(hasil_per_token[token])
+    return hasil
+
 def identifikasi_tahun_pelaporan_sarana(teks_dokumen: str, jumlah_karakter_awal: int = 7000) -> str | None:
     if not teks_dokumen: return None
     teks_pencarian = teks_dokumen[:jumlah_karakter_awal].lower()
@@ -328,7 +431,96 @@ def is_another_keyword_present_sarana(line_text: str, current_kata_dasar: str, d
             if v.lower() in line_text.lower(): return True
     return False
 
-def ekstrak_data_keuangan_tahunan_sarana(teks_dokumen: str, daftar_kata_kunci: list[dict] | None = None, pengali_global: float = 1.0) -> dict:
+def _regex_dari_trie_sarana(simpul: dict) -> str:
+    # Trie -> regex bersarang (mis. "laba(?: bersih| kotor)?"). Kuantor greedy membuat match terpanjang dicoba dulu.
+    terminal = '' in simpul
+    cabang = [re.escape(karakter) + _regex_dari_trie_sarana(anak) for karakter, anak in sorted(simpul.items()) if karakter != '']
+    if not cabang: return ''
+    if len(cabang) == 1 and not terminal: return cabang[0]
+    regex_cabang = '(?:' + '|'.join(cabang) + ')'
+    return regex_cabang + '?' if terminal else regex_cabang
+
+class _IndeksKataKunciTeksSarana:
+    """Semua kemunculan variasi kata kunci dalam satu teks, terurut berdasarkan posisi."""
+
+    def __init__(self, otomaton: "_OtomatonKataKunciSarana", teks: str):
+        self.otomaton = otomaton
+        self.posisi_per_variasi = defaultdict(list)
+        self.awal_kemunculan = []
+        self.kemunculan = [] # (awal, akhir, variasi), terurut berdasarkan awal
+        for match in otomaton.pola.finditer(teks):
+            awal = match.start()
+            terpanjang = match.group(1)
+            # Variasi lain yang cocok di posisi yang sama pasti prefiks dari variasi terpanjang
+            for variasi in otomaton.prefiks_variasi[terpanjang]:
+                self.posisi_per_variasi[variasi].append(awal)
+                self.awal_kemunculan.append(awal)
+                self.kemunculan.append((awal, awal + len(variasi), variasi))
+
+    def iter_posisi_variasi(self, variasi_lower: str):
+        """Posisi kemunculan tanpa tumpang tindih, sama seperti pencarian berulang dengan str.find."""
+        posisi_berikutnya = 0
+        for awal in self.posisi_per_variasi.get(variasi_lower, ()):
+            if awal >= posisi_berikutnya:
+                yield awal
+                posisi_berikutnya = awal + len(variasi_lower)
+
+    def ada_kata_kunci_lain(self, awal: int, akhir: int, kata_dasar_saat_ini: str) -> bool:
+        """Setara is_another_keyword_present_sarana(teks[awal:akhir], kata_dasar_saat_ini, daftar_kata_kunci)."""
+        if self.otomaton.pemilik_variasi_kosong - {kata_dasar_saat_ini}:
+            return True
+        i = bisect.bisect_left(self.awal_kemunculan, awal)
+        batas_awal = akhir - self.otomaton.panjang_variasi_min
+        while i < len(self.kemunculan) and self.kemunculan[i][0] <= batas_awal:
+            _, akhir_kemunculan, variasi = self.kemunculan[i]
+            if akhir_kemunculan <= akhir and self.otomaton.pemilik_variasi[variasi] - {kata_dasar_saat_ini}:
+                return True
+            i += 1
+        return False
+
+class _OtomatonKataKunciSarana:
+    """
+    Pencocok multi-pola untuk satu daftar kata kunci: semua variasi digabung menjadi satu regex berbentuk trie
+    sehingga seluruh kemunculan ditemukan dalam satu kali lintasan teks.
+    """
+
+    def __init__(self, kunci_daftar: tuple):
+        self.pemilik_variasi = defaultdict(set)
+        self.pemilik_variasi_kosong = set()
+        for kata_dasar, daftar_variasi in kunci_daftar:
+            for variasi in daftar_variasi:
+                variasi_lower = variasi.lower()
+                if variasi_lower: self.pemilik_variasi[variasi_lower].add(kata_dasar)
+                else: self.pemilik_variasi_kosong.add(kata_dasar)
+        semua_variasi = sorted(self.pemilik_variasi)
+        self.panjang_variasi_min = min((len(v) for v in semua_variasi), default=1)
+        self.prefiks_variasi = {
+            variasi: [lain for lain in semua_variasi if variasi.startswith(lain)] for variasi in semua_variasi
+        }
+        trie = {}
+        for variasi in semua_variasi:
+            simpul = trie
+            for karakter in variasi:
+                simpul = simpul.setdefault(karakter, {})
+            simpul[''] = True
+        # Lookahead lebar-nol agar kemunculan yang saling tumpang tindih tetap ditemukan
+        self.pola = re.compile(f"(?=({_regex_dari_trie_sarana(trie)}))") if semua_variasi else re.compile(r"(?!x)x")
+
+    def indeks(self, teks: str) -> _IndeksKataKunciTeksSarana:
+        return _IndeksKataKunciTeksSarana(self, teks)
+
+@functools.lru_cache(maxsize=32)
+def _dapatkan_otomaton_kata_kunci_sarana(kunci_daftar: tuple) -> _OtomatonKataKunciSarana:
+    return _OtomatonKataKunciSarana(kunci_daftar)
+
+def dapatkan_otomaton_kata_kunci_sarana(daftar_kata_kunci: list[dict]) -> _OtomatonKataKunciSarana:
+    """Otomaton untuk daftar kata kunci, dibangun sekali dan di-cache per isi daftar."""
+    kunci_daftar = tuple((info["kata_dasar"], tuple(info["variasi"])) for info in daftar_kata_kunci)
+    return _dapatkan_otomaton_kata_kunci_sarana(kunci_daftar)
+
+def ekstrak_data_keuangan_tahunan_sarana(teks_dokumen: str, daftar_kata_kunci: list[dict] | None = None, pengali_global: float = 1.0,
+                                         hanya_kata_dasar: set[str] | None = None) -> dict:
+    # hanya_kata_dasar membatasi kata kunci yang dicari; daftar lengkap tetap dipakai untuk cek "kata kunci lain"
     if daftar_kata_kunci is None: daftar_kata_kunci = DAFTAR_KATA_KUNCI_KEUANGAN_SARANA_DEFAULT
     data_hasil_ekstraksi = {info["kata_dasar"]: {'t': None, 't-1': None} for info in daftar_kata_kunci}
     if not teks_dokumen or not isinstance(teks_dokumen, str): return data_hasil_ekstraksi
@@ -339,8 +531,12 @@ def ekstrak_data_keuangan_tahunan_sarana(teks_dokumen: str, daftar_kata_kunci: l
     MAX_VALUES_TO_CAPTURE = 2
     MAX_TOKENS_AFTER_KEYWORD_TO_SEARCH = 30 # Increased slightly
 
+    # Satu lintasan untuk semua kemunculan kata kunci; dipakai untuk pencarian dan cek "kata kunci lain"
+    indeks_kata_kunci = dapatkan_otomaton_kata_kunci_sarana(daftar_kata_kunci).indeks(processed_text)
+
     for info_kata_kunci in daftar_kata_kunci:
         kata_dasar_target = info_kata_kunci["kata_dasar"]
+        if hanya_kata_dasar is not None and kata_dasar_target not in hanya_kata_dasar: continue
         ditemukan_nilai_untuk_kata_dasar_ini = False
 
         # Sort variations by length, longest first, to match more specific phrases first
@@ -349,7 +545,6 @@ def ekstrak_data_keuangan_tahunan_sarana(teks_dokumen: str, daftar_kata_kunci: l
         for variasi in sorted_variasi:
             if ditemukan_nilai_untuk_kata_dasar_ini: break
             variasi_lower = variasi.lower()
-            current_search_pos = 0
             
             # Special handling for "Arus kas bersih yang diperoleh dari aktivitas investasi"
             # This logic needs to be robust. The previous one was complex and might overfit.
@@ -391,10 +586,7 @@ def ekstrak_data_keuangan_tahunan_sarana(teks_dokumen: str, daftar_kata_kunci: l
                 if ditemukan_nilai_untuk_kata_dasar_ini: continue # Go to next keyword in outer loop
 
             # Standard search logic
-            while current_search_pos < len(processed_text):
-                keyword_pos = processed_text.find(variasi_lower, current_search_pos)
-                if keyword_pos == -1: break
-
+            for keyword_pos in indeks_kata_kunci.iter_posisi_variasi(variasi_lower):
                 # Check if this match is part of a longer, more specific keyword variation already processed
                 # This is somewhat handled by sorting variations by length.
                 
@@ -406,6 +598,10 @@ def ekstrak_data_keuangan_tahunan_sarana(teks_dokumen: str, daftar_kata_kunci: l
                 text_after_keyword_segment = processed_text[start_of_value_search_area : min(len(processed_text), end_of_value_search_area)]
                 
                 potential_value_tokens = re.split(r'\s+', text_after_keyword_segment.strip())
+                # Teks sudah ber-spasi tunggal, jadi " ".join(potential_value_tokens[:token_idx]) sama dengan
+                # processed_text[awal_token_pertama : awal_token_pertama + panjang_teks_antara]
+                awal_token_pertama = start_of_value_search_area + len(text_after_keyword_segment) - len(text_after_keyword_segment.lstrip())
+                panjang_teks_antara = 0
                 
                 tokens_checked = 0
                 for token_idx, token in enumerate(potential_value_tokens):
@@ -415,14 +611,14 @@ def ekstrak_data_keuangan_tahunan_sarana(teks_dokumen: str, daftar_kata_kunci: l
                     normalized_val = normalisasi_nilai_keuangan_sarana(token)
                     if normalized_val is not None:
                         # Check context: is there another keyword between current keyword and this value?
-                        text_between_keyword_and_value = " ".join(potential_value_tokens[:token_idx])
-                        if is_another_keyword_present_sarana(text_between_keyword_and_value, kata_dasar_target, daftar_kata_kunci):
+                        if indeks_kata_kunci.ada_kata_kunci_lain(awal_token_pertama, awal_token_pertama + panjang_teks_antara, kata_dasar_target):
                             # If another keyword is found before this number, this number likely belongs to that other keyword.
                             # So, stop searching for values for the *current* keyword instance.
                             break 
                         
                         values_found_for_this_instance.append(normalized_val * pengali_global)
                         if len(values_found_for_this_instance) >= MAX_VALUES_TO_CAPTURE: break
+                    panjang_teks_antara += len(token) + (1 if token_idx > 0 else 0)
                 
                 if values_found_for_this_instance:
                     # Check if we already have values for this kata_dasar_target.
@@ -434,12 +630,260 @@ def ekstrak_data_keuangan_tahunan_sarana(teks_dokumen: str, daftar_kata_kunci: l
                             data_hasil_ekstraksi[kata_dasar_target]['t-1'] = values_found_for_this_instance[1]
                         ditemukan_nilai_untuk_kata_dasar_ini = True # Mark as found for this base keyword
                         break # Found for this variation, move to next base keyword
-                
-                current_search_pos = keyword_pos + len(variasi_lower) # Continue search for same variation
+                # Continue search for same variation (posisi berikutnya dari indeks, tanpa tumpang tindih)
             if ditemukan_nilai_untuk_kata_dasar_ini: break # From variasi loop
     return data_hasil_ekstraksi
 
 
+class PelacakKataKunciSarana:
+    """
+    Menjalankan ekstraksi kata kunci per halaman selagi hasil OCR berdatangan, untuk menghentikan OCR halaman
+    sisa lebih awal: begitu setiap kata_dasar sudah memiliki nilai 't' dan 't-1' (henti_saat_lengkap), atau
+    setelah maks_halaman_ocr halaman di-OCR. Hanya memutuskan kapan berhenti; nilai akhir tetap diekstrak
+    dari teks gabungan halaman yang sudah diproses. Aman dipanggil dari banyak thread OCR.
+    Dengan callback_progres, kata kunci yang ditemukan sejauh ini dilaporkan per halaman (event
+    "kata_kunci_halaman"); tanpa henti_saat_lengkap dan maks_halaman_ocr, pelacak hanya melapor.
+    """
+
+    def __init__(self, daftar_kata_kunci: list[dict], henti_saat_lengkap: bool = True, maks_halaman_ocr: int | None = None,
+                 callback_progres=None):
+        self.daftar_kata_kunci = daftar_kata_kunci
+        self.henti_saat_lengkap = henti_saat_lengkap
+        self.maks_halaman_ocr = maks_halaman_ocr if maks_halaman_ocr and maks_halaman_ocr > 0 else None
+        self.callback_progres = callback_progres
+        self.kata_dasar_tersisa = {info["kata_dasar"] for info in daftar_kata_kunci}
+        self.kata_dasar_ditemukan = set() # Sudah punya nilai 't' (belum tentu 't-1')
+        self.halaman_diperiksa = 0
+        self.halaman_ocr = 0
+        self.alasan_berhenti = None
+        self._lock = threading.Lock()
+
+    @property
+    def sidik(self) -> str:
+        # Ikut masuk kunci cache teks dokumen: teks hasil henti dini bisa lebih pendek dari teks lengkap
+        return f"{int(self.henti_saat_lengkap)}:{self.maks_halaman_ocr}:{sidik_daftar_kata_kunci_sarana(self.daftar_kata_kunci)}"
+
+    @property
+    def membatasi(self) -> bool:
+        """True jika pelacak bisa menghentikan OCR (bukan sekadar melaporkan progres)."""
+        return bool(self.henti_saat_lengkap or self.maks_halaman_ocr)
+
+    @property
+    def selesai(self) -> bool:
+        return self.alasan_berhenti is not None
+
+    def tambah_halaman(self, teks_halaman: str | None, dari_ocr: bool = True, nomor_halaman: int | None = None) -> bool:
+        """Memproses teks satu halaman (None = halaman tidak relevan); True jika OCR halaman sisa boleh dihentikan."""
+        with self._lock:
+            if self.alasan_berhenti is not None:
+                return True
+            kata_dasar_dicari = set(self.kata_dasar_tersisa)
+        # Ekstraksi di luar lock: thread OCR lain tidak menunggu halaman ini selesai dipindai
+        teks_valid = bool(teks_halaman) and not teks_halaman.startswith("Error")
+        data_halaman = None
+        if teks_valid and kata_dasar_dicari:
+            try:
+                data_halaman = ekstrak_data_keuangan_tahunan_sarana(
+                    teks_halaman, daftar_kata_kunci=self.daftar_kata_kunci, hanya_kata_dasar=kata_dasar_dicari
+                )
+            except Exception as e:
+                print(f"Warning: Ekstraksi kata kunci per halaman gagal, henti dini diabaikan untuk halaman ini: {e}")
+        kata_dasar_baru = []
+        with self._lock:
+            if self.alasan_berhenti is not None:
+                return True
+            if dari_ocr:
+                self.halaman_ocr += 1
+            if teks_valid:
+                self.halaman_diperiksa += 1
+            if data_halaman is not None:
+                kata_dasar_baru = sorted(kd for kd, nilai in data_halaman.items()
+                                         if nilai['t'] is not None and kd not in self.kata_dasar_ditemukan)
+                self.kata_dasar_ditemukan.update(kata_dasar_baru)
+                self.kata_dasar_tersisa -= {kd for kd, nilai in data_halaman.items()
+                                            if nilai['t'] is not None and nilai['t-1'] is not None}
+            if self.henti_saat_lengkap and not self.kata_dasar_tersisa:
+                self.alasan_berhenti = "kata_kunci_lengkap"
+            elif self.maks_halaman_ocr and self.halaman_ocr >= self.maks_halaman_ocr:
+                self.alasan_berhenti = "batas_halaman_ocr"
+            berhenti = self.alasan_berhenti is not None
+            jumlah_ditemukan = len(self.kata_dasar_ditemukan)
+            jumlah_lengkap = len(self.daftar_kata_kunci) - len(self.kata_dasar_tersisa)
+        if kata_dasar_baru:
+            _laporkan_progres_sarana(self.callback_progres, tahap="kata_kunci_halaman",
+                                     halaman_kata_kunci=nomor_halaman + 1 if nomor_halaman is not None else None,
+                                     kata_kunci_baru=kata_dasar_baru, kata_kunci_ditemukan=jumlah_ditemukan,
+                                     kata_kunci_lengkap=jumlah_lengkap, total_kata_kunci=len(self.daftar_kata_kunci))
+        return berhenti
+
+    def ringkasan(self) -> dict:
+        with self._lock:
+            return {"alasan": self.alasan_berhenti, "halaman_ocr": self.halaman_ocr,
+                    "halaman_diperiksa": self.halaman_diperiksa,
+                    "kata_kunci_tersisa": len(self.kata_dasar_tersisa),
+                    "total_kata_kunci": len(self.daftar_kata_kunci)}
+
+
+# --- Ekstraksi berbasis tata letak (kata + bbox dari lapisan teks PDF) ---
+# Dipakai metode 'pymupdf_layout': kolom angka laporan keuangan ditentukan dari posisi kata, bukan dari urutan
+# token dalam teks yang sudah diratakan, sehingga nilai 't' dan 't-1' diambil dari kolom yang benar.
+KATA_KOLOM_CATATAN_SARANA = {"catatan", "notes", "note", "catatannotes"}
+POLA_NOMOR_CATATAN_SARANA = re.compile(r"\d{1,2}[a-z]?(?:[.,]\d{1,2}[a-z]?)?")
+POLA_TAHUN_KOLOM_SARANA = re.compile(r"20\d{2}")
+
+def _tampak_numerik_sarana(teks: str) -> bool:
+    # Sama dengan is_potentially_numeric di SaranaModule/pengekstrak_kata_kunci.py
+    return bool(re.search(r'\d', teks)) and not re.search(r'[a-zA-Z]{3,}', teks)
+
+def _siapkan_kata_halaman_sarana(kata_halaman: list[dict]) -> list[dict]:
+    kata_siap = []
+    for kata in kata_halaman:
+        teks = str(kata.get('text', '')).strip()
+        bounds = kata.get('bounds')
+        if not teks or not bounds or len(bounds) != 4: continue
+        x0, y0, x1, y1 = bounds
+        teks_bersih = re.sub(r'[^\w\s]', '', teks.lower())
+        nilai = normalisasi_nilai_keuangan_sarana(teks) if _tampak_numerik_sarana(teks) else None
+        kata_siap.append({
+            'teks': teks, 'bersih': teks_bersih, 'nilai': nilai,
+            'tahun': int(teks_bersih) if POLA_TAHUN_KOLOM_SARANA.fullmatch(teks_bersih) else None,
+            'x0': x0, 'x1': x1, 'y0': y0, 'y1': y1, 'cy': (y0 + y1) / 2,
+        })
+    return kata_siap
+
+def _kelompokkan_baris_kata_sarana(kata_siap: list[dict]) -> list[list[dict]]:
+    """Mengelompokkan kata menjadi baris visual berdasarkan pusat vertikal; tiap baris terurut dari kiri."""
+    if not kata_siap: return []
+    tinggi = sorted(k['y1'] - k['y0'] for k in kata_siap)
+    toleransi = max(tinggi[len(tinggi) // 2], 1.0) * 0.5
+    daftar_baris, pusat_baris = [], None
+    for kata in sorted(kata_siap, key=lambda k: k['cy']):
+        if daftar_baris and abs(kata['cy'] - pusat_baris) <= toleransi:
+            daftar_baris[-1].append(kata)
+            pusat_baris += (kata['cy'] - pusat_baris) / len(daftar_baris[-1])
+        else:
+            daftar_baris.append([kata])
+            pusat_baris = kata['cy']
+    for baris in daftar_baris: baris.sort(key=lambda k: k['x0'])
+    return daftar_baris
+
+def _kelompokkan_kolom_angka_sarana(kata_siap: list[dict], lebar_halaman: float) -> list[dict]:
+    """
+    Mengelompokkan kata numerik menjadi kolom berdasarkan tepi kanan (angka laporan keuangan rata kanan),
+    lalu menandai kolom "Catatan"/"Notes" dan tahun pada judul kolom. Kolom diberi peringkat menurut tahun
+    judulnya (tahun berbeda terbaru = 0) jika ada minimal dua tahun berbeda, selain itu menurut posisi dari kiri.
+    """
+    angka = sorted((k for k in kata_siap if k['nilai'] is not None), key=lambda k: k['x1'])
+    if not angka: return []
+    toleransi = max(lebar_halaman * 0.02, 4.0)
+    daftar_kolom = []
+    for kata in angka:
+        if daftar_kolom and kata['x1'] - daftar_kolom[-1]['x1_terakhir'] <= toleransi:
+            kolom = daftar_kolom[-1]
+        else:
+            kolom = {'anggota': [], 'x0': kata['x0'], 'x1': kata['x1']}
+            daftar_kolom.append(kolom)
+        kolom['anggota'].append(kata)
+        kolom['x1_terakhir'] = kata['x1']
+        kolom['x0'], kolom['x1'] = min(kolom['x0'], kata['x0']), max(kolom['x1'], kata['x1'])
+
+    judul_catatan = [k for k in kata_siap if k['bersih'] in KATA_KOLOM_CATATAN_SARANA]
+    for kolom in daftar_kolom:
+        anggota = sorted(kolom['anggota'], key=lambda k: k['cy'])
+        nilai_kolom = [k for k in anggota if k['tahun'] is None]
+        # Tahun judul kolom: kata tahun terdekat di atas nilai angka pertama kolom ini. Tahun tanpa angka di bawahnya
+        # (mis. "2023" dari "31 Desember 2023" di judul halaman atau label baris) bukan judul kolom.
+        tahun_di_atas = [k for k in anggota if k['tahun'] is not None and nilai_kolom and k['y1'] <= nilai_kolom[0]['y0']]
+        kolom['judul'] = tahun_di_atas[-1] if tahun_di_atas else None
+        kolom['tahun'] = kolom['judul']['tahun'] if kolom['judul'] else None
+        ada_judul_catatan = any(k['x0'] <= kolom['x1'] + toleransi and k['x1'] >= kolom['x0'] - toleransi for k in judul_catatan)
+        nomor_catatan = sum(1 for k in nilai_kolom if POLA_NOMOR_CATATAN_SARANA.fullmatch(k['teks'].lower().strip('()')))
+        kolom['catatan'] = ada_judul_catatan or (bool(nilai_kolom) and nomor_catatan >= 0.8 * len(nilai_kolom))
+
+    kolom_nilai = [kolom for kolom in daftar_kolom if not kolom['catatan']]
+    kolom_bertahun = [kolom for kolom in kolom_nilai if kolom['tahun'] is not None]
+    tahun_berbeda = sorted({kolom['tahun'] for kolom in kolom_bertahun}, reverse=True)
+    if len(tahun_berbeda) >= 2:
+        # Peringkat dari tahun terbaru: 't' lalu 't-1', apa pun urutan kolomnya di halaman. Kolom dengan tahun
+        # sama (mis. konsolidasian dan entitas induk) berbagi peringkat; nilai terkiri dalam baris yang dipakai.
+        for kolom in kolom_bertahun: kolom['peringkat'] = tahun_berbeda.index(kolom['tahun'])
+    else:
+        for peringkat, kolom in enumerate(sorted(kolom_nilai, key=lambda kolom: kolom['x1'])): kolom['peringkat'] = peringkat
+    return daftar_kolom
+
+class _TataLetakHalamanSarana:
+    """Baris dan kolom angka satu halaman, dihitung sekali dan dipakai untuk semua kata kunci."""
+
+    def __init__(self, kata_halaman: list[dict], lebar_halaman: float | None = None):
+        kata_siap = _siapkan_kata_halaman_sarana(kata_halaman)
+        if lebar_halaman is None:
+            lebar_halaman = max((k['x1'] for k in kata_siap), default=0.0)
+        self.baris = _kelompokkan_baris_kata_sarana(kata_siap)
+        self.urutan_bersih_baris = [[k['bersih'] for k in baris] for baris in self.baris]
+        self.peringkat_kolom = {}
+        for kolom in _kelompokkan_kolom_angka_sarana(kata_siap, lebar_halaman):
+            for kata in kolom['anggota']:
+                if kolom.get('judul') is kata: continue
+                self.peringkat_kolom[id(kata)] = kolom.get('peringkat')
+
+    def nilai_setelah_kata_kunci(self, kata_variasi: list[str]) -> list[dict]:
+        """
+        Untuk tiap kemunculan frasa kata kunci dalam satu baris: {peringkat_kolom: nilai} di kanan frasa.
+        Frasa harus diikuti angka, token tanpa huruf, atau akhir baris, agar "Jumlah aset" tidak cocok
+        dengan baris "Jumlah aset lancar".
+        """
+        hasil = []
+        n = len(kata_variasi)
+        for baris, urutan_bersih in zip(self.baris, self.urutan_bersih_baris):
+            for i in range(len(urutan_bersih) - n + 1):
+                if urutan_bersih[i:i + n] != kata_variasi: continue
+                if i + n < len(baris) and baris[i + n]['nilai'] is None and any(c.isalpha() for c in urutan_bersih[i + n]):
+                    continue
+                batas_kiri = baris[i + n - 1]['x1']
+                nilai_per_kolom = {}
+                for kata in baris[i + n:]:
+                    if kata['x0'] < batas_kiri or kata['nilai'] is None: continue
+                    peringkat = self.peringkat_kolom.get(id(kata))
+                    if peringkat is not None and peringkat not in nilai_per_kolom:
+                        nilai_per_kolom[peringkat] = kata['nilai']
+                if nilai_per_kolom: hasil.append(nilai_per_kolom)
+        return hasil
+
+def ekstrak_data_keuangan_dari_tata_letak_sarana(halaman_kata: list[list[dict]], daftar_kata_kunci: list[dict] | None = None,
+                                                 pengali_global: float = 1.0, lebar_halaman: list[float] | None = None) -> dict:
+    """
+    Mengekstrak nilai 't' dan 't-1' per kata kunci dari kata ber-bbox per halaman ({'text', 'bounds': [x0, y0, x1, y1]}).
+    Nilai diambil dari baris visual yang sama dengan kata kunci; 't' adalah kolom angka pertama (atau kolom tahun
+    terbaru jika judul tahun terdeteksi) dan 't-1' kolom berikutnya. Kolom "Catatan" dilewati.
+    """
+    if daftar_kata_kunci is None: daftar_kata_kunci = DAFTAR_KATA_KUNCI_KEUANGAN_SARANA_DEFAULT
+    data_hasil_ekstraksi = {info["kata_dasar"]: {'t': None, 't-1': None} for info in daftar_kata_kunci}
+    tata_letak = [
+        _TataLetakHalamanSarana(kata_halaman, lebar_halaman[i] if lebar_halaman else None)
+        for i, kata_halaman in enumerate(halaman_kata) if kata_halaman
+    ]
+    if not tata_letak: return data_hasil_ekstraksi
+
+    for info_kata_kunci in daftar_kata_kunci:
+        kata_dasar_target = info_kata_kunci["kata_dasar"]
+        for variasi in sorted(info_kata_kunci["variasi"], key=len, reverse=True):
+            kata_variasi = [kata for kata in (re.sub(r'[^\w\s]', '', bagian) for bagian in variasi.lower().split()) if kata]
+            if not kata_variasi: continue
+            ditemukan = None
+            for halaman in tata_letak:
+                for nilai_per_kolom in halaman.nilai_setelah_kata_kunci(kata_variasi):
+                    if 0 in nilai_per_kolom:
+                        ditemukan = nilai_per_kolom
+                        break
+                if ditemukan: break
+            if ditemukan:
+                data_hasil_ekstraksi[kata_dasar_target]['t'] = ditemukan[0] * pengali_global
+                if 1 in ditemukan:
+                    data_hasil_ekstraksi[kata_dasar_target]['t-1'] = ditemukan[1] * pengali_global
+                break
+    return data_hasil_ekstraksi
+
+
 # --- Konten dari SaranaModule/parser_dokumen_teks.py ---
 def ekstrak_teks_dari_txt_sarana(path_file_txt: str) -> str:
     try:
@@ -483,28 +927,83 @@ def ekstrak_data_dari_csv_sarana(path_file_csv: str) -> str:
 # --- Konten dari SaranaModule/parser_gambar.py --- (Simplified for brevity, assuming full content is complex)
 DEFAULT_OPSI_PRAPROSES_SARANA = {
     'dpi_target': 300, 'min_ocr_height': 1000,
-    'denoising': {'type': 'fastNlMeans', 'h': 10}, 'sharpening': False,
+    # Halaman PDF hasil scan: DPI render dipilih dari resolusi gambar tertanam dan perkiraan tinggi teks
+    'adaptive_dpi': True, 'dpi_min': 150, 'dpi_max': 400, 'target_text_height_px': 30, 'text_height_sample_dpi': 72,
+    # Denoise hanya jika perkiraan sigma noise (skala abu 0-255) mencapai min_noise_sigma. Bawaan median 3x3 (murah);
+    # 'fastNlMeans' (parameter 'h') jauh lebih lambat pada halaman DPI tinggi sehingga hanya dipakai jika diminta.
+    'denoising': {'type': 'median', 'ksize': 3, 'min_noise_sigma': 3.0}, 'sharpening': False,
     'contrast': {'alpha': 1.5, 'beta': 0},
     'binarization': {'method': 'adaptive_gaussian', 'block_size': 31, 'C': 2, 'invert': True},
-    'deskew': True, 'remove_borders': False, 'crop_final': True,
-    'easyocr_gpu': False, 'pyocr_lang': 'ind+eng',
+    'deskew': True, 'deskew_max_angle': 15.0, 'deskew_min_angle': 0.1, 'remove_borders': False, 'crop_final': True,
+    # Gambar besar (>= min_pixels): tahap per piksel (denoise, binarisasi adaptif) dikerjakan per ubin secara paralel
+    'tiling': {'enabled': True, 'tile_size': 1024, 'min_pixels': 4_000_000},
+    'easyocr_gpu': False, 'easyocr_langs': ['id', 'en'], 'pyocr_lang': 'ind+eng',
     'tesseract_config': r'--oem 3 --psm 3'
 }
 
-def _konversi_ke_skala_abu_gambar(gambar_cv):
+def _konversi_ke_skala_abu_gambar(gambar_cv, urutan_kanal: str = 'BGR'):
     if len(gambar_cv.shape) == 2: return gambar_cv
+    if len(gambar_cv.shape) == 3 and gambar_cv.shape[2] == 1: return gambar_cv[:, :, 0]
     if len(gambar_cv.shape) == 3 and gambar_cv.shape[2] in [3, 4]:
+        if urutan_kanal == 'RGB':
+            return cv2.cvtColor(gambar_cv, cv2.COLOR_RGB2GRAY if gambar_cv.shape[2] == 3 else cv2.COLOR_RGBA2GRAY)
         return cv2.cvtColor(gambar_cv, cv2.COLOR_BGR2GRAY if gambar_cv.shape[2] == 3 else cv2.COLOR_BGRA2GRAY)
     return gambar_cv
 
-def _coba_pelurusan_kemiringan_gambar(gambar_cv_biner):
-    coords = np.column_stack(np.where(gambar_cv_biner > 0))
-    if coords.shape[0] < 5: return gambar_cv_biner
-    rect = cv2.minAreaRect(coords)
-    sudut = rect[-1]
-    if sudut < -45: sudut = -(90 + sudut)
-    else: sudut = -sudut
-    if abs(sudut) < 0.1: return gambar_cv_biner
+# Sudut kemiringan diestimasi pada salinan kecil (sisi terpanjang <= nilai ini); rotasi hanya sekali, pada resolusi penuh
+SISI_MAKS_ESTIMASI_KEMIRINGAN_SARANA = 2000
+# Batas jumlah piksel teks yang dipakai menilai profil proyeksi (diambil berselang jika lebih)
+MAKS_TITIK_ESTIMASI_KEMIRINGAN_SARANA = 150_000
+LANGKAH_KASAR_KEMIRINGAN_SARANA = 1.0
+LANGKAH_HALUS_KEMIRINGAN_SARANA = 0.05
+# Jumlah sudut yang dinilai sekaligus: ~8 x 150.000 titik x 8 byte (~10 MB) per array sementara
+UKURAN_KELOMPOK_SUDUT_KEMIRINGAN_SARANA = 8
+
+def _skor_profil_proyeksi_sarana(baris, kolom, daftar_sudut) -> np.ndarray:
+    """
+    Skor tiap sudut kandidat (derajat): profil proyeksi horizontal piksel teks setelah diputar sebesar sudut itu,
+    dinilai dengan jumlah kuadrat selisih bin bertetangga. Saat baris teks lurus, profil bergantian tajam antara
+    baris teks dan spasi sehingga skornya maksimum. Sudut dihitung per kelompok UKURAN_KELOMPOK_SUDUT_KEMIRINGAN_SARANA
+    dengan satu bincount per kelompok, sehingga array sementara berukuran kelompok x titik, bukan semua sudut x titik.
+    """
+    daftar_sudut = np.asarray(daftar_sudut, dtype=np.float64)
+    skor = np.empty(len(daftar_sudut), dtype=np.float64)
+    for awal in range(0, len(daftar_sudut), UKURAN_KELOMPOK_SUDUT_KEMIRINGAN_SARANA):
+        radian = np.deg2rad(daftar_sudut[awal:awal + UKURAN_KELOMPOK_SUDUT_KEMIRINGAN_SARANA])[:, None]
+        indeks = np.rint(baris[None, :] * np.cos(radian) - kolom[None, :] * np.sin(radian)).astype(np.int64)
+        indeks -= indeks.min(axis=1, keepdims=True)
+        # Selalu sisakan satu bin kosong di ujung agar skor tiap sudut tidak bergantung pada sudut lain sekelompok
+        panjang = int(indeks.max()) + 2
+        indeks += np.arange(len(radian), dtype=np.int64)[:, None] * panjang
+        profil = np.bincount(indeks.ravel(), minlength=len(radian) * panjang).reshape(len(radian), panjang)
+        skor[awal:awal + len(radian)] = (np.diff(profil.astype(np.float64), axis=1) ** 2).sum(axis=1)
+    return skor
+
+def estimasi_sudut_kemiringan_sarana(gambar_cv_biner, sudut_maks: float = 15.0) -> float:
+    """
+    Sudut kemiringan (derajat, konvensi cv2.getRotationMatrix2D untuk meluruskan) dari gambar biner berteks putih.
+    Pencarian kasar per 1 derajat dalam +-sudut_maks lalu halus per 0.05 derajat di sekitar sudut terbaik,
+    semuanya pada salinan yang diperkecil.
+    """
+    skala = SISI_MAKS_ESTIMASI_KEMIRINGAN_SARANA / max(gambar_cv_biner.shape[:2])
+    if skala < 1:
+        gambar_cv_biner = cv2.resize(gambar_cv_biner, None, fx=skala, fy=skala, interpolation=cv2.INTER_AREA)
+    baris, kolom = np.nonzero(gambar_cv_biner >= 64) # Goresan tipis jadi abu-abu setelah INTER_AREA
+    if baris.size < 50: return 0.0
+    langkah_titik = -(-baris.size // MAKS_TITIK_ESTIMASI_KEMIRINGAN_SARANA)
+    baris, kolom = baris[::langkah_titik].astype(np.float64), kolom[::langkah_titik].astype(np.float64)
+
+    sudut_kasar = np.arange(-sudut_maks, sudut_maks + LANGKAH_KASAR_KEMIRINGAN_SARANA / 2, LANGKAH_KASAR_KEMIRINGAN_SARANA)
+    terbaik = sudut_kasar[int(np.argmax(_skor_profil_proyeksi_sarana(baris, kolom, sudut_kasar)))]
+    sudut_halus = np.arange(terbaik - LANGKAH_KASAR_KEMIRINGAN_SARANA, terbaik + LANGKAH_KASAR_KEMIRINGAN_SARANA + LANGKAH_HALUS_KEMIRINGAN_SARANA / 2,
+                            LANGKAH_HALUS_KEMIRINGAN_SARANA)
+    terbaik = sudut_halus[int(np.argmax(_skor_profil_proyeksi_sarana(baris, kolom, sudut_halus)))]
+    return round(float(terbaik), 2)
+
+def _coba_pelurusan_kemiringan_gambar(gambar_cv_biner, sudut_maks: float = 15.0, sudut_min: float = 0.1, statistik: dict | None = None):
+    sudut = estimasi_sudut_kemiringan_sarana(gambar_cv_biner, sudut_maks)
+    if statistik is not None: statistik['sudut_kemiringan'] = sudut
+    if abs(sudut) < sudut_min: return gambar_cv_biner # Terlalu kecil untuk mengganggu OCR; hindari rotasi penuh
     (h, w) = gambar_cv_biner.shape[:2]
     M = cv2.getRotationMatrix2D((w // 2, h // 2), sudut, 1.0)
     return cv2.warpAffine(gambar_cv_biner, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
@@ -512,23 +1011,212 @@ def _coba_pelurusan_kemiringan_gambar(gambar_cv_biner):
 def _bersihkan_satu_baris_gambar(line_text: str) -> str:
     return re.sub(r'\s+', ' ', line_text).strip()
 
-def _ocr_dengan_ollama_gambar(path_gambar: str, prompt_pengguna: str) -> list[str]:
-    if ollama is None: return [] # Ollama not available
+def _ocr_dengan_ollama_gambar(path_gambar: str | bytes, prompt_pengguna: str) -> list[str]:
+    # path_gambar boleh berupa path file atau bytes gambar ter-encode (PNG/JPEG) di memori
+    if not _muat_ollama_sarana(): return [] # Ollama not available
     try:
-        if not os.path.exists(path_gambar): return []
-        response = ollama.chat(model="llama3.2-vision", messages=[{"role": "user", "content": prompt_pengguna, "images": [path_gambar]}])
-        if response and response.get('message') and response['message'].get('content'):
-            return response['message']['content'].strip().splitlines()
-        return []
+        if isinstance(path_gambar, str) and not os.path.exists(path_gambar): return []
+        # Klien bersama, dibatasi per model, dan di-cache per hash gambar + prompt
+        konten = sarana_ollama.chat_ollama_sarana(sarana_ollama.SARANA_OLLAMA_VISION_MODEL, prompt_pengguna, [path_gambar],
+                                                  direktori_cache=_direktori_cache_sarana(None))
+        return konten.strip().splitlines() if konten else []
     except Exception as e:
         print(f"Error OCR Ollama (SaranaGambar): {e}")
         return []
 
+# Mask Laplacian untuk estimasi noise (Immerkaer); untuk noise putih, std respons = 6 x sigma noise
+KERNEL_ESTIMASI_NOISE_SARANA = ((1, -2, 1), (-2, 4, -2), (1, -2, 1))
+UKURAN_POTONGAN_ESTIMASI_NOISE_SARANA = 1024
+PORSI_RESPONS_ESTIMASI_NOISE_SARANA = 0.9
+
+def perkiraan_sigma_noise_sarana(gambar_gray: np.ndarray) -> float:
+    """
+    Perkiraan murah sigma noise gambar skala abu dari potongan tengah (metode Immerkaer). 10% respons Laplacian
+    terbesar dibuang agar tepi huruf tidak ikut terhitung noise; rata-rata (bukan median) dipakai karena latar
+    putih yang terpotong di 255 menyembunyikan separuh noise dari median.
+    """
+    tinggi, lebar = gambar_gray.shape[:2]
+    y0 = max(0, (tinggi - UKURAN_POTONGAN_ESTIMASI_NOISE_SARANA) // 2)
+    x0 = max(0, (lebar - UKURAN_POTONGAN_ESTIMASI_NOISE_SARANA) // 2)
+    potongan = gambar_gray[y0:y0 + UKURAN_POTONGAN_ESTIMASI_NOISE_SARANA, x0:x0 + UKURAN_POTONGAN_ESTIMASI_NOISE_SARANA]
+    if potongan.shape[0] < 3 or potongan.shape[1] < 3: return 0.0
+    respons = cv2.filter2D(potongan.astype(np.float32), -1, np.array(KERNEL_ESTIMASI_NOISE_SARANA, dtype=np.float32))[1:-1, 1:-1]
+    respons = np.abs(respons).ravel()
+    jumlah_dipakai = int(respons.size * PORSI_RESPONS_ESTIMASI_NOISE_SARANA)
+    if jumlah_dipakai == 0: return 0.0
+    respons = np.partition(respons, jumlah_dipakai - 1)[:jumlah_dipakai]
+    return float(respons.mean() * np.sqrt(np.pi / 2) / 6.0)
+
+# Thread praproses per ubin, dipakai bersama oleh semua gambar di proses ini (OpenCV melepas GIL)
+SARANA_PRAPROSES_UBIN_WORKERS = max(1, int(os.environ.get("SARANA_PRAPROSES_UBIN_WORKERS", os.cpu_count() or 1)))
+_executor_ubin_sarana: concurrent.futures.ThreadPoolExecutor | None = None
+_executor_ubin_sarana_lock = threading.Lock()
+
+def _get_executor_ubin_sarana() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor_ubin_sarana
+    with _executor_ubin_sarana_lock:
+        if _executor_ubin_sarana is None:
+            _executor_ubin_sarana = concurrent.futures.ThreadPoolExecutor(
+                max_workers=SARANA_PRAPROSES_UBIN_WORKERS, thread_name_prefix="sarana-ubin"
+            )
+        return _executor_ubin_sarana
+
+def proses_per_ubin_sarana(gambar: np.ndarray, fungsi, halo: int, ukuran_ubin: int) -> np.ndarray:
+    """
+    Menjalankan fungsi gambar->gambar (ukuran sama) per ubin secara paralel. Tiap ubin diperluas halo piksel ke
+    segala arah dan hanya bagian tengahnya yang disalin ke hasil; jika halo >= jari-jari filter, hasilnya sama
+    dengan memproses gambar utuh (tidak ada sambungan di batas ubin).
+    """
+    tinggi, lebar = gambar.shape[:2]
+    hasil = np.empty_like(gambar)
+
+    def _kerjakan(y: int, x: int):
+        y0, x0 = max(0, y - halo), max(0, x - halo)
+        y1, x1 = min(tinggi, y + ukuran_ubin + halo), min(lebar, x + ukuran_ubin + halo)
+        ubin = fungsi(gambar[y0:y1, x0:x1])
+        ty, tx = min(ukuran_ubin, tinggi - y), min(ukuran_ubin, lebar - x)
+        hasil[y:y + ty, x:x + tx] = ubin[y - y0:y - y0 + ty, x - x0:x - x0 + tx]
+
+    futures = [_get_executor_ubin_sarana().submit(_kerjakan, y, x)
+               for y in range(0, tinggi, ukuran_ubin) for x in range(0, lebar, ukuran_ubin)]
+    for future in futures: future.result()
+    return hasil
+
+def _catat_durasi_sarana(statistik: dict | None, nama_tahap: str, waktu_mulai: float) -> float:
+    # Menambahkan durasi (ms) tahap ke statistik (jika ada) dan mengembalikan waktu sekarang untuk tahap berikutnya
+    sekarang = time.perf_counter()
+    if statistik is not None:
+        statistik[f"{nama_tahap}_ms"] = round(statistik.get(f"{nama_tahap}_ms", 0.0) + (sekarang - waktu_mulai) * 1000, 2)
+    return sekarang
+
+def praproses_gambar_untuk_ocr_sarana(gambar_cv: np.ndarray, opts: dict, urutan_kanal: str = 'BGR', statistik: dict | None = None) -> np.ndarray:
+    """
+    Menjalankan praproses (skala abu, denoise bersyarat, binarisasi, pelurusan) pada array gambar dan mengembalikan
+    gambar siap OCR. Denoise (mahal pada resolusi tinggi) dilewati jika perkiraan noise di bawah
+    opts['denoising']['min_noise_sigma']. Untuk gambar besar (opts['tiling']), denoise dan binarisasi adaptif
+    dikerjakan per ubin secara paralel. Jika statistik diberikan, durasi tiap tahap (ms) dan sigma noise dicatat di sana.
+    """
+    waktu = time.perf_counter()
+    proc_img = _konversi_ke_skala_abu_gambar(gambar_cv, urutan_kanal)
+    waktu = _catat_durasi_sarana(statistik, "skala_abu", waktu)
+
+    opsi_ubin = opts.get('tiling') or {}
+    per_ubin = bool(opsi_ubin.get('enabled')) and proc_img.size >= opsi_ubin.get('min_pixels', 0)
+
+    def _filter_lokal(fungsi, halo: int):
+        # Filter yang hasil tiap pikselnya hanya bergantung pada tetangga dalam jarak halo
+        if not per_ubin: return fungsi(proc_img)
+        return proses_per_ubin_sarana(proc_img, fungsi, halo, opsi_ubin.get('tile_size', 1024))
+    if statistik is not None and per_ubin: statistik['per_ubin'] = True
+
+    denoise_opt = opts.get('denoising') or {}
+    if denoise_opt.get('type') in ('fastNlMeans', 'median'):
+        sigma_noise = perkiraan_sigma_noise_sarana(proc_img)
+        waktu = _catat_durasi_sarana(statistik, "estimasi_noise", waktu)
+        perlu_denoise = sigma_noise >= denoise_opt.get('min_noise_sigma', 0.0)
+        if perlu_denoise:
+            if denoise_opt['type'] == 'fastNlMeans':
+                # Jangkauan piksel = radius jendela pencarian (21) + radius template (7)
+                proc_img = _filter_lokal(lambda ubin: cv2.fastNlMeansDenoising(
+                    ubin, None, h=denoise_opt.get('h', 10), templateWindowSize=7, searchWindowSize=21), 21 // 2 + 7 // 2)
+            else:
+                ksize = denoise_opt.get('ksize', 3)
+                proc_img = _filter_lokal(lambda ubin: cv2.medianBlur(ubin, ksize), ksize // 2)
+            waktu = _catat_durasi_sarana(statistik, "denoise", waktu)
+        if statistik is not None:
+            statistik['sigma_noise'] = round(sigma_noise, 2)
+            statistik['denoise'] = perlu_denoise
+
+    bin_opt = opts['binarization']
+    invert_bin = bin_opt.get('invert', True)
+    thresh_type_cv = cv2.THRESH_BINARY_INV if invert_bin else cv2.THRESH_BINARY
+    if bin_opt['method'] == 'adaptive_gaussian':
+        proc_img = _filter_lokal(lambda ubin: cv2.adaptiveThreshold(
+            ubin, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, thresh_type_cv, bin_opt['block_size'], bin_opt['C']), bin_opt['block_size'] // 2)
+    elif bin_opt['method'] == 'otsu': # Ambang Otsu bersifat global, jadi tidak dipecah per ubin
+         _, proc_img = cv2.threshold(proc_img, 0, 255, thresh_type_cv + cv2.THRESH_OTSU)
+    if not invert_bin: proc_img = cv2.bitwise_not(proc_img) # Ensure text is white
+    waktu = _catat_durasi_sarana(statistik, "binarisasi", waktu)
+
+    if opts.get('deskew'):
+        proc_img = _coba_pelurusan_kemiringan_gambar(proc_img, opts.get('deskew_max_angle', 15.0), opts.get('deskew_min_angle', 0.1), statistik)
+        _catat_durasi_sarana(statistik, "deskew", waktu)
+    return proc_img
+
+# Toleransi selisih y (piksel) agar dua kotak teks EasyOCR dianggap satu baris
+TOLERANSI_Y_BARIS_EASYOCR_SARANA = 10
+
+def _susun_baris_easyocr_sarana(hasil_readtext: list) -> list[str]:
+    # Hasil readtext (bbox, teks, keyakinan) diurutkan per posisi lalu digabung per baris, seperti parser_gambar.py
+    blok_teks = sorted(
+        ((int(bbox[0][1]), int(bbox[0][0]), teks) for bbox, teks, _ in hasil_readtext if teks.strip()),
+        key=lambda blok: (blok[0], blok[1])
+    )
+    baris_hasil, elemen_baris = [], []
+    for blok in blok_teks:
+        if elemen_baris and abs(blok[0] - elemen_baris[-1][0]) > TOLERANSI_Y_BARIS_EASYOCR_SARANA:
+            baris_bersih = _bersihkan_satu_baris_gambar(' '.join(elemen[2] for elemen in elemen_baris))
+            if baris_bersih: baris_hasil.append(baris_bersih)
+            elemen_baris = []
+        elemen_baris.append(blok)
+    if elemen_baris:
+        baris_bersih = _bersihkan_satu_baris_gambar(' '.join(elemen[2] for elemen in elemen_baris))
+        if baris_bersih: baris_hasil.append(baris_bersih)
+    return baris_hasil
+
+def _ocr_gambar_terproses_sarana(gambar_untuk_ocr: np.ndarray, mesin_ocr: str, opts: dict) -> list[str]:
+    lines_result = []
+    if mesin_ocr == 'tesseract':
+        # In-process (tesserocr) jika tersedia, selain itu pytesseract; format data sama dengan Output.DICT
+        data = sarana_tesseract.image_to_data_sarana(gambar_untuk_ocr, lang=opts.get('pyocr_lang', 'ind+eng'), config=opts.get('tesseract_config'))
+        lines_data = {}
+        for i in range(len(data['level'])):
+            if data['level'][i] == 5 and data['text'][i].strip(): # Word level
+                line_key = (data['page_num'][i], data['block_num'][i], data['par_num'][i], data['line_num'][i])
+                lines_data.setdefault(line_key, []).append(data['text'][i])
+        for key in sorted(lines_data.keys()):
+            cleaned_line = _bersihkan_satu_baris_gambar(' '.join(lines_data[key]))
+            if cleaned_line: lines_result.append(cleaned_line)
+    elif mesin_ocr == 'easyocr':
+        # Reader diambil dari pool per proses (dibuat sekali per bahasa/GPU), bukan dibuat ulang per gambar
+        try:
+            with sarana_easyocr.pinjam_reader_easyocr(opts.get('easyocr_langs'), opts.get('easyocr_gpu', False)) as reader:
+                hasil_readtext = reader.readtext(gambar_untuk_ocr, detail=1, paragraph=False)
+        except sarana_easyocr.EasyOCRTidakTersediaError as e:
+            print(f"Error: {e}")
+            return []
+        lines_result = _susun_baris_easyocr_sarana(hasil_readtext)
+    else:
+        print(f"Mesin OCR '{mesin_ocr}' tidak didukung (SaranaGambar).")
+        return []
+    return lines_result
+
+def ekstrak_teks_dari_array_gambar_sarana(gambar_array: np.ndarray, mesin_ocr: str = 'tesseract', opsi_praproses: dict = None,
+                                          prompt_ollama: str = "get all the data from the image", urutan_kanal: str = 'RGB') -> list[str]:
+    """
+    Sama seperti ekstrak_teks_dari_gambar_sarana, tetapi menerima gambar sebagai array NumPy (misal view
+    dari sampel pixmap PyMuPDF) sehingga tidak perlu encode/simpan/baca file gambar.
+    """
+    opts = DEFAULT_OPSI_PRAPROSES_SARANA.copy()
+    if opsi_praproses: opts.update(opsi_praproses)
+    try:
+        if mesin_ocr == 'ollama':
+            # Ollama butuh gambar ter-encode; encode di memori tanpa file temporer
+            gambar_bgr = gambar_array
+            if urutan_kanal == 'RGB' and gambar_array.ndim == 3 and gambar_array.shape[2] in [3, 4]:
+                gambar_bgr = cv2.cvtColor(gambar_array, cv2.COLOR_RGB2BGR if gambar_array.shape[2] == 3 else cv2.COLOR_RGBA2BGRA)
+            berhasil, buffer_png = cv2.imencode(".png", gambar_bgr)
+            if not berhasil: return ["Error Gambar: Gagal meng-encode gambar untuk Ollama"]
+            return _ocr_dengan_ollama_gambar(buffer_png.tobytes(), prompt_ollama)
+        gambar_untuk_ocr = praproses_gambar_untuk_ocr_sarana(gambar_array, opts, urutan_kanal)
+        return _ocr_gambar_terproses_sarana(gambar_untuk_ocr, mesin_ocr, opts)
+    except Exception as e:
+        return [f"Error Gambar: {e}"]
+
 def ekstrak_teks_dari_gambar_sarana(path_gambar: str, mesin_ocr: str = 'tesseract', opsi_praproses: dict = None, prompt_ollama: str = "get all the data from the image") -> list[str]:
     opts = DEFAULT_OPSI_PRAPROSES_SARANA.copy()
     if opsi_praproses: opts.update(opsi_praproses)
     
-    lines_result = []
     try:
         if mesin_ocr == 'ollama':
             # For Ollama, typically use original image path directly
@@ -538,45 +1226,8 @@ def ekstrak_teks_dari_gambar_sarana(path_gambar: str, mesin_ocr: str = 'tesserac
         gambar_pil = Image.open(path_gambar)
         gambar_pil.info['dpi'] = (opts['dpi_target'], opts['dpi_target'])
         gambar_cv = np.array(gambar_pil)
-        if gambar_cv.ndim == 3: # RGB/RGBA
-            gambar_cv = cv2.cvtColor(gambar_cv, cv2.COLOR_RGB2BGR if gambar_cv.shape[2]==3 else cv2.COLOR_RGBA2BGR)
-        
-        proc_img = _konversi_ke_skala_abu_gambar(gambar_cv)
-        # Apply other preprocessing steps like denoising, contrast, binarization, deskew from opts...
-        # For brevity, direct to Tesseract after basic grayscale
-        # This section would mirror the complex preprocessing in the original parser_gambar.py
-
-        # Binarization example (must be adapted from original)
-        bin_opt = opts['binarization']
-        invert_bin = bin_opt.get('invert', True)
-        thresh_type_cv = cv2.THRESH_BINARY_INV if invert_bin else cv2.THRESH_BINARY
-        if bin_opt['method'] == 'adaptive_gaussian':
-            proc_img = cv2.adaptiveThreshold(proc_img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, thresh_type_cv, bin_opt['block_size'], bin_opt['C'])
-        elif bin_opt['method'] == 'otsu':
-             _, proc_img = cv2.threshold(proc_img, 0, 255, thresh_type_cv + cv2.THRESH_OTSU)
-        if not invert_bin: proc_img = cv2.bitwise_not(proc_img) # Ensure text is white
-
-        if opts.get('deskew'): proc_img = _coba_pelurusan_kemiringan_gambar(proc_img)
-        # ... other preprocessing ...
-        
-        gambar_untuk_ocr = proc_img # This would be the fully preprocessed image
-
-        if mesin_ocr == 'tesseract':
-            pil_img_ocr = Image.fromarray(gambar_untuk_ocr)
-            data = pytesseract.image_to_data(pil_img_ocr, lang=opts.get('pyocr_lang', 'ind+eng'), config=opts.get('tesseract_config'), output_type=Output.DICT)
-            lines_data = {}
-            for i in range(len(data['level'])):
-                if data['level'][i] == 5 and data['text'][i].strip(): # Word level
-                    line_key = (data['page_num'][i], data['block_num'][i], data['par_num'][i], data['line_num'][i])
-                    lines_data.setdefault(line_key, []).append(data['text'][i])
-            for key in sorted(lines_data.keys()):
-                cleaned_line = _bersihkan_satu_baris_gambar(' '.join(lines_data[key]))
-                if cleaned_line: lines_result.append(cleaned_line)
-        # Add EasyOCR, PyOCR logic here if needed, similar to original file
-        else:
-            print(f"Mesin OCR '{mesin_ocr}' tidak didukung (SaranaGambar).")
-            return []
-        return lines_result
+        gambar_untuk_ocr = praproses_gambar_untuk_ocr_sarana(gambar_cv, opts, urutan_kanal='RGB')
+        return _ocr_gambar_terproses_sarana(gambar_untuk_ocr, mesin_ocr, opts)
     except FileNotFoundError:
         return [f"Error Gambar: File tidak ditemukan di {path_gambar}"]
     except Exception as e:
@@ -587,39 +1238,494 @@ def ekstrak_teks_dari_gambar_sarana(path_gambar: str, mesin_ocr: str = 'tesserac
 # Definisikan path untuk menyimpan gambar OCR temporer dari PDF
 SARANA_PDF_OCR_TEMP_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "temp_sarana_uploads", "pdf_ocr_pages")
 os.makedirs(SARANA_PDF_OCR_TEMP_DIR, exist_ok=True)
+# Jumlah thread OCR per dokumen; thread praproses = separuhnya. Antrian antar tahap dibatasi sebesar jumlah
+# thread, sehingga jumlah halaman di memori sebanding dengan jumlah worker, bukan jumlah halaman PDF.
+SARANA_PDF_OCR_WORKERS = max(1, int(os.environ.get("SARANA_PDF_OCR_WORKERS", min(8, os.cpu_count() or 1))))
+# Triase halaman "Entitas Induk": hanya pita atas halaman yang di-OCR dengan DPI rendah untuk memilih halaman
+# yang layak di-OCR penuh. Pita harus cukup tinggi untuk memuat judul halaman laporan.
+SARANA_TRIASE_DPI = int(os.environ.get("SARANA_TRIASE_DPI", 100))
+SARANA_TRIASE_TINGGI_PITA = float(os.environ.get("SARANA_TRIASE_TINGGI_PITA", 0.25))
+POLA_ENTITAS_INDUK_SARANA = re.compile(r"entitas\s+induk|parent\s+entity", re.IGNORECASE)
+
+def _pixmap_ke_array_sarana(pixmap) -> np.ndarray:
+    """
+    View NumPy (tanpa salin) atas sampel pixmap PyMuPDF, urutan kanal RGB(A) atau abu-abu.
+    View tidak menahan pixmap tetap hidup (samples_mv tidak mereferensikan objek Pixmap): pemanggil wajib
+    memegang pixmap di variabel selama view dipakai, dan menyalin (.copy()) jika hasilnya disimpan lebih lama.
+    Jangan memanggilnya langsung atas page.get_pixmap(...) sementara.
+    """
+    buffer_sampel = np.frombuffer(pixmap.samples_mv, dtype=np.uint8)
+    tinggi, lebar, kanal = pixmap.height, pixmap.width, pixmap.n
+    if pixmap.stride != lebar * kanal:
+        # Baris pixmap bisa ber-padding: ambil hanya bagian piksel tiap baris (tetap berupa view)
+        buffer_sampel = buffer_sampel.reshape(tinggi, pixmap.stride)[:, :lebar * kanal]
+    gambar = buffer_sampel.reshape(tinggi, lebar, kanal)
+    return gambar[:, :, 0] if kanal == 1 else gambar
+
+# Naikkan jika cara render/praproses halaman OCR berubah, agar teks dokumen, teks per halaman, dan hasil
+# parsing penuh di cache dari render lama tidak dipakai lagi
+VERSI_RENDER_PDF_OCR_SARANA = 4
+# Gambar tertanam yang menutupi kurang dari porsi halaman ini (logo, tanda tangan) tidak dipakai menentukan DPI
+PORSI_MIN_GAMBAR_HALAMAN_SARANA = 0.3
+
+def _resolusi_gambar_tertanam_sarana(page) -> float | None:
+    """DPI efektif gambar tertanam terbesar di halaman (hasil scan), atau None jika tidak ada yang cukup besar."""
+    luas_halaman = page.rect.width * page.rect.height
+    luas_terbesar, dpi_terbaik = 0.0, None
+    for info in page.get_image_info():
+        x0, y0, x1, y1 = info['bbox']
+        luas_pt = (x1 - x0) * (y1 - y0)
+        if luas_pt <= 0 or luas_pt < PORSI_MIN_GAMBAR_HALAMAN_SARANA * luas_halaman or luas_pt <= luas_terbesar:
+            continue
+        # Berbasis luas agar tetap benar untuk gambar yang diputar 90 derajat
+        luas_terbesar = luas_pt
+        dpi_terbaik = 72.0 * ((info['width'] * info['height']) / luas_pt) ** 0.5
+    return dpi_terbaik
+
+def _perkiraan_tinggi_teks_halaman_sarana(page, dpi_sampel: int) -> float | None:
+    """Median tinggi komponen terhubung mirip huruf (dalam point) dari render abu-abu beresolusi rendah."""
+    pixmap = page.get_pixmap(dpi=dpi_sampel, colorspace=pymupdf.csGRAY) # Dipegang selama view `gambar` dipakai
+    gambar = _pixmap_ke_array_sarana(pixmap)
+    _, biner = cv2.threshold(gambar, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(biner, connectivity=8)
+    tinggi, lebar = stats[1:, cv2.CC_STAT_HEIGHT], stats[1:, cv2.CC_STAT_WIDTH]
+    mirip_huruf = (tinggi >= 2) & (tinggi <= gambar.shape[0] * 0.05) & (lebar <= tinggi * 4)
+    if np.count_nonzero(mirip_huruf) < 20: return None
+    return float(np.median(tinggi[mirip_huruf])) * 72.0 / dpi_sampel
+
+def pilih_dpi_render_ocr_sarana(page, opts: dict) -> tuple[int, dict]:
+    """
+    DPI render untuk OCR halaman: cukup agar median tinggi huruf mendekati opts['target_text_height_px'],
+    tidak melebihi resolusi scan tertanam (tidak ada detail tambahan di atasnya), dibatasi dpi_min..dpi_max.
+    """
+    if not opts.get('adaptive_dpi'):
+        return int(opts['dpi_target']), {}
+    dpi_gambar = _resolusi_gambar_tertanam_sarana(page)
+    tinggi_teks_pt = _perkiraan_tinggi_teks_halaman_sarana(page, opts['text_height_sample_dpi'])
+    dpi = opts['target_text_height_px'] * 72.0 / tinggi_teks_pt if tinggi_teks_pt else opts['dpi_target']
+    if dpi_gambar: dpi = min(dpi, dpi_gambar)
+    dpi = int(round(min(max(dpi, opts['dpi_min']), opts['dpi_max'])))
+    return dpi, {'dpi_gambar': round(dpi_gambar, 1) if dpi_gambar else None,
+                 'tinggi_teks_pt': round(tinggi_teks_pt, 2) if tinggi_teks_pt else None}
+
+def _ringkas_statistik_ocr_pdf_sarana(statistik_halaman: dict) -> dict:
+    total_ms = defaultdict(float)
+    for statistik in statistik_halaman.values():
+        for nama, nilai in statistik.items():
+            if nama.endswith('_ms'): total_ms[nama] += nilai
+    daftar_dpi = [st['dpi'] for st in statistik_halaman.values() if st.get('dpi')]
+    jumlah = len(statistik_halaman)
+    return {
+        'halaman': jumlah,
+        'total_ms': {nama: round(nilai, 1) for nama, nilai in total_ms.items()},
+        'rata_rata_ms': {nama: round(nilai / jumlah, 1) for nama, nilai in total_ms.items()} if jumlah else {},
+        'dpi_min': min(daftar_dpi) if daftar_dpi else None,
+        'dpi_maks': max(daftar_dpi) if daftar_dpi else None,
+        'halaman_denoise': sum(1 for st in statistik_halaman.values() if st.get('denoise')),
+        'halaman_dari_cache': sum(1 for st in statistik_halaman.values() if st.get('dari_cache')),
+    }
 
-def _ocr_satu_halaman_pdf_worker(nomor_halaman: int, data_pixmap_bytes: bytes, ocr_func, mesin, opts_prep, prompt_ollama_pdf) -> tuple[int, str]:
-    # Menggunakan SARANA_PDF_OCR_TEMP_DIR untuk path gambar temporer
+def _simpan_pixmap_halaman_temp_sarana(nomor_halaman: int, pixmap) -> str:
+    # Dipanggil di thread render: pixmap.save masuk ke konteks MuPDF yang tidak thread-safe
     temp_img_path = os.path.join(SARANA_PDF_OCR_TEMP_DIR, f"page_{nomor_halaman}_{uuid.uuid4().hex}.png")
+    pixmap.save(temp_img_path)
+    return temp_img_path
+
+def _hapus_file_halaman_temp_sarana(temp_img_path: str):
+    if os.path.exists(temp_img_path):
+        try: os.remove(temp_img_path)
+        except Exception as e_remove_ocr_temp:
+             print(f"Warning: Gagal menghapus file OCR PDF temporer {temp_img_path}: {e_remove_ocr_temp}")
+
+def _ocr_halaman_pdf_via_file_sarana(temp_img_path: str, ocr_func, mesin, opts_prep, prompt_ollama_pdf):
+    # Jalur lama untuk fungsi OCR kustom yang hanya menerima path file gambar; file ditulis oleh thread render
     try:
-        img = Image.open(io.BytesIO(data_pixmap_bytes))
-        img.save(temp_img_path)
-        
         # Ensure correct parameters are passed based on OCR engine
         if mesin == 'ollama':
-            ocr_result_list = ocr_func(temp_img_path, mesin_ocr=mesin, prompt_ollama=prompt_ollama_pdf)
+            return ocr_func(temp_img_path, mesin_ocr=mesin, prompt_ollama=prompt_ollama_pdf)
+        return ocr_func(temp_img_path, mesin_ocr=mesin, opsi_praproses=opts_prep)
+    finally:
+        _hapus_file_halaman_temp_sarana(temp_img_path)
+
+def _ocr_satu_halaman_pdf_worker(nomor_halaman: int, data_halaman, ocr_func, mesin, opts_prep, prompt_ollama_pdf) -> tuple[int, str]:
+    """
+    data_halaman sudah disiapkan thread render: PNG bytes (Ollama bawaan), salinan array NumPy (OCR bawaan), atau
+    path file PNG temporer (fungsi OCR kustom). Tidak pernah pixmap, karena PyMuPDF tidak thread-safe.
+    """
+    try:
+        if ocr_func is ekstrak_teks_dari_gambar_sarana:
+            # Jalur langsung: tanpa file temporer
+            if mesin == 'ollama':
+                ocr_result_list = _ocr_dengan_ollama_gambar(data_halaman, prompt_ollama_pdf)
+            else:
+                ocr_result_list = ekstrak_teks_dari_array_gambar_sarana(
+                    data_halaman, mesin_ocr=mesin, opsi_praproses=opts_prep, urutan_kanal='RGB'
+                )
         else:
-            ocr_result_list = ocr_func(temp_img_path, mesin_ocr=mesin, opsi_praproses=opts_prep)
+            ocr_result_list = _ocr_halaman_pdf_via_file_sarana(data_halaman, ocr_func, mesin, opts_prep, prompt_ollama_pdf)
 
         ocr_text = '\n'.join(ocr_result_list).strip() if isinstance(ocr_result_list, list) else str(ocr_result_list).strip()
         return nomor_halaman, ocr_text
     except Exception as e:
         return nomor_halaman, f"Error OCR halaman {nomor_halaman}: {e}"
+
+def _ocr_batch_halaman_ollama_sarana(kelompok: list[tuple], prompt_ollama_pdf: str) -> list[str]:
+    """
+    kelompok: [(nomor_halaman, png_bytes, ...)]. Satu request vision untuk seluruh kelompok; halaman yang
+    penandanya tidak ditemukan di balasan (atau jika request batch gagal) di-OCR ulang satu per satu.
+    """
+    daftar_png = [item[1] for item in kelompok]
+    try:
+        hasil = sarana_ollama.ocr_batch_halaman_ollama_sarana(daftar_png, prompt_ollama_pdf,
+                                                              direktori_cache=_direktori_cache_sarana(None))
+    except Exception as e:
+        print(f"Warning: OCR batch Ollama {len(kelompok)} halaman gagal, diulang per halaman: {e}")
+        hasil = [None] * len(kelompok)
+    halaman_tanpa_penanda = [item[0] for item, teks in zip(kelompok, hasil) if teks is None]
+    if halaman_tanpa_penanda and len(kelompok) > 1:
+        print(f"INFO (SaranaPDF): Halaman {halaman_tanpa_penanda} tidak terpisah dari balasan batch Ollama, diulang per halaman.")
+    return [teks if teks is not None else '\n'.join(_ocr_dengan_ollama_gambar(png, prompt_ollama_pdf)).strip()
+            for png, teks in zip(daftar_png, hasil)]
+
+_SELESAI_PIPELINE_PDF = object()
+
+def _iter_halaman_tanpa_teks_pdf_sarana(doc, all_page_texts: list, pada_halaman_teks=None):
+    """
+    Mengisi all_page_texts dari lapisan teks PDF dan menghasilkan nomor halaman yang perlu OCR.
+    pada_halaman_teks(nomor, teks) dipanggil untuk halaman berlapisan teks; jika mengembalikan True, iterasi berhenti.
+    """
+    for i in range(len(doc)):
+        text = doc.load_page(i).get_text("text").strip()
+        if text:
+            all_page_texts[i] = text
+            if pada_halaman_teks is not None and pada_halaman_teks(i, text):
+                return
+        else:
+            yield i
+
+def _halaman_lolos_filter_entitas_induk_sarana(page_text_content: str | None) -> bool:
+    if not page_text_content: return False
+    awal_halaman = page_text_content[:200].lower()
+    return "entitas induk" in awal_halaman or "parent entity" in awal_halaman
+
+def _ocr_pita_triase_sarana(pita_gray: np.ndarray, lang: str) -> str:
+    # Praproses ringan saja: Otsu tanpa pelurusan, cukup untuk membaca judul halaman
+    _, pita_biner = cv2.threshold(pita_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return sarana_tesseract.image_to_string_sarana(pita_biner, lang=lang, config='--oem 3 --psm 6')
+
+def _triase_halaman_entitas_induk_sarana(doc, nomor_halaman_iter, opsi_praproses: dict | None, callback_progres=None,
+                                         hentikan=None):
+    """
+    Tahap pertama dua tahap OCR: me-render pita atas tiap halaman pada SARANA_TRIASE_DPI (skala abu) dan
+    meng-OCR-nya untuk mencari judul "Entitas Induk"/"Parent Entity". Hanya halaman yang lolos yang di-OCR penuh.
+    Generator: halaman terpilih di-yield begitu OCR pitanya selesai (urutan selesai, bukan urutan halaman),
+    sehingga pipeline OCR penuh berjalan bersamaan dengan triase. Jika OCR triase gagal untuk suatu halaman,
+    halaman tetap dipilih agar tidak hilang diam-diam. Jika hentikan() mengembalikan True, triase berhenti.
+    """
+    lang = (opsi_praproses or {}).get('pyocr_lang', DEFAULT_OPSI_PRAPROSES_SARANA['pyocr_lang'])
+    futures = {}
+    jumlah_ditriase = jumlah_terpilih = 0
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=SARANA_PDF_OCR_WORKERS)
+
+    def _halaman_jika_terpilih(future):
+        i = futures.pop(future)
+        try:
+            return i if POLA_ENTITAS_INDUK_SARANA.search(future.result()) else None
+        except Exception as e:
+            print(f"Warning: Triase OCR halaman {i} gagal, halaman tetap di-OCR penuh: {e}")
+            return i
+
+    def _berhenti() -> bool:
+        return hentikan is not None and hentikan()
+
+    try:
+        for i in nomor_halaman_iter:
+            if _berhenti(): return
+            page = doc.load_page(i)
+            rect = page.rect
+            clip = pymupdf.Rect(rect.x0, rect.y0, rect.x1, rect.y0 + rect.height * SARANA_TRIASE_TINGGI_PITA)
+            # Render di thread ini (PyMuPDF tidak thread-safe). Pixmap dipegang sampai salinan selesai dibuat
+            # karena array dari _pixmap_ke_array_sarana hanyalah view atas memorinya.
+            pixmap = page.get_pixmap(dpi=SARANA_TRIASE_DPI, clip=clip, colorspace=pymupdf.csGRAY)
+            pita = _pixmap_ke_array_sarana(pixmap).copy()
+            del pixmap
+            futures[executor.submit(_ocr_pita_triase_sarana, pita, lang)] = i
+            jumlah_ditriase += 1
+            # Salurkan halaman yang triasenya sudah selesai tanpa menunggu seluruh dokumen dirender
+            for future in [f for f in futures if f.done()]:
+                terpilih = _halaman_jika_terpilih(future)
+                if terpilih is not None:
+                    if _berhenti(): return
+                    jumlah_terpilih += 1
+                    yield terpilih
+        for future in concurrent.futures.as_completed(list(futures)):
+            terpilih = _halaman_jika_terpilih(future)
+            if terpilih is not None:
+                if _berhenti(): return
+                jumlah_terpilih += 1
+                yield terpilih
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        _laporkan_progres_sarana(callback_progres, tahap="triase_pdf", halaman_ditriase=jumlah_ditriase,
+                                 halaman_terpilih=jumlah_terpilih)
+
+def _jalankan_pipeline_ocr_pdf_sarana(doc, nomor_halaman_iter, all_page_texts: list, fungsi_ocr_gambar, mesin_ocr: str,
+                                      opsi_praproses: dict | None, prompt_ollama: str, callback_progres=None,
+                                      direktori_cache: str | None = None, pada_halaman_selesai=None) -> list[int]:
+    """
+    Meng-OCR halaman dari nomor_halaman_iter secara streaming:
+    render (thread pemanggil, karena PyMuPDF tidak thread-safe) -> antrian -> praproses -> antrian -> OCR.
+    Semua akses PyMuPDF (render, encode PNG, simpan file, pelepasan pixmap) terjadi di thread render; thread
+    praproses/OCR hanya menerima salinan array NumPy, PNG bytes, atau path file.
+    Antrian dibatasi sehingga render berhenti sementara jika OCR tertinggal. nomor_halaman_iter boleh berupa
+    generator (misal _iter_halaman_tanpa_teks_pdf_sarana) sehingga pembacaan teks ikut berjalan bersamaan.
+    Hasil OCR tiap halaman di-cache per hash piksel (lihat buat_kunci_cache_halaman_sarana); halaman yang
+    mengenai cache tidak dipraproses maupun di-OCR. Pada jalur bawaan, DPI render tiap halaman dipilih oleh
+    pilih_dpi_render_ocr_sarana; durasi render/praproses/OCR per halaman diringkas ke event progres
+    "statistik_ocr_pdf". Jika pada_halaman_selesai(nomor, teks) mengembalikan True, render dihentikan dan halaman
+    yang masih mengantri dilewati (tetap None di all_page_texts). Mengisi all_page_texts dan mengembalikan
+    nomor halaman yang di-OCR.
+    """
+    num_pages = len(all_page_texts)
+    jumlah_thread_ocr = SARANA_PDF_OCR_WORKERS
+    jumlah_thread_praproses = max(1, jumlah_thread_ocr // 2)
+    antrian_render = queue.Queue(maxsize=jumlah_thread_praproses)
+    antrian_ocr = queue.Queue(maxsize=jumlah_thread_ocr)
+    opts = DEFAULT_OPSI_PRAPROSES_SARANA.copy()
+    if opsi_praproses: opts.update(opsi_praproses)
+    # Halaman sudah dipraproses paralel per halaman; ubin paralel di dalam halaman hanya menambah kontensi
+    opts['tiling'] = {**(opts.get('tiling') or {}), 'enabled': False}
+    # Praproses terpisah hanya untuk jalur bawaan; Ollama/fungsi kustom dikerjakan utuh di tahap OCR.
+    praproses_terpisah = fungsi_ocr_gambar is ekstrak_teks_dari_gambar_sarana and mesin_ocr != 'ollama'
+    # Beberapa halaman per request vision (lihat sarana_ollama.SARANA_OLLAMA_BATCH_MAX_IMAGES)
+    batch_ollama = (mesin_ocr == 'ollama' and fungsi_ocr_gambar is ekstrak_teks_dari_gambar_sarana
+                    and sarana_ollama.SARANA_OLLAMA_BATCH_MAX_IMAGES > 1)
+    # Cache per halaman hanya untuk fungsi OCR bawaan; hasil fungsi kustom tidak bisa diwakili kunci opsi
+    info_kunci_halaman = None
+    if fungsi_ocr_gambar is ekstrak_teks_dari_gambar_sarana:
+        info_kunci_halaman = f"ocr:{mesin_ocr}_prep:{sidik_opsi_sarana(opsi_praproses)}_render:{VERSI_RENDER_PDF_OCR_SARANA}"
+        if mesin_ocr == 'ollama':
+            info_kunci_halaman += f"_prompt:{prompt_ollama}_model:{sarana_ollama.SARANA_OLLAMA_VISION_MODEL}"
+    halaman_ocr = []
+    statistik_halaman = {} # nomor halaman -> dpi, durasi tiap tahap (ms), sigma noise
+    lock_progres = threading.Lock()
+    jumlah_selesai = [0]
+    jumlah_dari_cache = [0]
+    jumlah_dilewati = [0]
+    berhenti = threading.Event()
+
+    def _halaman_selesai(num: int, text_res: str, dari_cache: bool = False):
+        all_page_texts[num] = text_res
+        with lock_progres:
+            jumlah_selesai[0] += 1
+            if dari_cache: jumlah_dari_cache[0] += 1
+            selesai_sekarang = jumlah_selesai[0]
+        _laporkan_progres_sarana(callback_progres, tahap="ocr_pdf", halaman=num + 1, dari_cache=dari_cache,
+                                 halaman_ocr_selesai=selesai_sekarang, total_halaman=num_pages)
+        if pada_halaman_selesai is not None and pada_halaman_selesai(num, text_res):
+            berhenti.set()
+
+    def _lewati_jika_berhenti(item) -> bool:
+        # Setelah henti dini, halaman yang masih mengantri dibuang tanpa praproses/OCR
+        if not berhenti.is_set():
+            return False
+        with lock_progres:
+            jumlah_dilewati[0] += len(item) if isinstance(item, list) else 1
+        if isinstance(item, tuple) and isinstance(item[1], str):
+            _hapus_file_halaman_temp_sarana(item[1]) # File temporer fungsi OCR kustom
+        return True
+
+    def _praproses_kelompok_ollama(kelompok: list):
+        # Halaman yang ada di cache diselesaikan di sini; sisanya dikirim ke tahap OCR sebagai satu batch PNG.
+        # PNG sudah di-encode di thread render, jadi thread ini tidak menyentuh PyMuPDF.
+        sisa = []
+        for num, png_halaman in kelompok:
+            kunci_halaman = buat_kunci_cache_halaman_sarana(png_halaman, info_kunci_halaman)
+            data_cache = ambil_dari_cache_sarana(kunci_halaman, direktori_cache)
+            if data_cache and isinstance(data_cache.get('teks_halaman'), str):
+                statistik_halaman[num]['dari_cache'] = True
+                _halaman_selesai(num, data_cache['teks_halaman'], dari_cache=True)
+            else:
+                sisa.append((num, png_halaman, kunci_halaman))
+        if sisa:
+            antrian_ocr.put(sisa)
+
+    def _ocr_kelompok_ollama(kelompok: list):
+        waktu_mulai_ocr = time.perf_counter()
+        daftar_teks = _ocr_batch_halaman_ollama_sarana(kelompok, prompt_ollama)
+        durasi_ms = (time.perf_counter() - waktu_mulai_ocr) * 1000
+        for (num, _, kunci_halaman), text_res in zip(kelompok, daftar_teks):
+            # Durasi request dibagi rata ke halaman dalam batch agar total per tahap tetap benar
+            statistik_halaman[num]['ocr_ms'] = round(durasi_ms / len(kelompok), 1)
+            statistik_halaman[num]['ukuran_batch'] = len(kelompok)
+            if text_res and not text_res.startswith("Error"):
+                simpan_ke_cache_sarana(kunci_halaman, {'teks_halaman': text_res, 'timestamp': time.time()}, direktori_cache)
+            _halaman_selesai(num, text_res)
+
+    def _tahap_praproses():
+        while True:
+            item = antrian_render.get()
+            if item is _SELESAI_PIPELINE_PDF: return
+            if _lewati_jika_berhenti(item): continue
+            if isinstance(item, list):
+                _praproses_kelompok_ollama(item)
+                continue
+            num, data_halaman = item
+            kunci_halaman = None
+            if info_kunci_halaman is not None:
+                # Hash dihitung di thread ini agar thread render tidak tertahan
+                kunci_halaman = buat_kunci_cache_halaman_sarana(data_halaman, info_kunci_halaman)
+                data_cache = ambil_dari_cache_sarana(kunci_halaman, direktori_cache)
+                if data_cache and isinstance(data_cache.get('teks_halaman'), str):
+                    del data_halaman, item
+                    statistik_halaman[num]['dari_cache'] = True
+                    _halaman_selesai(num, data_cache['teks_halaman'], dari_cache=True)
+                    continue
+            if praproses_terpisah:
+                try:
+                    gambar_terproses = praproses_gambar_untuk_ocr_sarana(data_halaman, opts, urutan_kanal='RGB',
+                                                                        statistik=statistik_halaman[num])
+                    item = (num, gambar_terproses, None, kunci_halaman)
+                except Exception as e:
+                    item = (num, None, f"Error OCR halaman {num}: Error Gambar: {e}", kunci_halaman)
+                del data_halaman # Salinan render bisa dibebaskan; tahap OCR hanya butuh gambar terproses
+            else:
+                item = (num, data_halaman, None, kunci_halaman)
+            antrian_ocr.put(item)
+
+    def _tahap_ocr():
+        while True:
+            item = antrian_ocr.get()
+            if item is _SELESAI_PIPELINE_PDF: return
+            if _lewati_jika_berhenti(item): continue
+            if isinstance(item, list):
+                _ocr_kelompok_ollama(item)
+                continue
+            num, data_halaman, error_halaman, kunci_halaman = item
+            waktu_mulai_ocr = time.perf_counter()
+            if error_halaman:
+                text_res = error_halaman
+            elif praproses_terpisah:
+                try:
+                    lines = _ocr_gambar_terproses_sarana(data_halaman, mesin_ocr, opts)
+                    text_res = '\n'.join(lines).strip()
+                except Exception as e:
+                    text_res = f"Error OCR halaman {num}: Error Gambar: {e}"
+            else:
+                _, text_res = _ocr_satu_halaman_pdf_worker(num, data_halaman, fungsi_ocr_gambar, mesin_ocr, opsi_praproses, prompt_ollama)
+            del item, data_halaman
+            _catat_durasi_sarana(statistik_halaman[num], "ocr", waktu_mulai_ocr)
+            if kunci_halaman and not text_res.startswith("Error"):
+                simpan_ke_cache_sarana(kunci_halaman, {'teks_halaman': text_res, 'timestamp': time.time()}, direktori_cache)
+            _halaman_selesai(num, text_res)
+
+    thread_praproses = [threading.Thread(target=_tahap_praproses, name=f"sarana-pdf-praproses-{i}", daemon=True) for i in range(jumlah_thread_praproses)]
+    thread_ocr = [threading.Thread(target=_tahap_ocr, name=f"sarana-pdf-ocr-{i}", daemon=True) for i in range(jumlah_thread_ocr)]
+    for t in thread_praproses + thread_ocr: t.start()
+    kelompok_ollama, token_kelompok = [], 0
+    try:
+        for i in nomor_halaman_iter:
+            if berhenti.is_set(): break
+            halaman_ocr.append(i)
+            waktu_mulai_render = time.perf_counter()
+            page = doc.load_page(i)
+            if praproses_terpisah:
+                dpi_render, statistik_halaman[i] = pilih_dpi_render_ocr_sarana(page, opts)
+                # Abu-abu langsung dari render: praproses toh membuang warna, dan memori halaman DPI tinggi jadi 1/3
+                pixmap = page.get_pixmap(dpi=dpi_render, colorspace=pymupdf.csGRAY)
+                statistik_halaman[i]['dpi'] = dpi_render
+            elif mesin_ocr == 'ollama' and fungsi_ocr_gambar is ekstrak_teks_dari_gambar_sarana:
+                # Cukup sebesar resolusi input model vision; lebih besar hanya akan diperkecil sebelum dikirim
+                dpi_render = sarana_ollama.dpi_render_untuk_ollama(page.rect.width, page.rect.height)
+                pixmap = page.get_pixmap(dpi=dpi_render)
+                statistik_halaman[i] = {'dpi': dpi_render}
+            else:
+                pixmap = page.get_pixmap()
+                statistik_halaman[i] = {}
+            # Ubah ke data biasa di thread ini; thread praproses/OCR tidak boleh memanggil PyMuPDF
+            if praproses_terpisah:
+                data_halaman = _pixmap_ke_array_sarana(pixmap).copy()
+            elif fungsi_ocr_gambar is ekstrak_teks_dari_gambar_sarana:
+                data_halaman = pixmap.tobytes("png")
+            else:
+                data_halaman = _simpan_pixmap_halaman_temp_sarana(i, pixmap)
+            _catat_durasi_sarana(statistik_halaman[i], "render", waktu_mulai_render)
+            _laporkan_progres_sarana(callback_progres, tahap="render_pdf", halaman_render=i + 1,
+                                     halaman_dirender=len(halaman_ocr), dpi=statistik_halaman[i].get('dpi'),
+                                     total_halaman=num_pages)
+            if batch_ollama:
+                # Halaman berurutan dikumpulkan sampai batas jumlah gambar / anggaran token batch
+                token_halaman = sarana_ollama.perkiraan_token_gambar_ollama(pixmap.width, pixmap.height)
+                if sarana_ollama.batch_ollama_penuh(len(kelompok_ollama), token_kelompok, token_halaman):
+                    antrian_render.put(kelompok_ollama)
+                    kelompok_ollama, token_kelompok = [], 0
+                kelompok_ollama.append((i, data_halaman)) # (nomor, PNG bytes)
+                token_kelompok += token_halaman
+            else:
+                antrian_render.put((i, data_halaman)) # Blok jika tahap praproses masih penuh
+            del page, pixmap, data_halaman
+        if kelompok_ollama:
+            antrian_render.put(kelompok_ollama)
+            kelompok_ollama = []
     finally:
-        if os.path.exists(temp_img_path):
-            try: os.remove(temp_img_path)
-            except Exception as e_remove_ocr_temp:
-                 print(f"Warning: Gagal menghapus file OCR PDF temporer {temp_img_path}: {e_remove_ocr_temp}")
+        # Generator sumber (misal triase) ditutup agar executor-nya ikut dibereskan saat berhenti lebih awal
+        if hasattr(nomor_halaman_iter, 'close'): nomor_halaman_iter.close()
+        for _ in thread_praproses: antrian_render.put(_SELESAI_PIPELINE_PDF)
+        for t in thread_praproses: t.join()
+        for _ in thread_ocr: antrian_ocr.put(_SELESAI_PIPELINE_PDF)
+        for t in thread_ocr: t.join()
+    if jumlah_dilewati[0]:
+        print(f"INFO (SaranaPDF): OCR dihentikan lebih awal; {jumlah_dilewati[0]} halaman yang sudah dirender dilewati.")
+        halaman_ocr = [i for i in halaman_ocr if all_page_texts[i] is not None]
+        statistik_halaman = {i: statistik_halaman[i] for i in halaman_ocr}
+    if jumlah_dari_cache[0]:
+        print(f"INFO (SaranaCache): {jumlah_dari_cache[0]} dari {len(halaman_ocr)} halaman OCR diambil dari cache halaman.")
+    if statistik_halaman:
+        ringkasan = _ringkas_statistik_ocr_pdf_sarana(statistik_halaman)
+        print(f"INFO (SaranaPDF): OCR {ringkasan['halaman']} halaman, DPI {ringkasan['dpi_min']}-{ringkasan['dpi_maks']}, "
+              f"denoise {ringkasan['halaman_denoise']} halaman, total ms per tahap: {ringkasan['total_ms']}")
+        _laporkan_progres_sarana(callback_progres, tahap="statistik_ocr_pdf", statistik_ocr_pdf=ringkasan)
+    return halaman_ocr
+
+def _laporkan_progres_sarana(callback_progres, **event):
+    # Callback progres bersifat opsional dan tidak boleh menggagalkan parsing.
+    if callback_progres is None:
+        return
+    try:
+        callback_progres(event)
+    except Exception as e:
+        print(f"Warning: Callback progres Sarana gagal: {e}")
 
 def ekstrak_teks_dari_pdf_sarana(path_file_pdf: str, fungsi_ocr_gambar_param, # Renamed to avoid conflict
                                  mesin_ocr_param: str = 'tesseract', opsi_praproses_param: dict = None,
                                  direktori_cache_param: str | None = None,
                                  prompt_ollama_param: str = "get all the data from the image",
-                                 metode_parsing_param: str = 'pymupdf') -> str:
-    kunci_cache = buat_kunci_cache_file_sarana(path_file_pdf, extra_key_info=f"method:{metode_parsing_param}_ocr:{mesin_ocr_param}")
+                                 metode_parsing_param: str = 'pymupdf',
+                                 hash_konten_param: str | None = None,
+                                 callback_progres=None,
+                                 filter_entitas_induk: bool = True,
+                                 pelacak_kata_kunci: PelacakKataKunciSarana | None = None) -> str:
+    """
+    Mengekstrak teks PDF. Untuk metode 'pymupdf', halaman tanpa lapisan teks di-OCR. Jika filter_entitas_induk
+    aktif, hanya halaman yang awal teksnya memuat "entitas induk"/"parent entity" yang dikembalikan, dan halaman
+    hasil scan ditriase dulu lewat OCR pita atas beresolusi rendah sehingga OCR penuh hanya untuk halaman terpilih.
+    Cache teks seluruh dokumen diperiksa lebih dulu; jika meleset, hasil OCR tiap halaman tetap diambil dari
+    cache halaman bila piksel halaman sama, sehingga hanya halaman yang berubah yang di-OCR ulang.
+    Dengan pelacak_kata_kunci (metode 'pymupdf'), kata kunci diekstrak per halaman selagi halaman selesai dan
+    halaman sisa tidak di-OCR lagi begitu pelacak menyatakan cukup (lihat PelacakKataKunciSarana).
+    """
+    info_kunci = f"method:{metode_parsing_param}_ocr:{mesin_ocr_param}_prep:{sidik_opsi_sarana(opsi_praproses_param)}"
+    info_kunci += f"_filter_induk:{int(bool(filter_entitas_induk))}_render:{VERSI_RENDER_PDF_OCR_SARANA}"
+    if pelacak_kata_kunci is not None and pelacak_kata_kunci.membatasi and metode_parsing_param == 'pymupdf':
+        info_kunci += f"_henti_dini:{pelacak_kata_kunci.sidik}"
+    if mesin_ocr_param == 'ollama':
+        info_kunci += (f"_prompt:{prompt_ollama_param}_model:{sarana_ollama.SARANA_OLLAMA_VISION_MODEL}"
+                       f"_batch:{sarana_ollama.SARANA_OLLAMA_BATCH_MAX_IMAGES}")
+    kunci_cache = buat_kunci_cache_file_sarana(path_file_pdf, extra_key_info=info_kunci, hash_konten=hash_konten_param)
     if kunci_cache:
         data_cache = ambil_dari_cache_sarana(kunci_cache, direktori_cache_param)
         if data_cache and 'teks_dokumen' in data_cache:
+            _laporkan_progres_sarana(callback_progres, tahap="cache_teks_pdf")
             return data_cache['teks_dokumen']
     else: return f"Error PDF: Berkas tidak ditemukan di {path_file_pdf}"
 
@@ -637,26 +1743,40 @@ def ekstrak_teks_dari_pdf_sarana(path_file_pdf: str, fungsi_ocr_gambar_param, #
             doc = pymupdf.open(path_file_pdf)
             num_pages = len(doc)
             all_page_texts = [None] * num_pages
-            pages_needing_ocr = []
-
-            for i in range(num_pages):
-                page = doc.load_page(i)
-                text = page.get_text("text").strip()
-                if text: all_page_texts[i] = text
-                else: pages_needing_ocr.append((i, page.get_pixmap().tobytes("png")))
-            
-            if pages_needing_ocr:
-                with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1 + 4)) as executor:
-                    futures = [executor.submit(_ocr_satu_halaman_pdf_worker, num, data, fungsi_ocr_gambar_param, mesin_ocr_param, opsi_praproses_param, prompt_ollama_param) for num, data in pages_needing_ocr]
-                    for future in concurrent.futures.as_completed(futures):
-                        num_res, text_res = future.result()
-                        all_page_texts[num_res] = text_res
+            pada_halaman_teks = pada_halaman_ocr = None
+            if pelacak_kata_kunci is not None:
+                def _pantau_halaman(num: int, teks: str, dari_ocr: bool) -> bool:
+                    # Halaman yang nanti dibuang filter Entitas Induk tetap dihitung ke batas OCR, tapi tidak diekstrak
+                    relevan = not filter_entitas_induk or _halaman_lolos_filter_entitas_induk_sarana(teks)
+                    return pelacak_kata_kunci.tambah_halaman(teks if relevan else None, dari_ocr=dari_ocr, nomor_halaman=num)
+                pada_halaman_teks = lambda num, teks: _pantau_halaman(num, teks, dari_ocr=False)
+                pada_halaman_ocr = lambda num, teks: _pantau_halaman(num, teks, dari_ocr=True)
+            halaman_tanpa_teks = _iter_halaman_tanpa_teks_pdf_sarana(doc, all_page_texts, pada_halaman_teks)
+            if filter_entitas_induk:
+                # Tahap 1: triase murah atas pita judul; tahap 2 (pipeline) hanya untuk halaman terpilih
+                # Halaman terpilih langsung mengalir ke pipeline; berhenti jika kata kunci sudah lengkap
+                halaman_tanpa_teks = _triase_halaman_entitas_induk_sarana(
+                    doc, halaman_tanpa_teks, opsi_praproses_param, callback_progres,
+                    hentikan=(lambda: pelacak_kata_kunci.selesai) if pelacak_kata_kunci is not None else None
+                )
+            pages_needing_ocr = _jalankan_pipeline_ocr_pdf_sarana(
+                doc, halaman_tanpa_teks, all_page_texts, fungsi_ocr_gambar_param, mesin_ocr_param, opsi_praproses_param,
+                prompt_ollama_param, callback_progres, direktori_cache=direktori_cache_param,
+                pada_halaman_selesai=pada_halaman_ocr
+            )
+            _laporkan_progres_sarana(callback_progres, tahap="teks_pdf", total_halaman=num_pages,
+                                     halaman_perlu_ocr=len(pages_needing_ocr))
+            if pelacak_kata_kunci is not None and pelacak_kata_kunci.selesai:
+                ringkasan_henti = pelacak_kata_kunci.ringkasan()
+                print(f"INFO (SaranaPDF): Henti dini ({ringkasan_henti['alasan']}) setelah {ringkasan_henti['halaman_ocr']} "
+                      f"halaman OCR; {ringkasan_henti['kata_kunci_tersisa']} kata kunci belum lengkap.")
+                _laporkan_progres_sarana(callback_progres, tahap="henti_dini", **ringkasan_henti)
             
-            # Filter for "Entitas Induk" pages
-            entitas_induk_texts = []
-            for page_text_content in all_page_texts:
-                if page_text_content and ("entitas induk" in page_text_content[:200].lower() or "parent entity" in page_text_content[:200].lower()):
-                    entitas_induk_texts.append(page_text_content)
+            if filter_entitas_induk:
+                # Filter for "Entitas Induk" pages
+                entitas_induk_texts = [t for t in all_page_texts if _halaman_lolos_filter_entitas_induk_sarana(t)]
+            else:
+                entitas_induk_texts = [t for t in all_page_texts if t]
             
             hasil_final = "\n\n".join(entitas_induk_texts) if entitas_induk_texts else ""
 
@@ -669,59 +1789,136 @@ def ekstrak_teks_dari_pdf_sarana(path_file_pdf: str, fungsi_ocr_gambar_param, #
         simpan_ke_cache_sarana(kunci_cache, {'teks_dokumen': hasil_final, 'timestamp': time.time()}, direktori_cache_param)
     return hasil_final
 
+def ekstrak_kata_berposisi_dari_pdf_sarana(path_file_pdf: str, filter_entitas_induk: bool = True) -> tuple[list[list[dict]], list[float]] | str:
+    """
+    Mengambil kata beserta bbox dari lapisan teks PDF (page.get_text("words")) untuk ekstraksi berbasis tata letak.
+    Halaman tanpa lapisan teks (hasil scan) dilewati; filter "Entitas Induk" sama dengan ekstrak_teks_dari_pdf_sarana.
+    Mengembalikan (kata per halaman, lebar per halaman) atau string error.
+    """
+    doc = None
+    try:
+        doc = pymupdf.open(path_file_pdf)
+        halaman_kata, lebar_halaman = [], []
+        for page in doc:
+            words = page.get_text("words")
+            if not words: continue
+            if filter_entitas_induk and not _halaman_lolos_filter_entitas_induk_sarana(page.get_text("text").strip()):
+                continue
+            halaman_kata.append([{'text': w[4], 'bounds': [w[0], w[1], w[2], w[3]]} for w in words])
+            lebar_halaman.append(page.rect.width)
+        return halaman_kata, lebar_halaman
+    except Exception as e: return f"Error PyMuPDF: {e}"
+    finally:
+        if doc: doc.close()
+
 
 # --- Konten dari SaranaModule/ollama_financial_extractor.py ---
+DEFAULT_PROMPT_JSON_OLLAMA_SARANA = """
+            Anda adalah AI ekstraksi data keuangan. Output HARUS JSON.
+            DAFTAR KATA KUNCI TARGET: {keywords_list_str}
+            Teks dari OCR: {text_to_process}
+            Instruksi:
+            1. Fokus HANYA pada item dari DAFTAR KATA KUNCI.
+            2. Temukan nilai 'current_year' dan 'previous_year'. Jika tidak ada, gunakan null.
+            3. Normalisasi angka (hapus pemisah ribuan, tangani negatif dalam kurung).
+            4. Jika ada pengali global (misal "dalam jutaan"), KALIKAN SEMUA NILAI.
+            5. Format JSON: {{ "Nama Akun Target": {{ "current_year": nilai, "previous_year": nilai }} }}
+            6. HANYA blok kode JSON. Mulai dengan ```json dan akhiri dengan ```.
+            JSON Hasil Ekstraksi:
+            """
+DEFAULT_PROMPT_VISION_OLLAMA_SARANA = "Ekstrak semua teks dari gambar dokumen keuangan ini dengan akurat."
+
+
+def _susun_prompt_json_ollama_sarana(prompt_template_json: str | None, keywords: list[str], raw_text: str) -> str:
+    # Format template sama dengan ChatPromptTemplate (f-string, {{ }} untuk kurung kurawal literal)
+    json_prompt_template = prompt_template_json or DEFAULT_PROMPT_JSON_OLLAMA_SARANA
+    return json_prompt_template.format(keywords_list_str="\n".join(f"- {kw}" for kw in keywords), text_to_process=raw_text)
+
+
+def _urai_json_ollama_sarana(structured_res_str: str) -> dict:
+    # Blok ```json boleh tanpa penutup (balasan yang dihentikan setelah objek JSON ditutup)
+    json_match = re.search(r"```json\s*([\s\S]*?)\s*(?:```|$)", structured_res_str)
+    json_str_to_parse = json_match.group(1).strip() if json_match else structured_res_str.strip()
+
+    # Basic cleanup for trailing commas
+    json_str_to_parse = re.sub(r",\s*([\}\]])", r"\1", json_str_to_parse)
+    return json.loads(json_str_to_parse)
+
+
 def ekstrak_data_keuangan_dari_gambar_ollama_sarana(
     image_path: str, prompt_template_json: str = None,
     vision_model: str = "llama3.2-vision", llm_model_json: str = "llama3",
     ollama_base_url_param: str = None, target_keywords_param: list[str] = None,
     vision_prompt_param: str = None, timeout_param: int = 120
 ) -> dict:
-    if ollama is None or ChatOllama is None:
-        return {"error": "Ollama atau Langchain Ollama tidak terinstal."}
+    if not _muat_ollama_sarana():
+        return {"error": "Ollama tidak terinstal."}
     if not os.path.exists(image_path):
         return {"error": f"File gambar tidak ditemukan: {image_path}"}
 
     keywords = target_keywords_param if target_keywords_param is not None else DEFAULT_FINANCIAL_KEYWORDS_SARANA_FLAT
-    
-    client_params = {'timeout': timeout_param}
-    if ollama_base_url_param: client_params['host'] = ollama_base_url_param
-    ollama_vision_client = ollama.Client(**client_params)
+    # Kedua tahap memakai klien Ollama bersama (koneksi tetap hidup), slot per model, dan cache respons
+    parameter_ollama = {"host": ollama_base_url_param, "timeout": timeout_param,
+                        "direktori_cache": _direktori_cache_sarana(None)}
+    structured_res_str = None
 
-    chat_params = {"model": llm_model_json, "temperature": 0}
-    if ollama_base_url_param: chat_params['base_url'] = ollama_base_url_param
-    
     try:
-        vision_p = vision_prompt_param or "Ekstrak semua teks dari gambar dokumen keuangan ini dengan akurat."
-        vision_res = ollama_vision_client.chat(model=vision_model, messages=[{"role": "user", "content": vision_p, "images": [image_path]}])
-        raw_text = vision_res.get('message', {}).get('content', '').strip()
+        vision_p = vision_prompt_param or DEFAULT_PROMPT_VISION_OLLAMA_SARANA
+        raw_text = sarana_ollama.chat_ollama_sarana(vision_model, vision_p, [image_path], **parameter_ollama).strip()
         if not raw_text: return {"error": "Tidak ada teks diekstrak oleh model vision."}
 
-        json_prompt_template = prompt_template_json or """
-            Anda adalah AI ekstraksi data keuangan. Output HARUS JSON.
-            DAFTAR KATA KUNCI TARGET: {keywords_list_str}
-            Teks dari OCR: {text_to_process}
-            Instruksi:
-            1. Fokus HANYA pada item dari DAFTAR KATA KUNCI.
-            2. Temukan nilai 'current_year' dan 'previous_year'. Jika tidak ada, gunakan null.
-            3. Normalisasi angka (hapus pemisah ribuan, tangani negatif dalam kurung).
-            4. Jika ada pengali global (misal "dalam jutaan"), KALIKAN SEMUA NILAI.
-            5. Format JSON: {{ "Nama Akun Target": {{ "current_year": nilai, "previous_year": nilai }} }}
-            6. HANYA blok kode JSON. Mulai dengan ```json dan akhiri dengan ```.
-            JSON Hasil Ekstraksi:
-            """
-        
-        llm_json_chain = ChatPromptTemplate.from_template(json_prompt_template) | ChatOllama(**chat_params) | StrOutputParser()
-        structured_res_str = llm_json_chain.invoke({"keywords_list_str": "\n".join(f"- {kw}" for kw in keywords), "text_to_process": raw_text})
-        
-        json_match = re.search(r"```json\s*([\s\S]*?)\s*```", structured_res_str, re.DOTALL)
-        json_str_to_parse = json_match.group(1).strip() if json_match else structured_res_str.strip()
-        
-        # Basic cleanup for trailing commas
-        json_str_to_parse = re.sub(r",\s*([\}\]])", r"\1", json_str_to_parse)
-        
-        parsed_json = json.loads(json_str_to_parse)
-        return parsed_json
+        prompt_json = _susun_prompt_json_ollama_sarana(prompt_template_json, keywords, raw_text)
+        structured_res_str = sarana_ollama.chat_ollama_sarana(llm_model_json, prompt_json, opsi={"temperature": 0}, **parameter_ollama)
+        return _urai_json_ollama_sarana(structured_res_str)
+    except ollama.ResponseError as e:
+        return {"error": f"Ollama API error: {e.status_code} - {e.error}", "details": str(e)}
+    except json.JSONDecodeError as e:
+        return {"error": "Gagal parse JSON dari output LLM.", "details": str(e), "raw_output": structured_res_str}
+    except Exception as e:
+        return {"error": f"Kesalahan tidak terduga: {type(e).__name__}", "details": str(e)}
+
+
+async def ekstrak_data_keuangan_dari_gambar_ollama_async_sarana(
+    image_path: str, prompt_template_json: str = None,
+    vision_model: str = "llama3.2-vision", llm_model_json: str = "llama3",
+    ollama_base_url_param: str = None, target_keywords_param: list[str] = None,
+    vision_prompt_param: str = None, timeout_param: int = 120, callback_item=None
+) -> dict:
+    """
+    Padanan asyncio ekstrak_data_keuangan_dari_gambar_ollama_sarana untuk dijalankan langsung di event loop API.
+    Kedua tahap di-stream. Balasan tahap JSON diurai selagi tiba: callback_item(kunci, nilai) dipanggil untuk
+    tiap akun begitu nilainya lengkap, dan stream dihentikan begitu objek JSON tingkat atas ditutup.
+    Pembatalan task (klien memutus koneksi) diteruskan dan ikut menghentikan generasi di server Ollama.
+    """
+    if not _muat_ollama_sarana():
+        return {"error": "Ollama tidak terinstal."}
+    if not os.path.exists(image_path):
+        return {"error": f"File gambar tidak ditemukan: {image_path}"}
+
+    keywords = target_keywords_param if target_keywords_param is not None else DEFAULT_FINANCIAL_KEYWORDS_SARANA_FLAT
+    parameter_ollama = {"host": ollama_base_url_param, "timeout": timeout_param,
+                        "direktori_cache": _direktori_cache_sarana(None)}
+    pemindai = sarana_ollama.PemindaiJsonInkremental()
+    structured_res_str = None
+
+    def _pada_potongan_json(potongan: str) -> bool:
+        for kunci, nilai in pemindai.tambah(potongan):
+            if callback_item is not None:
+                callback_item(kunci, nilai)
+        return pemindai.selesai
+
+    try:
+        vision_p = vision_prompt_param or DEFAULT_PROMPT_VISION_OLLAMA_SARANA
+        raw_text = (await sarana_ollama.chat_ollama_async_sarana(vision_model, vision_p, [image_path], **parameter_ollama)).strip()
+        if not raw_text: return {"error": "Tidak ada teks diekstrak oleh model vision."}
+
+        prompt_json = _susun_prompt_json_ollama_sarana(prompt_template_json, keywords, raw_text)
+        structured_res_str = await sarana_ollama.chat_ollama_async_sarana(
+            llm_model_json, prompt_json, opsi={"temperature": 0}, pada_potongan=_pada_potongan_json, **parameter_ollama
+        )
+        if pemindai.selesai and not pemindai.gagal:
+            return pemindai.hasil
+        return _urai_json_ollama_sarana(structured_res_str)
     except ollama.ResponseError as e:
         return {"error": f"Ollama API error: {e.status_code} - {e.error}", "details": str(e)}
     except json.JSONDecodeError as e:
@@ -774,7 +1971,7 @@ def parse_financial_document(
     file_path: str, 
     file_type: str | None = None, # 'pdf', 'docx', 'txt', 'xlsx', 'csv', 'png', 'jpg'
     ocr_engine_for_images_and_pdf: str = 'tesseract', # 'tesseract', 'easyocr', 'ollama'
-    pdf_parsing_method: str = 'pymupdf', # 'pymupdf', 'pdfplumber'
+    pdf_parsing_method: str = 'pymupdf', # 'pymupdf', 'pdfplumber', 'pymupdf_layout'
     sarana_cache_dir: str | None = None,
     ollama_prompt_for_ocr: str = "Ekstrak semua teks dari gambar dokumen keuangan ini dengan akurat.",
     ollama_prompt_for_json_extraction: str | None = None, # For image to structured JSON
@@ -784,21 +1981,33 @@ def parse_financial_document(
     custom_financial_keywords: list[dict] | None = None, # list of {"kata_dasar": "X", "variasi": ["x1", "x2"]}
     image_preprocessing_options: dict | None = None, # For tesseract/easyocr
     output_format: str = 'text', # 'text' or 'structured_json' (structured_json only for images via ollama for now)
-    jenis_pengaju: str = 'korporat' # Tambahan parameter: 'korporat' atau 'individu'
-) -> dict:
+    jenis_pengaju: str = 'korporat', # Tambahan parameter: 'korporat' atau 'individu'
+    hash_konten_file: str | None = None, # SHA-256 isi berkas jika sudah dihitung saat upload
+    gunakan_cache_hasil: bool = True,
+    callback_progres=None, # Dipanggil dengan dict event progres (tahap, halaman, ...)
+    filter_entitas_induk: bool = True, # PDF: hanya ambil halaman "Entitas Induk" / "Parent Entity"
+    hasil_ollama_terstruktur: dict | None = None, # Hasil gambar -> JSON dari jalur async; Ollama tidak dipanggil lagi
+    henti_dini_kata_kunci: bool = False, # PDF: hentikan OCR begitu semua kata kunci punya nilai t dan t-1
+    maks_halaman_ocr: int | None = None, # PDF: batas jumlah halaman yang di-OCR
+    hanya_dari_cache: bool = False # Hanya ambil hasil dari cache; None jika belum ada (dokumen tidak diparsing)
+) -> dict | None:
     """
     Mem-parsing dokumen keuangan (PDF, DOCX, TXT, XLSX, CSV, Gambar) dan mengekstrak teks atau data terstruktur.
 
     Returns:
-        Sebuah dictionary dengan kunci:
-        - 'file_name': Nama file input.
-        - 'extracted_text': Teks mentah yang diekstrak (jika output_format='text').
-        - 'structured_data': Dictionary data keuangan terstruktur (jika output_format='structured_json').
-        - 'detected_report_year': Tahun pelaporan yang terdeteksi dari teks.
-        - 'detected_global_multiplier': Pengali global (misal, ribuan, jutaan) yang terdeteksi.
-        - 'financial_keywords_data': Hasil ekstraksi kata kunci keuangan dari teks (jika output_format='text').
-        - 'error': Pesan error jika terjadi masalah.
+        Sebuah dictionary dengan kunci (sama dengan SaranaParseDocumentResponse):
+        - 'nama_file': Nama file input.
+        - 'teks_ekstrak_mentah': Teks mentah yang diekstrak (jika output_format='text').
+        - 'hasil_ekstraksi_terstruktur': Dictionary data keuangan terstruktur (jika output_format='structured_json').
+        - 'tahun_pelaporan_terdeteksi': Tahun pelaporan yang terdeteksi dari teks.
+        - 'pengali_global_terdeteksi': Pengali global (misal, ribuan, jutaan) yang terdeteksi.
+        - 'hasil_ekstraksi_kata_kunci': Hasil ekstraksi kata kunci keuangan dari teks (jika output_format='text').
+        - 'error_parsing': Pesan error jika terjadi masalah.
         - 'info_parsing': Informasi tambahan tentang proses parsing.
+        Hanya 'error' yang dikembalikan jika file tidak ditemukan.
+
+    Hasil lengkap di-cache dengan kunci hash isi berkas + opsi parsing, sehingga dokumen yang sama
+    yang di-upload ulang tidak di-OCR lagi. Hasil yang mengandung error tidak di-cache.
     """
     if not os.path.exists(file_path):
         return {"error": f"File tidak ditemukan: {file_path}"}
@@ -823,9 +2032,52 @@ def parse_financial_document(
         active_financial_keywords_flat = DEFAULT_FINANCIAL_KEYWORDS_SARANA_FLAT
         parsing_info += "; Using corporate keywords"
 
+    # 0. Cache hasil parsing penuh (kunci: hash isi berkas + opsi yang memengaruhi hasil)
+    kunci_cache_hasil = None
+    if gunakan_cache_hasil:
+        if hash_konten_file is None:
+            hash_konten_file = hitung_hash_konten_file_sarana(file_path)
+        opsi_untuk_kunci = {
+            "file_type": actual_file_type,
+            "ocr_engine": ocr_engine_for_images_and_pdf,
+            "pdf_parsing_method": pdf_parsing_method,
+            "image_preprocessing_options": image_preprocessing_options,
+            "output_format": output_format,
+            "jenis_pengaju": jenis_pengaju,
+            "filter_entitas_induk": bool(filter_entitas_induk),
+            "kata_kunci": sidik_daftar_kata_kunci_sarana(active_financial_keywords_list),
+            "versi_ekstraktor": VERSI_EKSTRAKTOR_SARANA,
+            "versi_render_pdf": VERSI_RENDER_PDF_OCR_SARANA,
+        }
+        if henti_dini_kata_kunci or maks_halaman_ocr:
+            opsi_untuk_kunci["henti_dini"] = [bool(henti_dini_kata_kunci), maks_halaman_ocr]
+        if ocr_engine_for_images_and_pdf == 'ollama' or output_format == 'structured_json':
+            opsi_untuk_kunci["ollama"] = [ollama_prompt_for_ocr, ollama_prompt_for_json_extraction,
+                                          ollama_vision_model, ollama_llm_model_for_json]
+        if hash_konten_file:
+            kunci_cache_hasil = buat_kunci_cache_file_sarana(
+                file_path, extra_key_info=f"hasil:{sidik_opsi_sarana(opsi_untuk_kunci)}", hash_konten=hash_konten_file
+            )
+            data_cache = ambil_dari_cache_sarana(kunci_cache_hasil, sarana_cache_dir)
+            if data_cache and isinstance(data_cache.get('hasil'), dict):
+                hasil_dari_cache = dict(data_cache['hasil'])
+                hasil_dari_cache["nama_file"] = os.path.basename(file_path)
+                hasil_dari_cache["info_parsing"] = f"{hasil_dari_cache.get('info_parsing', '')}; Hasil diambil dari cache"
+                _laporkan_progres_sarana(callback_progres, tahap="cache")
+                return hasil_dari_cache
+    if hanya_dari_cache:
+        return None
+
+    _laporkan_progres_sarana(callback_progres, tahap="ekstraksi_teks", tipe_file=actual_file_type)
+
     # 1. Ekstraksi Teks Mentah / Data Terstruktur Awal
     try:
         if actual_file_type == 'pdf':
+            pelacak_kata_kunci = None
+            if henti_dini_kata_kunci or maks_halaman_ocr or callback_progres is not None:
+                # Dengan callback progres saja, pelacak hanya melaporkan kata kunci yang ditemukan per halaman
+                pelacak_kata_kunci = PelacakKataKunciSarana(active_financial_keywords_list, henti_saat_lengkap=henti_dini_kata_kunci,
+                                                            maks_halaman_ocr=maks_halaman_ocr, callback_progres=callback_progres)
             # parser_pdf.ekstrak_teks_dari_pdf membutuhkan fungsi OCR gambar sebagai argumen
             # Ini adalah ekstrak_teks_dari_gambar_sarana yang didefinisikan di atas
             extracted_text_content = ekstrak_teks_dari_pdf_sarana(
@@ -835,8 +2087,17 @@ def parse_financial_document(
                 opsi_praproses_param=image_preprocessing_options,
                 direktori_cache_param=sarana_cache_dir,
                 prompt_ollama_param=ollama_prompt_for_ocr,
-                metode_parsing_param=pdf_parsing_method
+                # 'pymupdf_layout' memakai teks PyMuPDF biasa untuk tahun, pengali, dan kata kunci yang tidak ada di tabel
+                metode_parsing_param='pymupdf' if pdf_parsing_method == 'pymupdf_layout' else pdf_parsing_method,
+                hash_konten_param=hash_konten_file,
+                callback_progres=callback_progres,
+                filter_entitas_induk=filter_entitas_induk,
+                pelacak_kata_kunci=pelacak_kata_kunci
             )
+            if pelacak_kata_kunci is not None and pelacak_kata_kunci.selesai:
+                ringkasan_henti = pelacak_kata_kunci.ringkasan()
+                parsing_info += (f"; Henti dini ({ringkasan_henti['alasan']}) setelah {ringkasan_henti['halaman_ocr']} halaman OCR, "
+                                 f"{ringkasan_henti['kata_kunci_tersisa']} kata kunci belum lengkap")
         elif actual_file_type == 'docx':
             extracted_text_content = ekstrak_teks_dari_docx_sarana(file_path)
         elif actual_file_type == 'txt':
@@ -845,8 +2106,12 @@ def parse_financial_document(
             extracted_text_content = ekstrak_data_dari_xlsx_sarana(file_path)
         elif actual_file_type == 'csv':
             extracted_text_content = ekstrak_data_dari_csv_sarana(file_path)
-        elif actual_file_type in ['png', 'jpg', 'jpeg', 'tiff', 'bmp', 'gif']:
-            if output_format == 'structured_json' and ollama is not None:
+        elif actual_file_type in TIPE_FILE_GAMBAR_SARANA:
+            if output_format == 'structured_json' and hasil_ollama_terstruktur is not None:
+                structured_data_content = hasil_ollama_terstruktur
+                if "error" not in structured_data_content:
+                    parsing_info += "; Image to Structured JSON via Ollama successful (streaming)."
+            elif output_format == 'structured_json' and _muat_ollama_sarana():
                 # Gunakan Ollama untuk ekstraksi langsung ke JSON terstruktur dari gambar
                 structured_data_content = ekstrak_data_keuangan_dari_gambar_ollama_sarana(
                     image_path=file_path,
@@ -904,6 +2169,7 @@ def parse_financial_document(
             parsing_info += "; Teks yang diekstrak kosong."
             # Tidak ada error, tapi tidak ada konten untuk diproses lebih lanjut.
         else:
+            _laporkan_progres_sarana(callback_progres, tahap="ekstraksi_kata_kunci")
             detected_year = identifikasi_tahun_pelaporan_sarana(extracted_text_content)
             detected_multiplier = deteksi_pengali_global_sarana(extracted_text_content)
             
@@ -911,13 +2177,35 @@ def parse_financial_document(
             # if custom_financial_keywords and isinstance(custom_financial_keywords, list):
             #     current_keywords_to_use = custom_financial_keywords
             
+            kata_dasar_untuk_teks = None
+            if actual_file_type == 'pdf' and pdf_parsing_method == 'pymupdf_layout':
+                # Kata kunci dicari dulu pada tata letak (baris + kolom angka); teks datar hanya untuk sisanya
+                hasil_kata_berposisi = ekstrak_kata_berposisi_dari_pdf_sarana(file_path, filter_entitas_induk=filter_entitas_induk)
+                if isinstance(hasil_kata_berposisi, str):
+                    parsing_info += f"; Ekstraksi tata letak gagal: {hasil_kata_berposisi}"
+                else:
+                    halaman_kata, lebar_halaman = hasil_kata_berposisi
+                    data_tata_letak = ekstrak_data_keuangan_dari_tata_letak_sarana(
+                        halaman_kata, daftar_kata_kunci=active_financial_keywords_list,
+                        pengali_global=detected_multiplier, lebar_halaman=lebar_halaman
+                    )
+                    kata_dasar_untuk_teks = {kd for kd, nilai in data_tata_letak.items() if nilai['t'] is None}
+                    parsing_info += f"; Tata letak PyMuPDF: {len(data_tata_letak) - len(kata_dasar_untuk_teks)} kata kunci dari kolom angka"
+
             financial_data_from_text = ekstrak_data_keuangan_tahunan_sarana(
                 extracted_text_content,
                 daftar_kata_kunci=active_financial_keywords_list, # Menggunakan daftar kata kunci aktif
-                pengali_global=detected_multiplier
+                pengali_global=detected_multiplier,
+                hanya_kata_dasar=kata_dasar_untuk_teks
             )
+            if kata_dasar_untuk_teks is not None:
+                for kata_dasar, nilai in data_tata_letak.items():
+                    if kata_dasar not in kata_dasar_untuk_teks: financial_data_from_text[kata_dasar] = nilai
             if not financial_data_from_text:
                  parsing_info += "; Tidak ada kata kunci keuangan yang diekstrak dari teks."
+            _laporkan_progres_sarana(callback_progres, tahap="kata_kunci",
+                                     kata_kunci_ditemukan=sum(1 for nilai in financial_data_from_text.values() if nilai['t'] is not None),
+                                     total_kata_kunci=len(active_financial_keywords_list))
 
     # Bentuk hasil akhir
     result = {
@@ -948,9 +2236,49 @@ def parse_financial_document(
         result["tahun_pelaporan_terdeteksi"] = detected_year
         result["pengali_global_terdeteksi"] = detected_multiplier
         result["hasil_ekstraksi_kata_kunci"] = financial_data_from_text # Ini {'keyword': {'t': val, 't-1': val}}
-        
+
+    if kunci_cache_hasil and not error_message:
+        simpan_ke_cache_sarana(kunci_cache_hasil, {'hasil': result, 'timestamp': time.time()}, sarana_cache_dir)
+
     return result
 
+def pemanasan_sarana(sertakan_ocr: bool = True, sertakan_easyocr: bool = False) -> dict:
+    """
+    Memanaskan komponen Sarana di proses ini (dipanggil di tiap worker pool saat startup): impor pustaka berat,
+    data NLTK, otomaton kata kunci default, dan satu OCR Tesseract kecil agar data bahasa sudah dimuat
+    (API tesserocr in-process ikut diinisialisasi jika tersedia).
+    Dengan sertakan_easyocr, reader EasyOCR default ikut dibuat di pool reader proses ini.
+    Mengembalikan durasi tiap langkah (ms) dan error per langkah; error tidak menghentikan langkah berikutnya.
+    """
+    durasi_ms, error = {}, {}
+
+    def _ukur(nama_langkah: str, fungsi):
+        waktu_mulai = time.perf_counter()
+        try:
+            fungsi()
+        except Exception as e:
+            error[nama_langkah] = f"{type(e).__name__}: {e}"
+        durasi_ms[nama_langkah] = round((time.perf_counter() - waktu_mulai) * 1000, 1)
+
+    def _ocr_kecil():
+        gambar = Image.new('L', (200, 40), color=255)
+        ImageDraw.Draw(gambar).text((5, 10), "Aset 2024", fill=0)
+        sarana_tesseract.image_to_string_sarana(np.array(gambar), lang=DEFAULT_OPSI_PRAPROSES_SARANA['pyocr_lang'], config='--oem 3 --psm 7')
+
+    _ukur("dependensi", muat_dependensi_berat_sarana)
+    _ukur("nltk", inisialisasi_nltk_resources_sarana)
+    _ukur("otomaton_kata_kunci", lambda: [dapatkan_otomaton_kata_kunci_sarana(daftar) for daftar in
+                                          (DAFTAR_KATA_KUNCI_KEUANGAN_SARANA_DEFAULT, DAFTAR_KATA_KUNCI_KEUANGAN_SARANA_INDIVIDU)])
+    if sertakan_ocr:
+        _ukur("tesseract", _ocr_kecil)
+    if sertakan_easyocr:
+        def _reader_easyocr():
+            with sarana_easyocr.pinjam_reader_easyocr(DEFAULT_OPSI_PRAPROSES_SARANA['easyocr_langs'],
+                                                      DEFAULT_OPSI_PRAPROSES_SARANA['easyocr_gpu']):
+                pass
+        _ukur("easyocr", _reader_easyocr)
+    return {"pid": os.getpid(), "durasi_ms": durasi_ms, "error": error}
+
 # Wrapper function for API router compatibility
 def parse_document_sarana(
     file_path: str,
@@ -962,8 +2290,15 @@ def parse_document_sarana(
     ollama_json_prompt_template: str | None = None,
     ollama_vision_model_name: str = "llama3.2-vision",
     ollama_llm_model_json_name: str = "llama3",
-    ollama_api_base_url_param: str | None = None
-) -> dict:
+    ollama_api_base_url_param: str | None = None,
+    file_content_hash: str | None = None,
+    callback_progres=None,
+    filter_entitas_induk: bool = True,
+    ollama_structured_result: dict | None = None,
+    early_stop: bool = False,
+    max_ocr_pages: int | None = None,
+    cache_only: bool = False
+) -> dict | None:
     """
     Wrapper function untuk parse_financial_document yang kompatibel dengan router API.
     
@@ -978,9 +2313,17 @@ def parse_document_sarana(
         ollama_vision_model_name: Nama model vision Ollama
         ollama_llm_model_json_name: Nama model LLM Ollama
         ollama_api_base_url_param: Base URL API Ollama
+        file_content_hash: SHA-256 isi berkas yang dihitung router saat upload (kunci cache)
+        callback_progres: Fungsi opsional yang menerima dict event progres parsing
+        filter_entitas_induk: Untuk PDF, hanya ambil halaman laporan Entitas Induk (False = semua halaman)
+        ollama_structured_result: Hasil gambar -> JSON yang sudah diambil jalur async (lihat
+            parse_document_gambar_json_async_sarana)
+        early_stop: Untuk PDF, hentikan OCR halaman sisa begitu semua kata kunci punya nilai t dan t-1
+        max_ocr_pages: Untuk PDF, batas jumlah halaman yang di-OCR
+        cache_only: Hanya kembalikan hasil dari cache hasil parsing penuh; None jika belum ter-cache
     
     Returns:
-        Dictionary dengan hasil parsing
+        Dictionary dengan hasil parsing (None jika cache_only dan cache tidak ada)
     """
     try:
         return parse_financial_document(
@@ -993,7 +2336,14 @@ def parse_document_sarana(
             ollama_prompt_for_json_extraction=ollama_json_prompt_template,
             ollama_vision_model=ollama_vision_model_name,
             ollama_llm_model_for_json=ollama_llm_model_json_name,
-            ollama_api_base_url=ollama_api_base_url_param
+            ollama_api_base_url=ollama_api_base_url_param,
+            hash_konten_file=file_content_hash,
+            callback_progres=callback_progres,
+            filter_entitas_induk=filter_entitas_induk,
+            hasil_ollama_terstruktur=ollama_structured_result,
+            henti_dini_kata_kunci=early_stop,
+            maks_halaman_ocr=max_ocr_pages,
+            hanya_dari_cache=cache_only
         )
     except Exception as e:
         return {
@@ -1003,6 +2353,55 @@ def parse_document_sarana(
             "processing_time_seconds": 0
         }
 
+def adalah_gambar_ke_json_sarana(file_path: str, file_type: str | None, output_format: str) -> bool:
+    """True jika dokumen ini diproses lewat Ollama gambar -> JSON (jalur yang bisa dijalankan async)."""
+    actual_file_type = file_type or os.path.splitext(file_path)[1].lower().replace('.', '')
+    return output_format == 'structured_json' and actual_file_type in TIPE_FILE_GAMBAR_SARANA
+
+
+async def parse_document_gambar_json_async_sarana(
+    file_path: str,
+    file_type: str | None = None,
+    jenis_pengaju: str = 'korporat',
+    ollama_json_prompt_template: str | None = None,
+    ollama_vision_model_name: str = "llama3.2-vision",
+    ollama_llm_model_json_name: str = "llama3",
+    ollama_api_base_url_param: str | None = None,
+    file_content_hash: str | None = None,
+    callback_item=None
+) -> dict:
+    """
+    parse_document_sarana untuk gambar dengan output_format='structured_json', tanpa memakai worker pool:
+    kedua panggilan Ollama di-stream di event loop (ekstrak_data_keuangan_dari_gambar_ollama_async_sarana),
+    lalu hasilnya dirakit menjadi respons yang sama oleh parse_document_sarana di thread.
+    Cache hasil parsing penuh diperiksa lebih dulu sehingga gambar yang sama tidak dikirim ulang ke Ollama.
+    """
+    opsi_parsing = dict(
+        file_path=file_path,
+        file_type=file_type,
+        output_format='structured_json',
+        jenis_pengaju=jenis_pengaju,
+        ollama_json_prompt_template=ollama_json_prompt_template,
+        ollama_vision_model_name=ollama_vision_model_name,
+        ollama_llm_model_json_name=ollama_llm_model_json_name,
+        ollama_api_base_url_param=ollama_api_base_url_param,
+        file_content_hash=file_content_hash
+    )
+    hasil_cache = await asyncio.to_thread(parse_document_sarana, cache_only=True, **opsi_parsing)
+    if hasil_cache is not None:
+        return hasil_cache
+    hasil_ollama = await ekstrak_data_keuangan_dari_gambar_ollama_async_sarana(
+        image_path=file_path,
+        prompt_template_json=ollama_json_prompt_template,
+        vision_model=ollama_vision_model_name,
+        llm_model_json=ollama_llm_model_json_name,
+        ollama_base_url_param=ollama_api_base_url_param,
+        target_keywords_param=(INDIVIDUAL_FINANCIAL_KEYWORDS_SARANA_FLAT if jenis_pengaju == 'individu'
+                               else DEFAULT_FINANCIAL_KEYWORDS_SARANA_FLAT),
+        callback_item=callback_item
+    )
+    return await asyncio.to_thread(parse_document_sarana, ollama_structured_result=hasil_ollama, **opsi_parsing)
+
 if __name__ == '__main__':
     print("--- Contoh Penggunaan Sarana Service (parse_financial_document) ---")
     # Buat file dummy untuk diuji
@@ -1053,7 +2452,7 @@ if __name__ == '__main__':
     
     # Jika Ollama di-set up dan model ada, uncomment tes Ollama
     ollama_ready_for_test = False
-    if ollama:
+    if _muat_ollama_sarana():
         try:
             # Cek sederhana apakah Ollama bisa dihubungi, bisa lebih canggih
             # ollama.list() # Ini bisa error jika server tidak jalan
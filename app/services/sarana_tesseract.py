@@ -0,0 +1,176 @@
+import os
+import shlex
+import threading
+import importlib
+from contextlib import contextmanager
+
+# Backend Tesseract untuk Sarana. pytesseract menjalankan satu proses `tesseract` per gambar: gambar ditulis ke
+# file temporer dan traineddata (misal ind+eng) dimuat ulang setiap kali. Jika binding C-API tesserocr terinstal,
+# OCR dijalankan di dalam proses memakai TessBaseAPI yang sudah diinisialisasi dan dipakai ulang, dengan gambar
+# NumPy dikirim langsung sebagai buffer piksel. Hasilnya TSV yang sama dengan yang diurai pytesseract, sehingga
+# pengelompokan baris tidak berubah. Jika tesserocr tidak tersedia, otomatis kembali ke pytesseract.
+
+# 'auto' (tesserocr jika tersedia), 'tesserocr', atau 'pytesseract'
+SARANA_TESSERACT_BACKEND = os.environ.get("SARANA_TESSERACT_BACKEND", "auto").lower()
+
+KOLOM_TSV_TESSERACT = ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+                       "left", "top", "width", "height", "conf", "text")
+
+_tesserocr = None
+_tesserocr_dicoba = False
+_tesserocr_lock = threading.Lock()
+
+
+def _muat_tesserocr():
+    global _tesserocr, _tesserocr_dicoba
+    if _tesserocr_dicoba:
+        return _tesserocr
+    with _tesserocr_lock:
+        if not _tesserocr_dicoba:
+            if SARANA_TESSERACT_BACKEND != "pytesseract":
+                try:
+                    _tesserocr = importlib.import_module("tesserocr")
+                except ImportError:
+                    if SARANA_TESSERACT_BACKEND == "tesserocr":
+                        print("Warning: SARANA_TESSERACT_BACKEND=tesserocr tetapi tesserocr tidak terinstal. Memakai pytesseract.")
+            _tesserocr_dicoba = True
+    return _tesserocr
+
+
+def backend_tesseract_aktif() -> str:
+    return "tesserocr" if _muat_tesserocr() is not None else "pytesseract"
+
+
+def _urai_config_tesseract(config: str | None) -> tuple[int, int, tuple]:
+    """Mengurai config CLI ('--oem 3 --psm 6 -c kunci=nilai --dpi 300') menjadi (oem, psm, variabel)."""
+    oem, psm, variabel = 3, 3, []
+    token = shlex.split(config or "")
+    i = 0
+    while i < len(token):
+        nama = token[i]
+        nilai = token[i + 1] if i + 1 < len(token) else None
+        if nama == "--oem" and nilai is not None:
+            oem, i = int(nilai), i + 1
+        elif nama == "--psm" and nilai is not None:
+            psm, i = int(nilai), i + 1
+        elif nama == "--dpi" and nilai is not None:
+            variabel.append(("user_defined_dpi", nilai)); i += 1
+        elif nama == "-c" and nilai is not None and "=" in nilai:
+            variabel.append(tuple(nilai.split("=", 1))); i += 1
+        i += 1
+    return oem, psm, tuple(sorted(variabel))
+
+
+class PoolApiTesseract:
+    """TessBaseAPI yang sudah diinisialisasi, dipinjam per panggilan dan dikunci per (bahasa, oem, variabel)."""
+
+    def __init__(self, modul_tesserocr):
+        self.tesserocr = modul_tesserocr
+        self._lock = threading.Lock()
+        self._menganggur: dict[tuple, list] = {}
+        self._jumlah_dibuat = 0
+
+    def _buat_api(self, lang: str, oem: int, variabel: tuple):
+        api = self.tesserocr.PyTessBaseAPI(lang=lang, oem=self.tesserocr.OEM(oem))
+        for nama, nilai in variabel:
+            api.SetVariable(nama, nilai)
+        with self._lock:
+            self._jumlah_dibuat += 1
+        return api
+
+    @contextmanager
+    def pinjam(self, lang: str, oem: int, variabel: tuple):
+        kunci = (lang, oem, variabel)
+        with self._lock:
+            daftar = self._menganggur.get(kunci)
+            api = daftar.pop() if daftar else None
+        if api is None:
+            api = self._buat_api(lang, oem, variabel)
+        try:
+            yield api
+        finally:
+            api.Clear()
+            with self._lock:
+                self._menganggur.setdefault(kunci, []).append(api)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"dibuat": self._jumlah_dibuat,
+                    "menganggur": {f"{k[0]}|oem{k[1]}": len(v) for k, v in self._menganggur.items()}}
+
+
+_pool_api_tesseract: PoolApiTesseract | None = None
+
+
+def get_pool_api_tesseract() -> PoolApiTesseract | None:
+    global _pool_api_tesseract
+    modul_tesserocr = _muat_tesserocr()
+    if modul_tesserocr is None:
+        return None
+    with _tesserocr_lock:
+        if _pool_api_tesseract is None:
+            _pool_api_tesseract = PoolApiTesseract(modul_tesserocr)
+        return _pool_api_tesseract
+
+
+def _set_gambar_numpy(api, gambar):
+    # Buffer piksel langsung dari array NumPy (uint8, abu-abu / RGB / RGBA) tanpa encode ke PNG atau file temporer
+    import numpy as np
+    gambar = np.ascontiguousarray(gambar, dtype=np.uint8)
+    tinggi, lebar = gambar.shape[:2]
+    byte_per_piksel = 1 if gambar.ndim == 2 else gambar.shape[2]
+    api.SetImageBytes(gambar.tobytes(), lebar, tinggi, byte_per_piksel, lebar * byte_per_piksel)
+
+
+def _urai_tsv_tesseract(tsv: str) -> dict:
+    data = {kolom: [] for kolom in KOLOM_TSV_TESSERACT}
+    for baris in tsv.splitlines():
+        nilai = baris.split("\t")
+        if len(nilai) < len(KOLOM_TSV_TESSERACT) - 1 or not nilai[0].isdigit():
+            continue
+        if len(nilai) == len(KOLOM_TSV_TESSERACT) - 1:
+            nilai.append("")
+        for kolom, isi in zip(KOLOM_TSV_TESSERACT, nilai):
+            data[kolom].append(isi if kolom == "text" else int(float(isi)))
+    return data
+
+
+def _image_ke_pil(gambar):
+    from PIL import Image
+    return Image.fromarray(gambar)
+
+
+def image_to_data_sarana(gambar, lang: str, config: str | None = None) -> dict:
+    """
+    Setara pytesseract.image_to_data(..., output_type=Output.DICT) untuk array NumPy: dict berisi list per kolom
+    TSV (level, page_num, block_num, par_num, line_num, word_num, left, top, width, height, conf, text).
+    """
+    pool = get_pool_api_tesseract()
+    if pool is not None:
+        oem, psm, variabel = _urai_config_tesseract(config)
+        with pool.pinjam(lang, oem, variabel) as api:
+            api.SetPageSegMode(pool.tesserocr.PSM(psm))
+            _set_gambar_numpy(api, gambar)
+            api.Recognize()
+            return _urai_tsv_tesseract(api.GetTSVText(0))
+    pytesseract = importlib.import_module("pytesseract")
+    return pytesseract.image_to_data(_image_ke_pil(gambar), lang=lang, config=config or "",
+                                     output_type=pytesseract.Output.DICT)
+
+
+def image_to_string_sarana(gambar, lang: str, config: str | None = None) -> str:
+    """Setara pytesseract.image_to_string untuk array NumPy."""
+    pool = get_pool_api_tesseract()
+    if pool is not None:
+        oem, psm, variabel = _urai_config_tesseract(config)
+        with pool.pinjam(lang, oem, variabel) as api:
+            api.SetPageSegMode(pool.tesserocr.PSM(psm))
+            _set_gambar_numpy(api, gambar)
+            return api.GetUTF8Text()
+    pytesseract = importlib.import_module("pytesseract")
+    return pytesseract.image_to_string(_image_ke_pil(gambar), lang=lang, config=config or "")
+
+
+def status_tesseract_sarana() -> dict:
+    pool = get_pool_api_tesseract()
+    return {"backend": backend_tesseract_aktif(), **(pool.status() if pool is not None else {})}
@@ -100,6 +100,10 @@ def _load_risk_data_from_local() -> dict:
         _risk_data_cache = {} # Cache empty dict on error
         return _risk_data_cache
 
+def preload_risk_data() -> dict:
+    """Loads and caches local risk data ahead of the first request (used by the startup warmup)."""
+    return _load_risk_data_from_local()
+
 def _get_risk_data_gcs(bucket_name: str, blob_name: str = 'risk_data.json') -> dict:
     """Placeholder to read risk data from GCS if needed in the future."""
     # This function is not used by default if local file is preferred.
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark waktu impor aplikasi (cold start) Astranauts.
+
+Mengimpor app.main di proses Python baru beberapa kali, lalu gagal (exit code 1) jika median waktu impor
+melebihi anggaran atau jika pustaka berat (OpenCV, PyMuPDF, NLTK, CatBoost, ...) ikut terimpor. Dijalankan saat build image agar dependensi berat yang kembali diimpor di level modul
+langsung ketahuan. Dengan --detail, modul dengan waktu impor kumulatif terbesar ikut ditampilkan.
+
+Penggunaan:
+    python benchmark_startup.py [--budget DETIK] [--runs N] [--detail]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Anggaran default waktu impor app.main (detik); bisa diubah lewat env STARTUP_IMPORT_BUDGET_SECONDS
+DEFAULT_BUDGET_SECONDS = float(os.environ.get("STARTUP_IMPORT_BUDGET_SECONDS", 3.0))
+# Modul yang tidak boleh ikut terimpor hanya karena app.main diimpor
+MODUL_BERAT = ["cv2", "pymupdf", "pdfplumber", "pytesseract", "nltk", "easyocr", "torch", "catboost", "sklearn", "ollama"]
+
+KODE_UKUR = (
+    "import time, sys, json\n"
+    "t0 = time.perf_counter()\n"
+    "import app.main\n"
+    "durasi = time.perf_counter() - t0\n"
+    "print(json.dumps({'durasi': durasi, 'modul': sorted(m for m in %r if m in sys.modules)}))\n"
+)
+
+
+def ukur_sekali(direktori_proyek: str) -> dict:
+    hasil = subprocess.run(
+        [sys.executable, "-c", KODE_UKUR % (MODUL_BERAT,)],
+        cwd=direktori_proyek, capture_output=True, text=True, check=True,
+    )
+    # Baris terakhir stdout berisi JSON; baris sebelumnya adalah log dari modul yang diimpor
+    return json.loads(hasil.stdout.strip().splitlines()[-1])
+
+
+def tampilkan_detail(direktori_proyek: str, jumlah: int = 15):
+    hasil = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=direktori_proyek, capture_output=True, text=True,
+    )
+    baris_impor = []
+    for baris in hasil.stderr.splitlines():
+        # Format: "import time: <self us> | <cumulative us> | <nama modul>"
+        if not baris.startswith("import time:") or "cumulative" in baris:
+            continue
+        _, kumulatif, nama = baris.split("|", 2)
+        baris_impor.append((int(kumulatif), nama.rstrip()))
+    print(f"\n{jumlah} impor kumulatif terbesar (mikrodetik):")
+    for kumulatif, nama in sorted(baris_impor, reverse=True)[:jumlah]:
+        print(f"{kumulatif:>10}  {nama}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS, help="Anggaran median waktu impor (detik)")
+    parser.add_argument("--runs", type=int, default=3, help="Jumlah pengukuran")
+    parser.add_argument("--detail", action="store_true", help="Tampilkan modul dengan waktu impor terbesar")
+    args = parser.parse_args()
+
+    direktori_proyek = os.path.dirname(os.path.abspath(__file__))
+    pengukuran = [ukur_sekali(direktori_proyek) for _ in range(max(1, args.runs))]
+    durasi = [p["durasi"] for p in pengukuran]
+    median = statistics.median(durasi)
+    modul_berat = pengukuran[-1]["modul"]
+
+    print(f"Waktu impor app.main: median {median:.2f} detik (min {min(durasi):.2f}, maks {max(durasi):.2f}), anggaran {args.budget:.2f} detik")
+    if modul_berat:
+        print(f"Modul berat yang ikut terimpor saat startup: {', '.join(modul_berat)}")
+    if args.detail:
+        tampilkan_detail(direktori_proyek)
+
+    if median > args.budget:
+        print("❌ Waktu impor melebihi anggaran.")
+        return 1
+    if modul_berat:
+        print("❌ Pustaka berat harus diimpor saat pertama kali dipakai, bukan saat startup.")
+        return 1
+    print("✅ Waktu impor dalam anggaran.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
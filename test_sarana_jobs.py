@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Unit test antrean job Sarana (PengelolaJobSarana) di atas database SQLite temporer, tanpa pool proses.
+Jalankan dengan: python -m pytest -q test_sarana_jobs.py
+"""
+
+import sqlite3
+
+import pytest
+
+from app.services import sarana_jobs
+
+
+@pytest.fixture
+def path_db(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    sarana_jobs._inisialisasi_db(path)
+    return path
+
+def _pengelola(path_db, tmp_path) -> sarana_jobs.PengelolaJobSarana:
+    # Dispatcher tidak dijalankan (mulai() tidak dipanggil); metode klaim/pemulihan diuji langsung
+    return sarana_jobs.PengelolaJobSarana(path_db, str(tmp_path))
+
+def _buat_job(pengelola, tmp_path, nama: str, hash_konten: str | None = None, opsi: dict | None = None):
+    path_file = tmp_path / nama
+    path_file.write_bytes(b"isi")
+    return pengelola.buat_job(str(path_file), nama, hash_konten, opsi or {"file_type": "pdf"})
+
+def _baris(path_db, id_job) -> sqlite3.Row:
+    koneksi = sarana_jobs._buka_koneksi_db(path_db)
+    try:
+        return koneksi.execute("SELECT * FROM sarana_jobs WHERE id = ?", (id_job,)).fetchone()
+    finally:
+        koneksi.close()
+
+def _jalankan_sql(path_db, sql, parameter=()):
+    koneksi = sarana_jobs._buka_koneksi_db(path_db)
+    try:
+        koneksi.execute(sql, parameter)
+    finally:
+        koneksi.close()
+
+
+# --- Klaim (compare-and-set) ---
+
+def test_klaim_mencatat_pemilik_dan_hanya_sekali(path_db, tmp_path):
+    a, b = _pengelola(path_db, tmp_path), _pengelola(path_db, tmp_path)
+    job, _ = _buat_job(a, tmp_path, "a.pdf")
+    id_job, path_file, opsi = a._klaim_job_berikutnya()
+    assert id_job == job["job_id"] and path_file.endswith("a.pdf") and opsi == {"file_type": "pdf"}
+    baris = _baris(path_db, id_job)
+    assert baris["status"] == sarana_jobs.STATUS_JOB_RUNNING
+    assert baris["pemilik"] == a.id_instans and baris["detak_terakhir"] is not None
+    assert b._klaim_job_berikutnya() is None
+
+def test_klaim_melewati_job_yang_diambil_instans_lain_di_antara_select_dan_update(path_db, tmp_path, monkeypatch):
+    pengelola = _pengelola(path_db, tmp_path)
+    job_pertama, _ = _buat_job(pengelola, tmp_path, "1.pdf")
+    job_kedua, _ = _buat_job(pengelola, tmp_path, "2.pdf")
+    buka_koneksi_asli = sarana_jobs._buka_koneksi_db
+
+    class _KoneksiBalapan:
+        # Instans lain mengklaim job tepat sebelum UPDATE klaim pertama dijalankan
+        def __init__(self, koneksi):
+            self._koneksi, self._sudah_balapan = koneksi, False
+
+        def execute(self, sql, parameter=()):
+            if sql.startswith("UPDATE sarana_jobs SET status") and not self._sudah_balapan:
+                self._sudah_balapan = True
+                self._koneksi.execute("UPDATE sarana_jobs SET status = ?, pemilik = 'lain' WHERE id = ?",
+                                      (sarana_jobs.STATUS_JOB_RUNNING, parameter[4]))
+            return self._koneksi.execute(sql, parameter)
+
+        def close(self):
+            self._koneksi.close()
+
+    monkeypatch.setattr(sarana_jobs, "_buka_koneksi_db", lambda path: _KoneksiBalapan(buka_koneksi_asli(path)))
+    id_job, _, _ = pengelola._klaim_job_berikutnya()
+    monkeypatch.setattr(sarana_jobs, "_buka_koneksi_db", buka_koneksi_asli)
+    assert id_job == job_kedua["job_id"]
+    assert _baris(path_db, job_pertama["job_id"])["pemilik"] == "lain"
+    assert _baris(path_db, job_kedua["job_id"])["pemilik"] == pengelola.id_instans
+
+
+# --- Perubahan status hanya oleh pemilik ---
+
+def test_hanya_pemilik_yang_bisa_menyelesaikan_job(path_db, tmp_path):
+    a, b = _pengelola(path_db, tmp_path), _pengelola(path_db, tmp_path)
+    _buat_job(a, tmp_path, "a.pdf")
+    id_job, path_file, _ = a._klaim_job_berikutnya()
+
+    b._selesaikan_job(id_job, path_file, hasil={"nama_file": "a.pdf"})
+    baris = _baris(path_db, id_job)
+    assert baris["status"] == sarana_jobs.STATUS_JOB_RUNNING and baris["hasil"] is None
+    assert (tmp_path / "a.pdf").exists() # Upload tidak dihapus oleh instans yang bukan pemilik
+
+    a._selesaikan_job(id_job, path_file, hasil={"nama_file": "a.pdf"})
+    assert _baris(path_db, id_job)["status"] == sarana_jobs.STATUS_JOB_DONE
+    assert not (tmp_path / "a.pdf").exists()
+
+
+# --- Detak dan pemulihan job yatim ---
+
+def test_detak_hanya_memperbarui_job_milik_sendiri(path_db, tmp_path):
+    a, b = _pengelola(path_db, tmp_path), _pengelola(path_db, tmp_path)
+    _buat_job(a, tmp_path, "a.pdf")
+    _buat_job(b, tmp_path, "b.pdf")
+    id_a, _, _ = a._klaim_job_berikutnya()
+    id_b, _, _ = b._klaim_job_berikutnya()
+    _jalankan_sql(path_db, "UPDATE sarana_jobs SET detak_terakhir = 0")
+    a._perbarui_detak()
+    assert _baris(path_db, id_a)["detak_terakhir"] > 0
+    assert _baris(path_db, id_b)["detak_terakhir"] == 0
+
+def test_pemulihan_hanya_untuk_job_basi_atau_tanpa_pemilik(path_db, tmp_path):
+    a, b = _pengelola(path_db, tmp_path), _pengelola(path_db, tmp_path)
+    _buat_job(a, tmp_path, "hidup.pdf")
+    _buat_job(a, tmp_path, "basi.pdf")
+    _buat_job(a, tmp_path, "lama.pdf")
+    id_hidup, _, _ = a._klaim_job_berikutnya()
+    id_basi, _, _ = a._klaim_job_berikutnya()
+    id_lama, _, _ = a._klaim_job_berikutnya()
+    _jalankan_sql(path_db, "UPDATE sarana_jobs SET detak_terakhir = ? WHERE id = ?", (1.0, id_basi))
+    # Baris dari versi sebelum kolom pemilik ada
+    _jalankan_sql(path_db, "UPDATE sarana_jobs SET pemilik = NULL, detak_terakhir = NULL WHERE id = ?", (id_lama,))
+
+    assert b._pulihkan_job_yatim() == 2
+    assert _baris(path_db, id_hidup)["status"] == sarana_jobs.STATUS_JOB_RUNNING
+    for id_job in (id_basi, id_lama):
+        baris = _baris(path_db, id_job)
+        assert baris["status"] == sarana_jobs.STATUS_JOB_QUEUED
+        assert baris["pemilik"] is None and baris["waktu_mulai"] is None
+    # Pemilik lama tidak bisa lagi menimpa job yang sudah dipulihkan dan diklaim instans lain
+    id_diklaim_ulang = b._klaim_job_berikutnya()[0]
+    assert id_diklaim_ulang in (id_basi, id_lama)
+    assert not a._ubah_status(id_diklaim_ulang, sarana_jobs.STATUS_JOB_DONE)
+    assert _baris(path_db, id_diklaim_ulang)["status"] == sarana_jobs.STATUS_JOB_RUNNING
+
+
+# --- Penulisan progres job ---
+
+def test_progres_per_halaman_ditulis_bersama_dengan_satu_koneksi(path_db, tmp_path, monkeypatch):
+    pengelola = _pengelola(path_db, tmp_path)
+    job, _ = _buat_job(pengelola, tmp_path, "a.pdf")
+    id_job, _, _ = pengelola._klaim_job_berikutnya()
+    jumlah_koneksi, jumlah_transaksi = [0], [0]
+    buka_koneksi_asli = sarana_jobs._buka_koneksi_db
+
+    class _KoneksiTercatat:
+        def __init__(self, koneksi):
+            self._koneksi = koneksi
+
+        def execute(self, sql, parameter=()):
+            if sql == "BEGIN": jumlah_transaksi[0] += 1
+            return self._koneksi.execute(sql, parameter)
+
+        def executemany(self, sql, daftar_parameter):
+            return self._koneksi.executemany(sql, daftar_parameter)
+
+        def close(self):
+            self._koneksi.close()
+
+    def _buka_koneksi_tercatat(path, **kwargs):
+        jumlah_koneksi[0] += 1
+        return _KoneksiTercatat(buka_koneksi_asli(path, **kwargs))
+
+    def _parse_palsu(callback_progres=None, **opsi):
+        callback_progres({"tahap": "ekstraksi_teks"})
+        for halaman in range(1, 21):
+            callback_progres({"tahap": "render_pdf", "halaman_render": halaman})
+            callback_progres({"tahap": "ocr_pdf", "halaman": halaman})
+        callback_progres({"tahap": "selesai"})
+        return {"nama_file": "a.pdf"}
+
+    monkeypatch.setattr(sarana_jobs, "_buka_koneksi_db", _buka_koneksi_tercatat)
+    monkeypatch.setattr(sarana_jobs, "SARANA_JOBS_PROGRESS_FLUSH_SECONDS", 3600)
+    monkeypatch.setattr(sarana_jobs.sarana_service, "parse_document_sarana", _parse_palsu)
+    assert sarana_jobs.jalankan_job_sarana(id_job, path_db, {"file_path": job["nama_file"]}) == {"nama_file": "a.pdf"}
+    monkeypatch.setattr(sarana_jobs, "_buka_koneksi_db", buka_koneksi_asli)
+
+    assert jumlah_koneksi[0] == 1
+    assert jumlah_transaksi[0] == 2 # Event per halaman digabung ke transaksi event "selesai"
+    daftar_event = pengelola.ambil_event_job(id_job)
+    assert [nomor for nomor, _ in daftar_event] == list(range(1, 43))
+    assert daftar_event[1][1] == {"tahap": "render_pdf", "halaman_render": 1}
+    assert daftar_event[-1][1] == {"tahap": "selesai"}
+    progres = pengelola.ambil_job(id_job)["progres"]
+    assert progres["tahap"] == "selesai" and progres["halaman"] == 20
+
+def test_progres_per_halaman_tertunda_ditulis_saat_job_berakhir(path_db, tmp_path, monkeypatch):
+    pengelola = _pengelola(path_db, tmp_path)
+    _buat_job(pengelola, tmp_path, "a.pdf")
+    id_job, _, _ = pengelola._klaim_job_berikutnya()
+
+    def _parse_gagal(callback_progres=None, **opsi):
+        callback_progres({"tahap": "ocr_pdf", "halaman": 1})
+        callback_progres({"tahap": "ocr_pdf", "halaman": 2})
+        raise RuntimeError("gagal")
+
+    monkeypatch.setattr(sarana_jobs, "SARANA_JOBS_PROGRESS_FLUSH_SECONDS", 3600)
+    monkeypatch.setattr(sarana_jobs.sarana_service, "parse_document_sarana", _parse_gagal)
+    with pytest.raises(RuntimeError):
+        sarana_jobs.jalankan_job_sarana(id_job, path_db, {})
+    assert [event["halaman"] for _, event in pengelola.ambil_event_job(id_job)] == [1, 2]
+
+
+# --- Dedup dan migrasi skema ---
+
+def test_dedup_job_dengan_isi_dan_opsi_sama(path_db, tmp_path):
+    pengelola = _pengelola(path_db, tmp_path)
+    job_pertama, baru_pertama = _buat_job(pengelola, tmp_path, "a.pdf", hash_konten="abc")
+    job_kedua, baru_kedua = _buat_job(pengelola, tmp_path, "a_lagi.pdf", hash_konten="abc")
+    assert baru_pertama and not baru_kedua
+    assert job_kedua["job_id"] == job_pertama["job_id"]
+    assert not (tmp_path / "a_lagi.pdf").exists() # Upload duplikat dibuang
+
+    _, baru_opsi_lain = _buat_job(pengelola, tmp_path, "b.pdf", hash_konten="abc", opsi={"file_type": "png"})
+    assert baru_opsi_lain
+
+def test_job_gagal_tidak_dipakai_untuk_dedup(path_db, tmp_path):
+    pengelola = _pengelola(path_db, tmp_path)
+    job, _ = _buat_job(pengelola, tmp_path, "a.pdf", hash_konten="abc")
+    _jalankan_sql(path_db, "UPDATE sarana_jobs SET status = ? WHERE id = ?", (sarana_jobs.STATUS_JOB_FAILED, job["job_id"]))
+    job_ulang, baru = _buat_job(pengelola, tmp_path, "a_ulang.pdf", hash_konten="abc")
+    assert baru and job_ulang["job_id"] != job["job_id"]
+
+def test_inisialisasi_menambah_kolom_pemilik_ke_db_lama(tmp_path):
+    path = str(tmp_path / "lama.sqlite3")
+    koneksi = sqlite3.connect(path)
+    koneksi.execute(
+        "CREATE TABLE sarana_jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, nama_file TEXT NOT NULL, "
+        "path_file TEXT NOT NULL, hash_konten TEXT, kunci_dedup TEXT, opsi TEXT NOT NULL, progres TEXT, hasil TEXT, "
+        "error TEXT, waktu_dibuat REAL NOT NULL, waktu_mulai REAL, waktu_selesai REAL)"
+    )
+    koneksi.close()
+    sarana_jobs._inisialisasi_db(path)
+    koneksi = sqlite3.connect(path)
+    kolom = {baris[1] for baris in koneksi.execute("PRAGMA table_info(sarana_jobs)")}
+    koneksi.close()
+    assert {"pemilik", "detak_terakhir"} <= kolom
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Unit test fungsi murni Sarana (tanpa server, Tesseract, maupun Ollama).
+Jalankan dengan: python -m pytest -q test_sarana_service.py
+"""
+
+import numpy as np
+import pymupdf
+import pytest
+
+from app.services import sarana_service
+
+
+# --- _pixmap_ke_array_sarana ---
+
+def _halaman_contoh():
+    dokumen = pymupdf.open()
+    halaman = dokumen.new_page(width=101, height=57) # Lebar ganjil: baris sampel tidak kelipatan 4 byte
+    halaman.insert_text((10, 30), "Jumlah aset 1.234", fontsize=9)
+    return dokumen, halaman
+
+@pytest.mark.parametrize("colorspace, alpha, kanal", [
+    (pymupdf.csGRAY, False, 1),
+    (pymupdf.csRGB, False, 3),
+    (pymupdf.csRGB, True, 4),
+])
+def test_pixmap_ke_array_sama_dengan_sampel(colorspace, alpha, kanal):
+    """View NumPy harus berisi piksel yang sama dengan sampel pixmap, dengan bentuk (tinggi, lebar[, kanal])."""
+    dokumen, halaman = _halaman_contoh()
+    pixmap = halaman.get_pixmap(dpi=72, colorspace=colorspace, alpha=alpha)
+    gambar = sarana_service._pixmap_ke_array_sarana(pixmap)
+
+    baris = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.stride)
+    harapan = baris[:, :pixmap.width * kanal].reshape(pixmap.height, pixmap.width, kanal)
+    if kanal == 1:
+        harapan = harapan[:, :, 0]
+    assert gambar.shape == harapan.shape
+    assert np.array_equal(gambar, harapan)
+    assert not gambar.flags.owndata # View, bukan salinan
+    dokumen.close()
+
+def test_pixmap_ke_array_salinan_tetap_valid_setelah_pixmap_dibebaskan():
+    """Pola pemanggil yang benar: pegang pixmap, salin, baru lepaskan pixmap."""
+    dokumen, halaman = _halaman_contoh()
+    pixmap = halaman.get_pixmap(dpi=72, colorspace=pymupdf.csGRAY)
+    harapan = np.frombuffer(pixmap.samples, dtype=np.uint8).copy()
+    salinan = sarana_service._pixmap_ke_array_sarana(pixmap).copy()
+    del pixmap
+    assert np.array_equal(salinan.reshape(-1), harapan)
+    dokumen.close()
+
+
+# --- Versi kunci cache hasil parsing penuh ---
+
+def _kunci_cache_hasil(monkeypatch, tmp_path) -> str:
+    berkas = tmp_path / "laporan.txt"
+    berkas.write_text("Jumlah aset 1.000 900\n", encoding="utf-8")
+    daftar_kunci = []
+    buat_kunci_asli = sarana_service.buat_kunci_cache_file_sarana
+
+    def _catat_kunci(path_file, extra_key_info="", **kwargs):
+        kunci = buat_kunci_asli(path_file, extra_key_info=extra_key_info, **kwargs)
+        if extra_key_info.startswith("hasil:"):
+            daftar_kunci.append(kunci)
+        return kunci
+
+    monkeypatch.setattr(sarana_service, "buat_kunci_cache_file_sarana", _catat_kunci)
+    sarana_service.parse_financial_document(str(berkas), file_type="txt", sarana_cache_dir=str(tmp_path / "cache"))
+    assert len(daftar_kunci) == 1
+    return daftar_kunci[0]
+
+def test_kunci_cache_hasil_stabil_untuk_versi_sama(monkeypatch, tmp_path):
+    assert _kunci_cache_hasil(monkeypatch, tmp_path) == _kunci_cache_hasil(monkeypatch, tmp_path)
+
+def test_kunci_cache_hasil_berubah_saat_versi_render_naik(monkeypatch, tmp_path):
+    kunci_lama = _kunci_cache_hasil(monkeypatch, tmp_path)
+    monkeypatch.setattr(sarana_service, "VERSI_RENDER_PDF_OCR_SARANA", sarana_service.VERSI_RENDER_PDF_OCR_SARANA + 1)
+    assert _kunci_cache_hasil(monkeypatch, tmp_path) != kunci_lama
+
+def test_kunci_cache_hasil_berubah_saat_versi_ekstraktor_naik(monkeypatch, tmp_path):
+    kunci_lama = _kunci_cache_hasil(monkeypatch, tmp_path)
+    monkeypatch.setattr(sarana_service, "VERSI_EKSTRAKTOR_SARANA", sarana_service.VERSI_EKSTRAKTOR_SARANA + "-uji")
+    assert _kunci_cache_hasil(monkeypatch, tmp_path) != kunci_lama
+
+
+# --- ekstrak_data_keuangan_dari_tata_letak_sarana ---
+
+def _baris_kata(y: float, *kata_dan_tepi_kanan) -> list[dict]:
+    """Kata ber-bbox seperti dari PyMuPDF; posisi diberikan sebagai tepi kanan (angka rata kanan)."""
+    return [{'text': teks, 'bounds': [x1 - 6 * len(teks), y, x1, y + 10]} for teks, x1 in kata_dan_tepi_kanan]
+
+KATA_KUNCI_ASET = [
+    {"kata_dasar": "Jumlah aset", "variasi": ["Jumlah aset"]},
+    {"kata_dasar": "Jumlah aset lancar", "variasi": ["Jumlah aset lancar"]},
+]
+
+def test_tata_letak_kolom_catatan_dilewati_dan_frasa_tidak_cocok_sebagian():
+    kata = (_baris_kata(60, ("Catatan", 350), ("2023", 480), ("2022", 580))
+            + _baris_kata(80, ("Jumlah", 60), ("aset", 90), ("lancar", 130), ("5", 350), ("1.000", 480), ("900", 580))
+            + _baris_kata(100, ("Jumlah", 60), ("aset", 90), ("7a", 350), ("5.000", 480), ("4.000", 580)))
+    hasil = sarana_service.ekstrak_data_keuangan_dari_tata_letak_sarana([kata], KATA_KUNCI_ASET, lebar_halaman=[600])
+    assert hasil["Jumlah aset lancar"] == {'t': 1000.0, 't-1': 900.0}
+    assert hasil["Jumlah aset"] == {'t': 5000.0, 't-1': 4000.0}
+
+def test_tata_letak_tahun_judul_halaman_bukan_judul_kolom():
+    """'2023' dari "31 Desember 2023" di judul halaman tidak boleh menjadi judul kolom angka di bawahnya."""
+    kata = (_baris_kata(20, ("31", 340), ("Desember", 420), ("2023", 480))
+            + _baris_kata(60, ("2022", 480), ("2023", 580))
+            + _baris_kata(80, ("Jumlah", 60), ("aset", 90), ("4.000", 480), ("5.000", 580)))
+    hasil = sarana_service.ekstrak_data_keuangan_dari_tata_letak_sarana([kata], KATA_KUNCI_ASET, lebar_halaman=[600])
+    assert hasil["Jumlah aset"] == {'t': 5000.0, 't-1': 4000.0}
+
+def test_tata_letak_peringkat_per_tahun_berbeda():
+    """Kolom konsolidasian dan entitas induk bertahun sama berbagi peringkat; nilai terkiri yang dipakai."""
+    kata = (_baris_kata(60, ("2022", 300), ("2023", 400), ("2022", 500), ("2023", 600))
+            + _baris_kata(80, ("Kas", 40), ("100", 300), ("200", 400), ("110", 500), ("210", 600)))
+    hasil = sarana_service.ekstrak_data_keuangan_dari_tata_letak_sarana(
+        [kata], [{"kata_dasar": "Kas", "variasi": ["Kas"]}], lebar_halaman=[620]
+    )
+    assert hasil["Kas"] == {'t': 200.0, 't-1': 100.0}
+
+def test_tata_letak_tanpa_judul_tahun_urut_dari_kiri():
+    kata = _baris_kata(80, ("Jumlah", 60), ("aset", 90), ("(1.500)", 480), ("2.500", 580))
+    hasil = sarana_service.ekstrak_data_keuangan_dari_tata_letak_sarana([kata], KATA_KUNCI_ASET, lebar_halaman=[600])
+    assert hasil["Jumlah aset"] == {'t': -1500.0, 't-1': 2500.0}
+    assert hasil["Jumlah aset lancar"] == {'t': None, 't-1': None}
+
+
+# --- normalisasi_nilai_keuangan_sarana (memo) dan versi batch ---
+
+KASUS_NORMALISASI = [
+    ("1.234", 1234.0), ("1.234.567", 1234567.0), ("123.45", 123.45), # Titik: ribuan vs desimal
+    ("1,234", 1234.0), ("1,234,567", 1234567.0), ("1,5", 15.0), ("1,2345", 1.2345), # Koma saja
+    ("1.234,56", 1234.56), ("1,234.56", 1234.56), # Keduanya: pemisah terakhir adalah desimal
+    ("(1.234)", -1234.0), ("( 2.500 )", -2500.0), ("(-5)", -5.0), ("-1.234", -1.234), # Negatif
+    ("Rp 1.234 juta", 1234.0), ("Rp1.234", 1234.0), ("2023", 2023.0),
+    ("-", None), ("", None), ("abc", None), (None, None), (1234, None),
+]
+
+@pytest.mark.parametrize("token, harapan", KASUS_NORMALISASI)
+def test_normalisasi_nilai_keuangan(token, harapan):
+    assert sarana_service.normalisasi_nilai_keuangan_sarana(token) == harapan
+
+def test_normalisasi_memo_mengembalikan_hasil_sama_untuk_token_berulang():
+    sarana_service._normalisasi_nilai_keuangan_memo_sarana.cache_clear()
+    pertama = sarana_service.normalisasi_nilai_keuangan_sarana("(7.654)")
+    kedua = sarana_service.normalisasi_nilai_keuangan_sarana("(7.654)")
+    assert pertama == kedua == -7654.0
+    assert sarana_service._normalisasi_nilai_keuangan_memo_sarana.cache_info().hits == 1
+
+def test_normalisasi_batch_list_dan_tuple():
+    daftar = [token for token, _ in KASUS_NORMALISASI]
+    harapan = [nilai for _, nilai in KASUS_NORMALISASI]
+    assert sarana_service.normalisasi_nilai_keuangan_batch_sarana(daftar) == harapan
+    assert sarana_service.normalisasi_nilai_keuangan_batch_sarana(tuple(daftar)) == harapan
+
+def test_normalisasi_batch_array_dan_series():
+    import pandas as pd
+    nilai = np.array([["1.234", "(5)"], ["-", "1.234"]], dtype=object)
+    hasil = sarana_service.normalisasi_nilai_keuangan_batch_sarana(nilai)
+    assert hasil.shape == (2, 2) and hasil.dtype == np.float64
+    assert np.array_equal(hasil, [[1234.0, -5.0], [np.nan, 1234.0]], equal_nan=True)
+    seri = pd.Series(["1,5", None, "Rp 2.000"], index=["a", "b", "c"])
+    hasil_seri = sarana_service.normalisasi_nilai_keuangan_batch_sarana(seri)
+    assert list(hasil_seri.index) == ["a", "b", "c"]
+    assert hasil_seri["a"] == 15.0 and np.isnan(hasil_seri["b"]) and hasil_seri["c"] == 2000.0
+
+def test_normalisasi_batch_list_tidak_memuat_numpy_pandas():
+    import subprocess
+    import sys
+    kode = ("import sys; from app.services import sarana_service as s; "
+            "s.normalisasi_nilai_keuangan_batch_sarana(['1.234', None]); "
+            "print('numpy' in sys.modules, 'pandas' in sys.modules)")
+    keluaran = subprocess.run([sys.executable, "-c", kode], capture_output=True, text=True, check=True,
+                              cwd=sarana_service.os.path.join(sarana_service.os.path.dirname(sarana_service.__file__), "..", ".."))
+    assert keluaran.stdout.split()[-2:] == ["False", "False"]
+
+
+# --- Pencocokan kata kunci satu lintasan vs pencarian substring (implementasi awal) ---
+
+def _ekstrak_referensi_substring(teks_dokumen: str, daftar_kata_kunci: list[dict], hanya_kata_dasar: set[str] | None = None) -> dict:
+    """Pencarian standar versi sebelum otomaton: str.find per variasi dan cek "kata kunci lain" dengan substring."""
+    hasil = {info["kata_dasar"]: {'t': None, 't-1': None} for info in daftar_kata_kunci}
+    teks = sarana_service.re.sub(r"\s+", " ", teks_dokumen.replace("\n", " ").replace("\r", " ")).strip().lower()
+    for info in daftar_kata_kunci:
+        kata_dasar = info["kata_dasar"]
+        if hanya_kata_dasar is not None and kata_dasar not in hanya_kata_dasar: continue
+        ditemukan = False
+        for variasi in sorted(info["variasi"], key=len, reverse=True):
+            variasi_lower = variasi.lower()
+            posisi_cari = 0
+            while posisi_cari < len(teks):
+                posisi = teks.find(variasi_lower, posisi_cari)
+                if posisi == -1: break
+                awal_nilai = posisi + len(variasi_lower)
+                token_nilai = sarana_service.re.split(r'\s+', teks[awal_nilai:awal_nilai + 300].strip())
+                nilai = []
+                for indeks_token, token in enumerate(token_nilai[:30]):
+                    if not token: break
+                    angka = sarana_service.normalisasi_nilai_keuangan_sarana(token)
+                    if angka is None: continue
+                    if sarana_service.is_another_keyword_present_sarana(" ".join(token_nilai[:indeks_token]), kata_dasar, daftar_kata_kunci): break
+                    nilai.append(angka)
+                    if len(nilai) >= 2: break
+                if nilai and hasil[kata_dasar]['t'] is None:
+                    hasil[kata_dasar]['t'] = nilai[0]
+                    if len(nilai) > 1: hasil[kata_dasar]['t-1'] = nilai[1]
+                    ditemukan = True
+                    break
+                posisi_cari = posisi + len(variasi_lower)
+            if ditemukan: break
+    return hasil
+
+KATA_KUNCI_LABA = [
+    {"kata_dasar": "Laba", "variasi": ["Laba"]},
+    {"kata_dasar": "Laba bersih", "variasi": ["Laba bersih", "Laba bersih tahun berjalan"]},
+    {"kata_dasar": "Laba kotor", "variasi": ["Laba kotor", "Laba bruto"]},
+    {"kata_dasar": "Saldo laba", "variasi": ["Saldo laba", "laba ditahan"]},
+]
+
+@pytest.mark.parametrize("teks", [
+    # Variasi saling tumpang tindih: "laba" adalah prefiks/infiks dari variasi kata kunci lain
+    "Laba bersih 1.200 1.000\nLaba kotor 3.400 3.000\nLaba 50 40",
+    "saldo laba 700 650 laba bersih tahun berjalan 90 80",
+    "Laba bersih tahun berjalan (1.500) 2.500",
+    # Kata kunci berulang: kemunculan pertama tanpa angka, kemunculan berikutnya berangka
+    "Laba bersih - Laba bersih catatan Laba bersih 10.000 9.000",
+    "laba laba laba 5 laba 6 7",
+    # Rentang tanpa angka sama sekali, dan kata kunci lain di antara kata kunci dan angka
+    "Laba kotor tidak diaudit dan disajikan kembali",
+    "Laba kotor saldo laba 300 200",
+    "Laba bruto untuk tahun yang berakhir laba ditahan 12 11 laba bruto 8 7",
+    "",
+])
+def test_otomaton_sama_dengan_pencarian_substring(teks):
+    assert sarana_service.ekstrak_data_keuangan_tahunan_sarana(teks, KATA_KUNCI_LABA) == _ekstrak_referensi_substring(teks, KATA_KUNCI_LABA)
+
+def test_otomaton_sama_dengan_pencarian_substring_teks_acak():
+    acak = __import__("random").Random(7)
+    kosakata = ["laba", "bersih", "kotor", "bruto", "saldo", "ditahan", "tahun", "berjalan", "jumlah", "aset", "lancar",
+                "tidak", "liabilitas", "ekuitas", "dan", "catatan", "-", "2023", "1.234", "(567)", "89,5", "10,000", "12.345.678"]
+    for _ in range(300):
+        teks = " ".join(acak.choice(kosakata) for _ in range(acak.randint(0, 40)))
+        for daftar in (KATA_KUNCI_LABA, sarana_service.DAFTAR_KATA_KUNCI_KEUANGAN_SARANA_DEFAULT):
+            assert sarana_service.ekstrak_data_keuangan_tahunan_sarana(teks, daftar) == _ekstrak_referensi_substring(teks, daftar), teks
+
+def test_otomaton_dengan_subset_kata_dasar_tetap_memeriksa_kata_kunci_lain():
+    teks = "laba bersih saldo laba 300 200 laba kotor 40 30"
+    hanya = {"Laba bersih", "Laba kotor"}
+    hasil = sarana_service.ekstrak_data_keuangan_tahunan_sarana(teks, KATA_KUNCI_LABA, hanya_kata_dasar=hanya)
+    assert hasil == _ekstrak_referensi_substring(teks, KATA_KUNCI_LABA, hanya_kata_dasar=hanya)
+    assert hasil["Laba bersih"] == {'t': None, 't-1': None} # Angka milik "saldo laba"
+    assert hasil["Saldo laba"] == {'t': None, 't-1': None} # Tidak dicari
+
+def test_regex_trie_menemukan_semua_kemunculan_tumpang_tindih():
+    otomaton = sarana_service.dapatkan_otomaton_kata_kunci_sarana(KATA_KUNCI_LABA)
+    teks = "saldo laba bersih tahun berjalan, laba kotor dan laba"
+    indeks = otomaton.indeks(teks)
+    for variasi in otomaton.pemilik_variasi:
+        harapan, posisi = [], teks.find(variasi)
+        while posisi != -1:
+            harapan.append(posisi)
+            posisi = teks.find(variasi, posisi + len(variasi))
+        assert list(indeks.iter_posisi_variasi(variasi)) == harapan, variasi
+
+
+# --- parse_document_gambar_json_async_sarana: cache hasil penuh sebelum Ollama ---
+
+def test_gambar_json_async_memakai_cache_sebelum_ollama(monkeypatch, tmp_path):
+    import asyncio
+    monkeypatch.setattr(sarana_service, "NAMA_DIREKTORI_CACHE_DEFAULT_SARANA", str(tmp_path / "cache"))
+    panggilan_ollama = []
+
+    async def _ollama_palsu(image_path, **kwargs):
+        panggilan_ollama.append(image_path)
+        return {"Jumlah aset": {"t": 1000.0, "t-1": 900.0}}
+
+    monkeypatch.setattr(sarana_service, "ekstrak_data_keuangan_dari_gambar_ollama_async_sarana", _ollama_palsu)
+    gambar = tmp_path / "laporan.png"
+    gambar.write_bytes(b"\x89PNG isi uji")
+    hash_konten = sarana_service.hitung_hash_konten_file_sarana(str(gambar))
+
+    def _parse():
+        return asyncio.run(sarana_service.parse_document_gambar_json_async_sarana(str(gambar), file_content_hash=hash_konten))
+
+    pertama = _parse()
+    kedua = _parse()
+    assert len(panggilan_ollama) == 1 # Panggilan kedua dilayani cache tanpa memanggil Ollama
+    assert "cache" in kedua["info_parsing"] and "cache" not in pertama["info_parsing"]
+    assert {k: v for k, v in kedua.items() if k != "info_parsing"} == {k: v for k, v in pertama.items() if k != "info_parsing"}
+
+
+# --- Estimasi sudut kemiringan (profil proyeksi per kelompok sudut) ---
+
+def _gambar_baris_miring(sudut: float) -> np.ndarray:
+    import cv2
+    gambar = np.zeros((1200, 900), dtype=np.uint8)
+    for y in range(80, 1120, 40):
+        gambar[y:y + 12, 60:840] = 255
+    matriks = cv2.getRotationMatrix2D((450, 600), sudut, 1.0)
+    return cv2.warpAffine(gambar, matriks, (900, 1200))
+
+@pytest.mark.parametrize("sudut", [-4.0, 0.0, 2.5])
+def test_estimasi_sudut_kemiringan(sudut):
+    assert sarana_service.estimasi_sudut_kemiringan_sarana(_gambar_baris_miring(sudut)) == pytest.approx(-sudut, abs=0.1)
+
+def test_skor_profil_proyeksi_tidak_bergantung_ukuran_kelompok(monkeypatch):
+    baris, kolom = np.nonzero(_gambar_baris_miring(1.5))
+    baris, kolom = baris.astype(np.float64), kolom.astype(np.float64)
+    daftar_sudut = np.arange(-15.0, 15.5, 1.0)
+    skor_per_kelompok = sarana_service._skor_profil_proyeksi_sarana(baris, kolom, daftar_sudut)
+    monkeypatch.setattr(sarana_service, "UKURAN_KELOMPOK_SUDUT_KEMIRINGAN_SARANA", len(daftar_sudut))
+    assert np.array_equal(skor_per_kelompok, sarana_service._skor_profil_proyeksi_sarana(baris, kolom, daftar_sudut))
+
+
+# --- PelacakKataKunciSarana (henti dini per halaman) ---
+
+def test_pelacak_berhenti_saat_semua_kata_kunci_lengkap_dan_melapor_progres():
+    events = []
+    pelacak = sarana_service.PelacakKataKunciSarana(KATA_KUNCI_ASET, callback_progres=events.append)
+    assert not pelacak.tambah_halaman("Jumlah aset 5.000", nomor_halaman=0) # Baru 't'
+    assert not pelacak.tambah_halaman("Error OCR", nomor_halaman=1)
+    assert not pelacak.tambah_halaman("Jumlah aset 5.000 4.000", nomor_halaman=2)
+    assert pelacak.tambah_halaman("Jumlah aset lancar 1.000 900", nomor_halaman=3)
+    assert pelacak.tambah_halaman("Jumlah aset 1 2", nomor_halaman=4) # Sudah berhenti
+    assert pelacak.ringkasan() == {"alasan": "kata_kunci_lengkap", "halaman_ocr": 4, "halaman_diperiksa": 3,
+                                   "kata_kunci_tersisa": 0, "total_kata_kunci": 2}
+    assert [(e["halaman_kata_kunci"], e["kata_kunci_baru"]) for e in events] == [(1, ["Jumlah aset"]), (4, ["Jumlah aset lancar"])]
+
+def test_pelacak_berhenti_pada_batas_halaman_ocr():
+    pelacak = sarana_service.PelacakKataKunciSarana(KATA_KUNCI_ASET, henti_saat_lengkap=False, maks_halaman_ocr=2)
+    assert not pelacak.tambah_halaman("teks", dari_ocr=False)
+    assert not pelacak.tambah_halaman("teks")
+    assert pelacak.tambah_halaman("teks")
+    assert pelacak.ringkasan()["alasan"] == "batas_halaman_ocr"
+
+def test_pelacak_mengekstrak_di_luar_lock(monkeypatch):
+    pelacak = sarana_service.PelacakKataKunciSarana(KATA_KUNCI_ASET)
+    ekstrak_asli = sarana_service.ekstrak_data_keuangan_tahunan_sarana
+    status_lock = []
+
+    def _ekstrak_tercatat(*args, **kwargs):
+        status_lock.append(pelacak._lock.locked())
+        return ekstrak_asli(*args, **kwargs)
+
+    monkeypatch.setattr(sarana_service, "ekstrak_data_keuangan_tahunan_sarana", _ekstrak_tercatat)
+    pelacak.tambah_halaman("Jumlah aset 5.000 4.000")
+    assert status_lock == [False]